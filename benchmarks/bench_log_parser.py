@@ -0,0 +1,128 @@
+"""Micro-benchmark for `services.log_parser.parse_line`.
+
+Generates synthetic log-channel lines in the formats the writer cogs emit (plus
+some unrelated chatter) and times the single-pass parser against the previous
+per-cog approach: try every regex in turn, lower() the content for keyword
+checks and strptime() each date. The same lines are also timed with the record
+token the writer cogs now append.
+
+    python benchmarks/bench_log_parser.py [n_lines]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ledger import (  # noqa: E402
+    KIND_BEHU,
+    KIND_BENGOAN,
+    KIND_GIAYCHE,
+    KIND_MENTEE_CHE,
+    KIND_MENTEE_KHEN,
+)
+from services.log_parser import encode_token, parse_line  # noqa: E402
+
+_LEGACY_BEHU = re.compile(
+    r"(?P<username>.+?)\s+đã (?:bị phạt|được ghi nhận).*?phiếu bé hư(?:.*vào\s*(?:ngày|lúc)?\s*(?P<date>\d{1,2}/\d{1,2}/\d{4}))?",
+    re.I,
+)
+_LEGACY_BENGOAN = re.compile(
+    r"(?P<username>.+?)\s+đã được tặng 1 phiếu bé ngoan(?:.*vào\s*(?:ngày|lúc)?\s*(?P<date>\d{1,2}/\d{1,2}/\d{4}))?",
+    re.I,
+)
+_LEGACY_GIAYCHE = re.compile(
+    r"(?P<target>.+?)\s+bị ghi giấy chê bởi\s+(?P<sender>.+?)\s+vào ngày\s+(?P<date>\d{1,2}/\d{1,2}/\d{4})(?:\.\s*Lý do:\s*(?P<reason>.*?)(?=(?:\.\s*ID:\d+:\d+)|$))?(?:\.\s*ID:(?P<tid>\d+):(?P<sid>\d+))?",
+    re.I | re.S,
+)
+
+
+def _legacy_parse(content: str, created_at: datetime):
+    content = (content or "").strip()
+    if "[mentee]" in content.lower():
+        after = content.split("]", 1)[-1].strip()
+        lowered = after.lower()
+        return ("mentee", "chê" in lowered, created_at)
+    for pattern in (_LEGACY_GIAYCHE, _LEGACY_BEHU, _LEGACY_BENGOAN):
+        m = pattern.search(content)
+        if m:
+            date_str = m.group("date")
+            dt = datetime.strptime(date_str, "%d/%m/%Y") if date_str else created_at
+            return (pattern.pattern[:10], m.group(1), dt)
+    return None
+
+
+def synthetic_lines(n: int, seed: int = 42, tokens: bool = False) -> list[str]:
+    rng = random.Random(seed)
+    when = datetime(2025, 10, 14)
+
+    def add(line: str, kind: str, who: str):
+        if tokens:
+            tid = int(who[2:-1]) if who.startswith("<@") else None
+            line += " " + encode_token(kind, tid, 1, when, f"{len(lines):016x}")
+        lines.append(line)
+
+    names = [f"<@{rng.randrange(10**17, 10**18)}>" for _ in range(200)]
+    names += ["Minh Anh", "Bảo Ngọc", "Tuấn", "Hà My"]
+    lines = []
+    for _ in range(n):
+        who = rng.choice(names)
+        by = rng.choice(names)
+        date_s = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"
+        r = rng.random()
+        if r < 0.3:
+            add(f"{who} đã bị phạt 1 phiếu bé hư vào ngày {date_s}", KIND_BEHU, who)
+        elif r < 0.55:
+            add(f"{who} đã được tặng 1 phiếu bé ngoan vào ngày {date_s}", KIND_BENGOAN, who)
+        elif r < 0.7:
+            add(
+                f"{who} bị ghi giấy chê bởi {by} vào ngày {date_s}. Lý do: nói chuyện riêng",
+                KIND_GIAYCHE,
+                who,
+            )
+        elif r < 0.9:
+            khen = rng.random() < 0.5
+            verb = "được khen" if khen else "bị chê"
+            add(
+                f"[mentee] {who} {verb} bởi {by} vào ngày {date_s}",
+                KIND_MENTEE_KHEN if khen else KIND_MENTEE_CHE,
+                who,
+            )
+        else:
+            lines.append(f"{by}: hôm nay học gì vậy mọi người?")
+    return lines
+
+
+def _time(fn, lines, created_at) -> tuple[float, int]:
+    start = time.perf_counter()
+    hits = 0
+    for line in lines:
+        if fn(line, created_at) is not None:
+            hits += 1
+    return time.perf_counter() - start, hits
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lines = synthetic_lines(n)
+    created_at = datetime(2025, 10, 14)
+
+    tokenized = synthetic_lines(n, tokens=True)
+    for label, fn, data in (
+        ("legacy", _legacy_parse, lines),
+        ("parse_line", parse_line, lines),
+        ("tokenized", parse_line, tokenized),
+    ):
+        elapsed, hits = _time(fn, data, created_at)
+        print(
+            f"{label:>10}: {n} lines in {elapsed * 1000:8.1f} ms"
+            f" ({n / elapsed:,.0f} lines/s, {hits} records)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,11 @@
+import time
+
+# Boot timeline origin: taken before the (comparatively slow) imports below
+BOOT_STARTED = time.monotonic()
+
+import asyncio
+import hashlib
+import json
 import os
 import discord
 from discord.ext import commands
@@ -5,6 +13,19 @@ from dotenv import load_dotenv
 import logging
 from datetime import datetime
 
+from services.assets import AssetRegistry
+from services.ledger import Ledger
+from services.log_index import LogIndex
+from services.member_index import MemberIndex
+from services.metrics import BootTimeline, StageTimings
+from services.names import NameResolver
+from services.outbox import LogOutbox
+from services.report_cache import ReportCache
+from services.rest_scheduler import RestScheduler
+from services.room_pool import RoomPool
+from services.rooms import RoomRegistry
+from services.singleflight import SingleFlight
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,37 +35,209 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+IMPORTS_DONE = time.monotonic()
+
+# Channel that mirrors every phiếu / giấy chê / mentee record
+LOG_CHANNEL_ID = 1426956645342384190
+
+# Ledger meta key holding the fingerprint of the last synced command tree
+COMMAND_TREE_KEY = "command_tree_hash"
 
-class NoemaBot(commands.Bot):
+# Sharding: NOEMA_SHARD_COUNT alone runs every shard in this process;
+# NOEMA_SHARD_IDS (e.g. "0,1") runs only those, so shards can be split over
+# several processes sharing the ledger and the room store
+SHARD_COUNT = int(os.getenv("NOEMA_SHARD_COUNT", "0")) or None
+SHARD_IDS = [int(i) for i in os.getenv("NOEMA_SHARD_IDS", "").split(",") if i.strip()] or None
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    raise RuntimeError("NOEMA_SHARD_IDS needs NOEMA_SHARD_COUNT (the total number of shards)")
+if SHARD_IDS is not None and any(not 0 <= i < SHARD_COUNT for i in SHARD_IDS):
+    raise RuntimeError(f"NOEMA_SHARD_IDS {SHARD_IDS} must be below NOEMA_SHARD_COUNT ({SHARD_COUNT})")
+# Lean gateway mode (NOEMA_LEAN_GATEWAY=1): no presences, members cached only
+# while in voice, no member chunking at startup, no prefix-command parsing
+LEAN_GATEWAY = os.getenv("NOEMA_LEAN_GATEWAY", "0") == "1"
+# Seconds between checks for ledger changes made by the other processes
+LEDGER_SYNC_INTERVAL = float(os.getenv("NOEMA_LEDGER_SYNC_INTERVAL", "2.0"))
+
+class NoemaBot(commands.AutoShardedBot):
     def __init__(self, **kwargs):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.guilds = True
         intents.voice_states = True
         intents.members = True  # Cần để đọc thông tin members
-        intents.presences = True  # Cần để đọc trạng thái online/offline
+        intents.presences = not LEAN_GATEWAY  # Cần để đọc trạng thái online/offline
+        if LEAN_GATEWAY:
+            # Full member lists are fetched on demand (see services.member_index).
+            # Members who only interact are not cached either: discord.py has no
+            # such cache flag, and commands read the invoking member from the
+            # interaction payload
+            kwargs.setdefault('member_cache_flags', discord.MemberCacheFlags(voice=True, joined=False))
+            kwargs.setdefault('chunk_guilds_at_startup', False)
+        kwargs.setdefault('shard_count', SHARD_COUNT)
+        kwargs.setdefault('shard_ids', SHARD_IDS)
         super().__init__(command_prefix=commands.when_mentioned_or('/'), description='Noema, your helpful Discord bot.', intents=intents, **kwargs)
+        # Startup steps, logged as one line on the first ready
+        self.boot = BootTimeline(BOOT_STARTED)
+        self.boot.mark("imports", IMPORTS_DONE)
+        # Other processes run the remaining shards against the same files
+        self.multi_process = self.shard_ids is not None
+        # The process running shard 0 also does the once-per-deployment work:
+        # sending log lines, backfilling the log channel, syncing commands
+        self.primary = self.shard_ids is None or 0 in self.shard_ids
+        self._commands_checked = False
+        self._booted = False
+        # Replays other processes' ledger writes (multi-process only, started in setup_hook)
+        self._ledger_sync: asyncio.Task | None = None
+        # Auto-created rooms and community channels, persisted across restarts
+        self.rooms = RoomRegistry()
+        # guild id -> [community voice channels], resolved from `rooms` on ready
         self.community_channels = {}
-        # Store voice-text channel pairs
-        self.channel_pairs = {}
+        # Store voice-text channel pairs (kept in sync with `rooms`)
+        self.channel_pairs = self.rooms.pairs
+        # Prioritized queue for channel/member REST calls (moves before deletes)
+        self.rest = RestScheduler()
+        # Hidden spare rooms handed out on community-channel joins
+        self.room_pool = RoomPool(self.rooms, self.rest)
+        # Per-stage latency of room provisioning (create / claim / move / register)
+        self.room_timings = StageTimings()
+        # Local SQLite ledger of phiếu / giấy chê / mentee records
+        self.ledger = Ledger(shared=self.multi_process)
+        # In-memory index over the ledger, kept current by the log indexer cog
+        self.log_index = LogIndex(self.ledger)
+        # Coalesces identical concurrent stats queries
+        self.stats_flight = SingleFlight()
+        # Rendered stats reports, invalidated by ledger writes
+        self.report_cache = ReportCache(self.ledger, self.stats_flight)
+        # Folded member-name index for the `user` autocompletes
+        self.member_index = MemberIndex(lazy=LEAN_GATEWAY)
+        # Batched mention -> display name lookups for report rendering
+        self.names = NameResolver(self, self.ledger)
+        # Batched, persisted writes to the log channel
+        self.log_outbox = LogOutbox(self, self.ledger, LOG_CHANNEL_ID, drain=self.primary)
+        # Reaction images, read once and re-sent by CDN link after the first upload
+        self.assets = AssetRegistry()
 
     async def setup_hook(self):
-        # Load all command Cogs
-        for filename in os.listdir('./commands'):
-            if filename.endswith('.py') and not filename.startswith('__'):
-                try:
-                    await self.load_extension(f'commands.{filename[:-3]}')
-                    logger.info(f"Loaded extension: commands.{filename[:-3]}")
-                except Exception as e:
-                    logger.error(f"Failed to load extension commands.{filename[:-3]}: {e}")
+        # setup_hook runs right after login, before the gateway connects
+        self.boot.mark("login")
+        # Resend log lines left unsent by the previous run
+        self.log_outbox.start()
+        # Workers draining the channel/member REST queue
+        self.rest.start()
+        if self.multi_process:
+            self._ledger_sync = asyncio.create_task(self._sync_ledger())
+        # Load all command Cogs; they do not depend on each other, so their
+        # setup/cog_load awaits overlap (module imports themselves still run one by one)
+        names = sorted(
+            f'commands.{filename[:-3]}'
+            for filename in os.listdir('./commands')
+            if filename.endswith('.py') and not filename.startswith('__')
+        )
+        await asyncio.gather(*(self._load_extension_timed(name) for name in names))
+        self.boot.mark("extensions")
 
-    async def on_ready(self):
-        logger.info(f"Bot logged in as {self.user.name} (ID: {self.user.id})")
+    async def _load_extension_timed(self, name: str):
+        started = time.perf_counter()
         try:
-            synced = await self.tree.sync()
-            logger.info(f"Successfully synced {len(synced)} command(s)")
+            await self.load_extension(name)
+            logger.info(f"Loaded extension: {name} ({(time.perf_counter() - started) * 1000:.0f} ms)")
         except Exception as e:
-            logger.error(f"Failed to sync commands: {e}")
+            logger.error(f"Failed to load extension {name}: {e}")
+
+    def _mark_boot_once(self, step: str):
+        # Gateway events fire again on reconnects; only the first is part of the boot
+        if not any(name == step for name, _ in self.boot.steps):
+            self.boot.mark(step)
+
+    async def on_connect(self):
+        self._mark_boot_once("gateway")
+
+    async def on_guild_available(self, guild):
+        # Dispatched once a guild is received (and chunked, unless lean)
+        self._mark_boot_once("first guild")
+
+    async def on_shard_ready(self, shard_id):
+        # One shard has all of its guilds; ready waits for every shard
+        self._mark_boot_once("first shard ready")
+
+    async def _sync_ledger(self):
+        """Replay the other processes' ledger writes to this process's caches."""
+        while not self.is_closed():
+            await asyncio.sleep(LEDGER_SYNC_INTERVAL)
+            try:
+                if self.ledger.poll_changes():
+                    # Log lines queued by the other processes are sent from here
+                    self.log_outbox.start()
+            except Exception as e:
+                logger.error(f"Failed to read ledger changes: {e}")
+
+    async def on_message(self, message):
+        # Every command is a slash command: lean mode skips prefix parsing
+        if not LEAN_GATEWAY:
+            await self.process_commands(message)
+
+    async def on_ready(self):
+        logger.info(f"Bot logged in as {self.user.name} (ID: {self.user.id}, shards: {self.shard_ids or 'all'})")
+        # on_ready also fires after reconnects; only the first is part of the boot
+        first_ready = not self._booted
+        if first_ready:
+            self._booted = True
+            # Ready is dispatched once every shard has all of its guilds
+            self.boot.mark("ready")
+        # The tree cannot change after a successful check; a failed one (HTTP
+        # error, rate limit) is retried on the next ready
+        if self.primary and not self._commands_checked:
+            try:
+                await self.sync_commands()
+                self._commands_checked = True
+            except Exception as e:
+                logger.error(f"Failed to sync commands, retrying on the next ready: {e}")
+            if first_ready:
+                self.boot.mark("sync")
+        if first_ready:
+            logger.info(f"Boot timeline: {self.boot.summary()}")
+
+    def command_tree_hash(self) -> str:
+        """Fingerprint of the global command tree as it would be sent to Discord."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: (command.get('type', 1), command['name']),
+        )
+        blob = json.dumps(
+            [self.application_id, payload], sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    async def sync_commands(self, force: bool = False) -> int | None:
+        """Sync the global command tree if it changed since the last sync, or if `force`.
+
+        Returns the number of synced commands, or None when the sync was skipped.
+        """
+        started = time.perf_counter()
+        fingerprint = self.command_tree_hash()
+        if not force and self.ledger.get_meta(COMMAND_TREE_KEY) == fingerprint:
+            logger.info(
+                f"Command tree unchanged ({fingerprint[:12]}), sync skipped"
+                f" ({(time.perf_counter() - started) * 1000:.0f} ms)"
+            )
+            return None
+        synced = await self.tree.sync()
+        self.ledger.set_meta(COMMAND_TREE_KEY, fingerprint)
+        logger.info(
+            f"Synced {len(synced)} command(s) ({'forced' if force else 'tree changed'},"
+            f" {fingerprint[:12]}) in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return len(synced)
+
+    async def close(self):
+        await self.log_outbox.close()
+        await super().close()
+        await self.rest.close()
+        if self._ledger_sync is not None:
+            self._ledger_sync.cancel()
+        await self.rooms.close()
+        await self.assets.close()
+        self.ledger.close()
 
 def run_bot():
     load_dotenv()
@@ -0,0 +1,66 @@
+import discord
+from discord.ext import commands
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMIN_ROLES = ["founder", "co-founder", "admin"]
+
+
+def _format(values: dict) -> str:
+    return ", ".join(f"{key}={value}" for key, value in values.items()) or "-"
+
+
+class BotMetrics(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def render(self) -> str:
+        bot = self.bot
+        pool = bot.room_pool
+        hit_rate = pool.hit_rate()
+        lines = ["Room provisioning"]
+        lines.append(f"  time to room: {pool.time_to_room.summary()}")
+        for stage, summary in bot.room_timings.summary().items():
+            lines.append(f"  {stage}: {summary}")
+        lines.append(
+            f"  pool: {_format(pool.metrics())}, hit rate="
+            + (f"{hit_rate:.0%}" if hit_rate is not None else "-")
+        )
+        rest = bot.rest.metrics()
+        lines.append(
+            f"  REST queue: depth {_format(rest['depth'])}; 429s={rest['429s']}"
+        )
+        for lane, summary in rest["waits"].items():
+            lines.append(f"    {lane} wait: {summary}")
+        if rest["routes_429"]:
+            lines.append(f"    429 routes: {_format(rest['routes_429'])}")
+        voice_events = bot.get_cog("VoiceEvents")
+        if voice_events is not None:
+            lines.append(f"  admission: {_format(voice_events.admission.metrics())}")
+            lines.append(f"  deletions: {_format(voice_events.reaper.metrics())}")
+        lines.append("Stats")
+        lines.append(f"  report cache: {_format(bot.report_cache.metrics())}")
+        flight = {
+            name: f"{calls}/{coalesced}"
+            for name, (calls, coalesced) in bot.stats_flight.metrics().items()
+        }
+        lines.append(f"  singleflight (calls/coalesced): {_format(flight)}")
+        lines.append("Log channel")
+        lines.append(f"  outbox: {_format(bot.log_outbox.metrics())}")
+        lines.append(f"  images: {_format(bot.assets.metrics())}")
+        return "\n".join(lines)
+
+    @discord.app_commands.command(name="metrics", description="Bot latency and cache metrics (Founder/Co-founder only)")
+    async def metrics(self, interaction: discord.Interaction):
+        """Bot latency and cache metrics (Founder/Co-founder only)."""
+        user_roles = [role.name.lower() for role in getattr(interaction.user, "roles", [])]
+        if not any(role in user_roles for role in ADMIN_ROLES):
+            logger.warning(f"Unauthorized access attempt by {interaction.user.name} ({interaction.user.id}) for metrics command")
+            await interaction.response.send_message("You need to be a Founder or Co-founder to use this command!", ephemeral=True)
+            return
+        await interaction.response.send_message(f"```\n{self.render()}\n```", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(BotMetrics(bot))
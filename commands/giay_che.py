@@ -5,6 +5,9 @@ import os
 import logging
 from datetime import datetime
 
+from services.ledger import KIND_GIAYCHE
+from services.records import record_and_mirror
+
 logger = logging.getLogger(__name__)
 
 
@@ -50,43 +53,33 @@ class GiayChe(commands.Cog):
         )
 
         # Compose log text for the central log channel (plain name)
-        timestamp = datetime.utcnow().strftime("%d/%m/%Y")
-        log_text = f"{target.mention} bị ghi giấy chê bởi {sender_name} vào ngày {timestamp}. Lý do: {ly_do}"
-
-        # Send log to central channel
-        try:
-            log_channel = self.bot.get_channel(1426956645342384190)
-            if log_channel is None:
-                try:
-                    log_channel = await self.bot.fetch_channel(1426956645342384190)
-                except Exception:
-                    log_channel = None
-
-            if log_channel is not None:
-                try:
-                    await log_channel.send(log_text)
-                    logger.info(f"Logged giayche to {log_channel.id}: {log_text}")
-                except Exception as e:
-                    logger.error(f"Failed to send giayche log to channel: {e}")
-            else:
-                logger.error("Log channel for giayche not found")
-        except Exception as e:
-            logger.exception(f"Unexpected error while logging giayche: {e}")
+        now = datetime.utcnow()
+        timestamp = now.strftime("%d/%m/%Y")
+        record_and_mirror(
+            self.bot.ledger,
+            self.bot.log_outbox,
+            KIND_GIAYCHE,
+            target.mention,
+            f"{target.mention} bị ghi giấy chê bởi {sender_name} vào ngày {timestamp}. Lý do: {ly_do}",
+            target_id=target.id,
+            sender_name=sender_name,
+            sender_id=sender.id,
+            when=now,
+            reason=ly_do,
+        )
 
-        files = []
-        try:
-            if os.path.exists(self.IMAGE_PATH):
-                files = [discord.File(self.IMAGE_PATH)]
-            else:
-                logger.warning(f"Giay che image not found at {self.IMAGE_PATH}")
-        except Exception as e:
-            logger.warning(f"Failed to load giay che image: {e}")
+        # The image is uploaded once, then shown from its CDN link (services.assets)
+        assets = self.bot.assets
 
         sent = False
         # If we successfully deferred, prefer followup
         if deferred:
             try:
-                await interaction.followup.send(content=message_text, files=files)
+                await assets.send(
+                    lambda **kw: interaction.followup.send(wait=True, **kw),
+                    message_text,
+                    self.IMAGE_PATH,
+                )
                 sent = True
             except Exception as e:
                 logger.warning(f"Followup send failed, will attempt channel send: {e}")
@@ -109,10 +102,7 @@ class GiayChe(commands.Cog):
 
             if ch is not None and isinstance(ch, discord.abc.Messageable):
                 try:
-                    if files:
-                        await ch.send(content=message_text, files=files)
-                    else:
-                        await ch.send(content=message_text)
+                    await assets.send(ch.send, message_text, self.IMAGE_PATH)
                     sent = True
                 except Exception as e:
                     logger.error(f"Channel fallback send failed: {e}")
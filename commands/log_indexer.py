@@ -0,0 +1,239 @@
+import discord
+from discord.ext import commands
+import asyncio
+import logging
+
+from services.log_parser import parse_line
+from services.scan_planner import plan_window
+
+logger = logging.getLogger(__name__)
+
+# Channel that mirrors every phiếu / giấy chê / mentee record
+LOG_CHANNEL_ID = 1426956645342384190
+# Ledger meta key holding the id of the newest log message already indexed
+CHECKPOINT_KEY = "log_checkpoint"
+
+
+class LogIndexer(commands.Cog):
+    """Keep the ledger (and `bot.log_index`) in sync with the log channel.
+
+    Live changes arrive through `on_message`, `on_raw_message_edit` and
+    `on_raw_message_delete`. The id of the newest message seen is persisted as a
+    checkpoint, so after a restart only `history(after=checkpoint)` is backfilled
+    instead of rescanning the whole channel.
+
+    With several processes only the primary backfills, catches up after a
+    disconnect and moves the checkpoint; the others still index the live
+    events they receive, and see the primary's imports through the ledger's
+    `data_version` replay.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._backfill_lock = asyncio.Lock()
+        # Bumped on every disconnect, so a catch-up that started before one
+        # does not clear the stale flag for the gap it never read
+        self._disconnects = 0
+        if bot.primary:
+            # Other processes get the primary's imports through the ledger
+            # change feed, so only the primary reads the channel's history
+            bot.log_index.refresher = self._refresh_newest_page
+            bot.log_index.window_loader = self._scan_window
+
+    def cog_unload(self):
+        self.bot.log_index.refresher = None
+        self.bot.log_index.window_loader = None
+
+    @property
+    def checkpoint(self) -> int | None:
+        value = self.bot.ledger.get_meta(CHECKPOINT_KEY)
+        return int(value) if value else None
+
+    def _advance_checkpoint(self, message_id: int):
+        # The checkpoint is shared: only the process that backfills moves it
+        if not self.bot.primary:
+            return
+        current = self.checkpoint
+        if current is None or message_id > current:
+            self.bot.ledger.set_meta(CHECKPOINT_KEY, str(message_id))
+
+    def _ingest(self, message_id: int, content: str, created_at) -> int:
+        """Store every record line of a log message. Returns how many were new.
+
+        The log outbox packs several records into one message, one per line.
+        """
+        ledger = self.bot.ledger
+        added = 0
+        for line, text in enumerate((content or "").split("\n")):
+            # One malformed line must not stop a backfill at this message forever
+            try:
+                record = parse_line(text, created_at)
+                if record is None:
+                    continue
+                if ledger.append(
+                    message_id=message_id,
+                    line=line,
+                    created_at=created_at.timestamp(),
+                    **record.to_fields(),
+                ):
+                    added += 1
+                elif record.uid:
+                    # Stored by the writer before it was sent: link it to this message
+                    ledger.attach_message(message_id, {record.uid: line})
+            except Exception as e:
+                logger.warning(f"Skipping log line {message_id}:{line}: {e}")
+        return added
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.bot.primary:
+            # The primary process backfills; its imports reach this process
+            # through the ledger change feed
+            self.bot.log_index.mark_backfilled()
+            return
+        # on_ready also fires on reconnects; the lock keeps one backfill at a time
+        if self._backfill_lock.locked():
+            return
+        async with self._backfill_lock:
+            await self._backfill()
+
+    async def _get_log_channel(self):
+        log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
+        if log_channel is None:
+            log_channel = await self.bot.fetch_channel(LOG_CHANNEL_ID)
+        if not isinstance(log_channel, (discord.TextChannel, discord.Thread)):
+            logger.error(f"Log channel {LOG_CHANNEL_ID} is not a text channel")
+            return None
+        return log_channel
+
+    async def _catch_up(self, log_channel) -> tuple[int, int]:
+        """Import every message after the checkpoint, oldest first, advancing it.
+
+        Clears the stale flag unless the connection dropped again meanwhile.
+        Returns (messages scanned, new records).
+        """
+        disconnects = self._disconnects
+        checkpoint = self.checkpoint
+        after = discord.Object(id=checkpoint) if checkpoint else None
+        scanned = imported = 0
+        # limit=None keeps paging until the newest message
+        async for msg in log_channel.history(
+            limit=None, after=after, oldest_first=True
+        ):
+            scanned += 1
+            imported += self._ingest(msg.id, msg.content, msg.created_at)
+            self._advance_checkpoint(msg.id)
+        if disconnects == self._disconnects:
+            self.bot.log_index.stale = False
+        return scanned, imported
+
+    async def _backfill(self):
+        try:
+            log_channel = await self._get_log_channel()
+            if log_channel is None:
+                return
+
+            checkpoint = self.checkpoint
+            scanned, imported = await self._catch_up(log_channel)
+            self.bot.log_index.mark_backfilled()
+            logger.info(
+                f"Log backfill after {checkpoint}: {imported} new records from {scanned} messages"
+            )
+        except Exception as e:
+            logger.exception(f"Failed to backfill log channel: {e}")
+
+    async def _scan_window(self, since: int | None, until: int | None):
+        """Import only the messages posted in days [since, until] (snowflake-bounded)."""
+        window = plan_window(since, until, self.checkpoint)
+        if window is None:
+            return
+        log_channel = await self._get_log_channel()
+        if log_channel is None:
+            return
+        after, before = window
+        scanned = imported = 0
+        # The checkpoint is left alone: the running backfill still covers the gap
+        async for msg in log_channel.history(
+            limit=None,
+            after=discord.Object(id=after) if after else None,
+            before=discord.Object(id=before) if before else None,
+            oldest_first=True,
+        ):
+            scanned += 1
+            imported += self._ingest(msg.id, msg.content, msg.created_at)
+        logger.info(
+            f"Log window {since}..{until}: {imported} new records from {scanned} messages"
+        )
+
+    async def _refresh_newest_page(self):
+        """Page from the checkpoint to the newest message to cover events missed while disconnected."""
+        if self._backfill_lock.locked():
+            # The running backfill reads up to the newest message itself
+            return
+        async with self._backfill_lock:
+            log_channel = await self._get_log_channel()
+            if log_channel is None:
+                return
+            scanned, imported = await self._catch_up(log_channel)
+            logger.info(
+                f"Log refresh after disconnect: {imported} new records from {scanned} messages"
+            )
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        if not self.bot.primary:
+            # Nothing to catch up here: the ledger change feed carries the
+            # primary's imports to this process
+            return
+        # Live events may be missed until the connection resumes
+        self._disconnects += 1
+        self.bot.log_index.stale = True
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.channel.id != LOG_CHANNEL_ID:
+            return
+        try:
+            self._ingest(message.id, message.content, message.created_at)
+            # Do not skip past messages a running backfill has not reached yet,
+            # nor past ones missed while disconnected that no refresh has read
+            if not self._backfill_lock.locked() and not self.bot.log_index.stale:
+                self._advance_checkpoint(message.id)
+        except Exception as e:
+            logger.exception(f"Failed to index log message {message.id}: {e}")
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if payload.channel_id != LOG_CHANNEL_ID:
+            return
+        content = payload.data.get("content")
+        if content is None:
+            # embed-only update (e.g. link preview), text unchanged
+            return
+        try:
+            ledger = self.bot.ledger
+            ledger.delete_message(payload.message_id)
+            self._ingest(
+                payload.message_id,
+                content,
+                discord.utils.snowflake_time(payload.message_id),
+            )
+        except Exception as e:
+            logger.exception(f"Failed to re-index edited log message: {e}")
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.channel_id != LOG_CHANNEL_ID:
+            return
+        try:
+            removed = self.bot.ledger.delete_message(payload.message_id)
+            if removed:
+                logger.info(
+                    f"Removed {len(removed)} records for deleted log message {payload.message_id}"
+                )
+        except Exception as e:
+            logger.exception(f"Failed to drop deleted log message: {e}")
+
+
+async def setup(bot):
+    await bot.add_cog(LogIndexer(bot))
@@ -0,0 +1,48 @@
+import discord
+from discord.ext import commands
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MemberEvents(commands.Cog):
+    """Keep `bot.member_index` (used by the `user` autocompletes) in sync with member changes."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Indexes built before member chunking finished may be incomplete
+        self.bot.member_index.drop()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.bot.member_index.upsert(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.display_name != after.display_name or before.name != after.name:
+            self.bot.member_index.upsert(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        if before.name == after.name and before.display_name == after.display_name:
+            return
+        for guild in after.mutual_guilds:
+            member = guild.get_member(after.id)
+            if member is not None:
+                self.bot.member_index.upsert(member)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        # Raw: also fires for members that are not in the cache
+        self.bot.member_index.remove(payload.guild_id, payload.user.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.bot.member_index.drop(guild.id)
+
+
+async def setup(bot):
+    await bot.add_cog(MemberEvents(bot))
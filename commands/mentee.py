@@ -5,9 +5,10 @@ import os
 import logging
 from datetime import datetime
 
-logger = logging.getLogger(__name__)
+from services.ledger import KIND_MENTEE_CHE, KIND_MENTEE_KHEN
+from services.records import record_and_mirror
 
-LOG_CHANNEL_ID = 1426956645342384190
+logger = logging.getLogger(__name__)
 
 
 class Mentee(commands.Cog):
@@ -48,7 +49,8 @@ class Mentee(commands.Cog):
         )
 
         target_mention = member.mention
-        timestamp = datetime.utcnow().strftime("%d/%m/%Y")
+        now = datetime.utcnow()
+        timestamp = now.strftime("%d/%m/%Y")
 
         # Require the target to have a role containing 'Room' (case-insensitive)
         has_room_role = any("room" in (r.name or "").lower() for r in member.roles)
@@ -70,38 +72,29 @@ class Mentee(commands.Cog):
 
         # Send log for both 'khen' and 'che' to central log channel with [mentee] tag if allowed
         if do_log:
-            try:
-                log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-                if log_channel is None:
-                    try:
-                        log_channel = await self.bot.fetch_channel(LOG_CHANNEL_ID)
-                    except Exception:
-                        log_channel = None
-
-                if log_channel is not None:
-                    try:
-                        await log_channel.send(f"{log_text}")
-                        logger.info(f"Logged mentee to {LOG_CHANNEL_ID}: {log_text}")
-                    except Exception as e:
-                        logger.error(f"Failed to send mentee log to channel: {e}")
-                else:
-                    logger.error("Log channel for mentee not found")
-            except Exception as e:
-                logger.exception(f"Unexpected error while logging mentee: {e}")
-
-        files = []
-        try:
-            if image_path and os.path.exists(image_path):
-                files = [discord.File(image_path)]
-            else:
-                logger.debug(f"Mentee image not found at {image_path}")
-        except Exception as e:
-            logger.warning(f"Failed to load mentee image: {e}")
+            record_and_mirror(
+                self.bot.ledger,
+                self.bot.log_outbox,
+                KIND_MENTEE_KHEN if loai.value == "khen" else KIND_MENTEE_CHE,
+                member.mention,
+                log_text,
+                target_id=member.id,
+                sender_name=sender_name,
+                sender_id=sender.id,
+                when=now,
+            )
+
+        # The image is uploaded once, then shown from its CDN link (services.assets)
+        assets = self.bot.assets
 
         sent = False
         if deferred:
             try:
-                await interaction.followup.send(content=reply_text, files=files)
+                await assets.send(
+                    lambda **kw: interaction.followup.send(wait=True, **kw),
+                    reply_text,
+                    image_path,
+                )
                 sent = True
             except Exception as e:
                 logger.warning(
@@ -125,10 +118,7 @@ class Mentee(commands.Cog):
 
             if ch is not None and isinstance(ch, discord.abc.Messageable):
                 try:
-                    if files:
-                        await ch.send(content=reply_text, files=files)
-                    else:
-                        await ch.send(content=reply_text)
+                    await assets.send(ch.send, reply_text, image_path)
                     sent = True
                 except Exception as e:
                     logger.error(f"Channel fallback send failed for /mentee: {e}")
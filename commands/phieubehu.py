@@ -6,10 +6,11 @@ import logging
 from datetime import datetime
 import csv
 
-logger = logging.getLogger(__name__)
+from services.ledger import KIND_BEHU
+from services.log_parser import mention_id
+from services.records import record_and_mirror
 
-# Logging destination channel ID for phieubehu records
-LOG_CHANNEL_ID = 1426956645342384190
+logger = logging.getLogger(__name__)
 
 
 class PhieuBeHu(commands.Cog):
@@ -31,49 +32,34 @@ class PhieuBeHu(commands.Cog):
 
         username = ten_nguoi_dung.strip()
         # Only date (day/month/year) as requested
-        timestamp = datetime.utcnow().strftime("%d/%m/%Y")
-
-        # Prepare log message to the designated channel
-        log_channel_id = LOG_CHANNEL_ID
-        log_text = f"{username} đã bị phạt 1 phiếu bé hư vào ngày {timestamp}"
-
-        # Try to send the log message to the specified channel
-        try:
-            log_channel = self.bot.get_channel(log_channel_id)
-            if log_channel is None:
-                # Try fetching the channel
-                try:
-                    log_channel = await self.bot.fetch_channel(log_channel_id)
-                except Exception:
-                    log_channel = None
-
-            if log_channel is not None:
-                try:
-                    await log_channel.send(log_text)
-                    logger.info(
-                        f"Sent phieubehu log to channel {log_channel_id} for {username}"
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to send phieubehu log to channel: {e}")
-            else:
-                logger.error(f"Log channel with ID {log_channel_id} not found")
-        except Exception as e:
-            logger.exception(f"Unexpected error while sending log to channel: {e}")
+        now = datetime.utcnow()
+        timestamp = now.strftime("%d/%m/%Y")
+
+        # Free-text names are matched to a member when exactly one has that name
+        target_id = mention_id(username)
+        if target_id is None and interaction.guild is not None:
+            target_id = await self.bot.member_index.exact(interaction.guild, username)
+        record_and_mirror(
+            self.bot.ledger,
+            self.bot.log_outbox,
+            KIND_BEHU,
+            username,
+            f"{username} đã bị phạt 1 phiếu bé hư vào ngày {timestamp}",
+            target_id=target_id,
+            sender_name=interaction.user.display_name,
+            sender_id=interaction.user.id,
+            when=now,
+        )
 
         reply_text = f"{username} đã được ghi nhận 1 phiếu bé hư"
 
-        files = []
-        try:
-            if os.path.exists(self.ICON_PATH):
-                files = [discord.File(self.ICON_PATH)]
-            else:
-                logger.warning(f"Icon not found at {self.ICON_PATH}")
-        except Exception as e:
-            logger.warning(f"Failed to load icon file: {e}")
-
-        # Send the response
+        # Send the response; the icon is uploaded once, then shown from its CDN link
         try:
-            await interaction.followup.send(reply_text, files=files)
+            await self.bot.assets.send(
+                lambda **kw: interaction.followup.send(wait=True, **kw),
+                reply_text,
+                self.ICON_PATH,
+            )
         except Exception as e:
             logger.error(f"Failed to send followup message: {e}")
             # As final fallback, try to send plain text
@@ -5,10 +5,11 @@ import os
 import logging
 from datetime import datetime
 
-logger = logging.getLogger(__name__)
+from services.ledger import KIND_BENGOAN
+from services.log_parser import mention_id
+from services.records import record_and_mirror
 
-# Logging destination channel ID (reuse same channel)
-LOG_CHANNEL_ID = 1426956645342384190
+logger = logging.getLogger(__name__)
 
 
 class PhieuBeNgoan(commands.Cog):
@@ -28,45 +29,34 @@ class PhieuBeNgoan(commands.Cog):
         await interaction.response.defer()
 
         username = ten_nguoi_dung.strip()
-        timestamp = datetime.utcnow().strftime("%d/%m/%Y")
-
-        log_text = f"{username} đã được tặng 1 phiếu bé ngoan vào ngày {timestamp}"
-
-        # Send log to central channel
-        try:
-            log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-            if log_channel is None:
-                try:
-                    log_channel = await self.bot.fetch_channel(LOG_CHANNEL_ID)
-                except Exception:
-                    log_channel = None
-
-            if log_channel is not None:
-                try:
-                    await log_channel.send(log_text)
-                    logger.info(
-                        f"Sent phieubengoan log to channel {LOG_CHANNEL_ID} for {username}"
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to send phieubengoan log to channel: {e}")
-            else:
-                logger.error(f"Log channel with ID {LOG_CHANNEL_ID} not found")
-        except Exception as e:
-            logger.exception(f"Unexpected error while sending phieubengoan log: {e}")
+        now = datetime.utcnow()
+        timestamp = now.strftime("%d/%m/%Y")
+
+        # Free-text names are matched to a member when exactly one has that name
+        target_id = mention_id(username)
+        if target_id is None and interaction.guild is not None:
+            target_id = await self.bot.member_index.exact(interaction.guild, username)
+        record_and_mirror(
+            self.bot.ledger,
+            self.bot.log_outbox,
+            KIND_BENGOAN,
+            username,
+            f"{username} đã được tặng 1 phiếu bé ngoan vào ngày {timestamp}",
+            target_id=target_id,
+            sender_name=interaction.user.display_name,
+            sender_id=interaction.user.id,
+            when=now,
+        )
 
         reply_text = f"{username} đã được ghi nhận 1 phiếu bé ngoan"
 
-        files = []
-        try:
-            if os.path.exists(self.IMAGE_PATH):
-                files = [discord.File(self.IMAGE_PATH)]
-            else:
-                logger.warning(f"Image not found at {self.IMAGE_PATH}")
-        except Exception as e:
-            logger.warning(f"Failed to load image file: {e}")
-
+        # The image is uploaded once, then shown from its CDN link
         try:
-            await interaction.followup.send(reply_text, files=files)
+            await self.bot.assets.send(
+                lambda **kw: interaction.followup.send(wait=True, **kw),
+                reply_text,
+                self.IMAGE_PATH,
+            )
         except Exception as e:
             logger.error(f"Failed to send followup message: {e}")
             try:
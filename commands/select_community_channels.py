@@ -28,6 +28,7 @@ class SelectCommunityChannels(commands.Cog):
 
             # Set the community channel immediately
             self.bot.community_channels[interaction.guild.id] = [channel]
+            await self.bot.rooms.set_community_channels(interaction.guild.id, [channel.id])
             logger.info(f"Community channel set to {channel.name} ({channel.id}) by {interaction.user.name}")
             
             # Send the response using followup since we deferred
@@ -0,0 +1,35 @@
+import discord
+from discord.ext import commands
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMIN_ROLES = ["founder", "co-founder", "admin"]
+
+
+class SyncCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @discord.app_commands.command(name="sync_commands", description="Force a slash command sync with Discord (Founder/Co-founder only)")
+    async def sync_commands(self, interaction: discord.Interaction):
+        """Force a slash command sync with Discord (Founder/Co-founder only)."""
+        user_roles = [role.name.lower() for role in getattr(interaction.user, "roles", [])]
+        if not any(role in user_roles for role in ADMIN_ROLES):
+            logger.warning(f"Unauthorized access attempt by {interaction.user.name} ({interaction.user.id}) for sync_commands command")
+            await interaction.response.send_message("You need to be a Founder or Co-founder to use this command!", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        logger.info(f"Command sync forced by {interaction.user.name} ({interaction.user.id})")
+        try:
+            count = await self.bot.sync_commands(force=True)
+        except Exception as e:
+            logger.error(f"Forced command sync failed: {e}")
+            await interaction.followup.send(f"Sync failed: {e}", ephemeral=True)
+            return
+        await interaction.followup.send(f"Synced {count} command(s).", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(SyncCommands(bot))
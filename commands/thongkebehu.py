@@ -2,45 +2,25 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import logging
-from datetime import datetime, timedelta, date
-import re
-import io
+from datetime import timedelta, date
 
-logger = logging.getLogger(__name__)
-
-# Channel that stores phieubehu logs
-LOG_CHANNEL_ID = 1426956645342384190
-# How many messages to scan from the log channel (safety limit)
-MAX_MESSAGES_SCAN = 2000
-
-import discord
-from discord.ext import commands
-from discord import app_commands
-import logging
-from datetime import datetime, timedelta, date
-import re
-import io
+from services.ledger import KIND_BEHU, normalize_period
+from services.records import collect_rollups
+from services.report_cache import Report, ReportScope
 
 logger = logging.getLogger(__name__)
 
-# Channel that stores phieubehu logs
-LOG_CHANNEL_ID = 1426956645342384190
-# How many messages to scan from the log channel (safety limit)
-MAX_MESSAGES_SCAN = 2000
-
 
 class ThongKeBeHu(commands.Cog):
     """Provide `/thongkebehu` to aggregate phieubehu counts per user by week/month.
 
-    The cog scans recent messages in the configured log channel and looks for lines
-    matching the bot's log format (e.g. "<username> đã bị phạt 1 phiếu bé hư vào ngày DD/MM/YYYY").
+    Counts come from the ledger's per-user week/month rollups, which are updated as
+    `/phieubehu` appends records, instead of re-scanning the log channel on every call.
     Results are grouped by ISO week (year, week number) or by month when requested.
     """
 
     def __init__(self, bot):
         self.bot = bot
-        # precompile mention pattern to detect <@123...> style mentions
-        self._mention_re = re.compile(r"<@!?(?P<id>\d+)>")
 
     async def _week_autocomplete(self, interaction: discord.Interaction, current: str):
         choices = []
@@ -75,166 +55,45 @@ class ThongKeBeHu(commands.Cog):
             guild = interaction.guild
             if not guild:
                 return choices
-            prefix = (current or "").lower()
-            for member in guild.members:
-                display = member.display_name
-                if prefix in display.lower() or prefix in member.name.lower():
-                    choices.append(
-                        app_commands.Choice(name=f"{display}", value=str(member.id))
-                    )
-                if len(choices) >= 25:
-                    break
+            # Indexed, diacritic-insensitive lookup (see services.member_index)
+            for member_id, display in self.bot.member_index.search(guild, current or ""):
+                choices.append(
+                    app_commands.Choice(name=f"{display}", value=str(member_id))
+                )
         except Exception:
             pass
         return choices
 
-    @app_commands.command(
-        name="thongkebehu", description="Thống kê số phiếu bé hư theo tuần/tháng"
-    )
-    @app_commands.autocomplete(
-        week=_week_autocomplete, month=_month_autocomplete, user=_user_autocomplete
-    )
-    async def thongkebehu(
+    async def _collect(
         self,
-        interaction: discord.Interaction,
-        week: str | None = None,
-        month: str | None = None,
-        user: str | None = None,
-    ):
-        """If `week` is provided (format YYYY-Www) it filters that week. If `month` provided (YYYY-MM) it aggregates by month. `user` is member id string to filter specific user."""
-        await interaction.response.defer(thinking=True)
-
-        # Try to get the log channel
-        try:
-            log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-            if log_channel is None:
-                log_channel = await self.bot.fetch_channel(LOG_CHANNEL_ID)
-        except Exception as e:
-            logger.exception(f"Cannot access log channel {LOG_CHANNEL_ID}: {e}")
-            await interaction.followup.send(
-                f"Không thể truy cập kênh log (ID {LOG_CHANNEL_ID})."
-            )
-            return
-
-        # Ensure channel is messageable
-        if not isinstance(log_channel, (discord.TextChannel, discord.Thread)):
-            await interaction.followup.send(
-                "Kênh log không phải là kênh text/thread hợp lệ."
-            )
-            return
-
-        # Regex to match log lines. Accept slight variations.
-        pattern = re.compile(
-            r"(?P<username>.+?)\s+đã (?:bị phạt|được ghi nhận).*?phiếu bé hư(?:.*vào(?:ngày|lúc)?\s*(?P<date>\d{1,2}/\d{1,2}/\d{4}))?",
-            re.I,
+        guild: discord.Guild | None,
+        granularity: str,
+        period: str | None,
+        user: str | None,
+    ) -> tuple[dict, int]:
+        return await collect_rollups(
+            self.bot.log_index, self.bot.ledger, KIND_BEHU, guild, granularity, period, user
         )
 
-        counts: dict = {}  # {('week'/'month', year, num): {username: count}}
-        scanned = 0
-
-        try:
-            async for msg in log_channel.history(limit=MAX_MESSAGES_SCAN):
-                scanned += 1
-                content = (msg.content or "").strip()
-                if not content:
-                    continue
-                m = pattern.search(content)
-                if not m:
-                    continue
-
-                username = m.group("username").strip()
-                date_str = m.group("date")
-                if date_str:
-                    try:
-                        dt = datetime.strptime(date_str, "%d/%m/%Y")
-                    except Exception:
-                        # skip malformed dates
-                        continue
-                else:
-                    dt = msg.created_at
-
-                # Apply filters: if user param provided, try to resolve and filter
-                if user:
-                    try:
-                        uid = int(user)
-                        member = (
-                            interaction.guild.get_member(uid)
-                            if interaction.guild
-                            else None
-                        )
-                        if member:
-                            # compare by display name or username or mention in content
-                            if (
-                                member.display_name != username
-                                and member.name != username
-                                and f"<@{uid}>" not in content
-                                and f"<@!{uid}>" not in content
-                            ):
-                                continue
-                        else:
-                            # if member cannot be resolved, check if uid string or mention exists in content
-                            if (
-                                str(uid) not in content
-                                and f"<@{uid}>" not in content
-                                and f"<@!{uid}>" not in content
-                            ):
-                                continue
-                    except Exception:
-                        # if parsing fails, ignore user filter
-                        pass
-
-                # Determine grouping key
-                if month:
-                    try:
-                        y_s, m_s = month.split("-")
-                        yv = int(y_s)
-                        mv = int(m_s)
-                    except Exception:
-                        yv = dt.year
-                        mv = dt.month
-                    key = ("month", yv, mv)
-                else:
-                    yv, wk, _ = dt.isocalendar()
-                    # If week param provided, skip non-matching weeks
-                    if week:
-                        try:
-                            wparts = week.split("-W")
-                            wy = int(wparts[0])
-                            ww = int(wparts[1])
-                            if not (wy == yv and ww == wk):
-                                continue
-                        except Exception:
-                            pass
-                    key = ("week", yv, wk)
-
-                counts.setdefault(key, {})
-                counts[key][username] = counts[key].get(username, 0) + 1
-        except Exception as e:
-            logger.exception(f"Error while scanning log channel: {e}")
-            await interaction.followup.send("Lỗi khi đọc dữ liệu từ kênh log.")
-            return
+    async def _build_report(
+        self,
+        guild: discord.Guild | None,
+        granularity: str,
+        period: str | None,
+        user: str | None,
+    ) -> Report:
+        counts, scanned = await self._collect(guild, granularity, period, user)
 
         if not counts:
-            await interaction.followup.send(
-                "Không tìm thấy bản ghi phiếu bé hư trong kênh log."
-            )
-            return
+            return Report(content="Không tìm thấy bản ghi phiếu bé hư.")
+
+        # Resolve all mentions in one batch; the text report and embeds share the names
+        names = await self.bot.names.resolve(
+            guild, {uname for users in counts.values() for uname in users}
+        )
 
-        # Helper to display a plain name (no mention tags). If the stored username contains a mention (<@...>), try to resolve it to a display name.
         def _display_name(raw_name: str) -> str:
-            if not raw_name:
-                return raw_name
-            m = self._mention_re.search(raw_name)
-            if m and interaction.guild:
-                try:
-                    mid = int(m.group("id"))
-                    member = interaction.guild.get_member(mid) or self.bot.get_user(mid)
-                    if member:
-                        return getattr(member, "display_name", str(member))
-                except Exception:
-                    pass
-            # fallback: remove angle brackets and @ symbols
-            return re.sub(r"[<>]", "", raw_name).replace("@", "")
+            return names.get(raw_name, raw_name)
 
         # Build report text
         lines: list[str] = []
@@ -266,7 +125,7 @@ class ThongKeBeHu(commands.Cog):
 
         # Prepare embed(s) to send to the invoking channel (make it pretty)
         embed = discord.Embed(title="Thống kê phiếu bé hư", color=0xE74C3C)
-        embed.set_footer(text=f"Quét {scanned} tin nhắn từ kênh log")
+        embed.set_footer(text=f"Tổng hợp từ {scanned} bản ghi")
 
         # Add fields per group (limit characters per embed field)
         for key in sorted(counts.keys(), reverse=True):
@@ -290,32 +149,58 @@ class ThongKeBeHu(commands.Cog):
             value = "\n".join(short_lines) if short_lines else "Không có"
             embed.add_field(name=header, value=value, inline=False)
 
-        # If embed is small enough, send it directly to the invoking channel
-        try:
-            if sum(len(field.value or "") for field in embed.fields) < 3500:
-                await interaction.followup.send(embed=embed)
+        # If embed is small enough, send it on its own
+        if sum(len(field.value or "") for field in embed.fields) < 3500:
+            return Report(embed=embed)
+
+        # Too big: attach full report with a compact embed of the top 3 groups
+        compact = discord.Embed(
+            title="Thống kê phiếu bé hư (tóm tắt)", color=0xE74C3C
+        )
+        compact.set_footer(text=f"Tổng hợp từ {scanned} bản ghi")
+        for key in sorted(counts.keys(), reverse=True)[:3]:
+            kind, year, num = key
+            users = sorted(
+                counts[key].items(), key=lambda kv: kv[1], reverse=True
+            )
+            top = ", ".join([f"{_display_name(u)}:{c}" for u, c in users[:5]])
+            if kind == "week":
+                name = f"{year}-W{num}"
             else:
-                # Too big: attach full report and send a summary embed
-                bio = io.BytesIO(report.encode("utf-8"))
-                bio.seek(0)
-                file = discord.File(bio, filename="thongke_behu.txt")
-                # Create a compact embed with top 3 groups
-                compact = discord.Embed(
-                    title="Thống kê phiếu bé hư (tóm tắt)", color=0xE74C3C
-                )
-                compact.set_footer(text=f"Quét {scanned} tin nhắn từ kênh log")
-                for key in sorted(counts.keys(), reverse=True)[:3]:
-                    kind, year, num = key
-                    users = sorted(
-                        counts[key].items(), key=lambda kv: kv[1], reverse=True
-                    )
-                    top = ", ".join([f"{_display_name(u)}:{c}" for u, c in users[:5]])
-                    if kind == "week":
-                        name = f"{year}-W{num}"
-                    else:
-                        name = f"{year}-{num:02d}"
-                    compact.add_field(name=name, value=top or "Không có", inline=False)
-                await interaction.followup.send(embed=compact, file=file)
+                name = f"{year}-{num:02d}"
+            compact.add_field(name=name, value=top or "Không có", inline=False)
+        return Report(embed=compact, attachment=report, filename="thongke_behu.txt")
+
+    @app_commands.command(
+        name="thongkebehu", description="Thống kê số phiếu bé hư theo tuần/tháng"
+    )
+    @app_commands.autocomplete(
+        week=_week_autocomplete, month=_month_autocomplete, user=_user_autocomplete
+    )
+    async def thongkebehu(
+        self,
+        interaction: discord.Interaction,
+        week: str | None = None,
+        month: str | None = None,
+        user: str | None = None,
+    ):
+        """If `week` is provided (format YYYY-Www) it filters that week. If `month` provided (YYYY-MM) it aggregates by month. `user` is member id string to filter specific user."""
+        await interaction.response.defer(thinking=True)
+
+        granularity = "month" if month else "week"
+        period = normalize_period(week, month)
+        user = (user or "").strip() or None
+        try:
+            uid = int(user) if user else None
+        except ValueError:
+            uid = None
+        try:
+            report = await self.bot.report_cache.get(
+                ("thongkebehu", interaction.guild_id, granularity, period, user),
+                ReportScope((KIND_BEHU,), (period,) if period else None, uid),
+                lambda: self._build_report(interaction.guild, granularity, period, user),
+            )
+            await interaction.followup.send(**report.send_kwargs())
         except Exception as e:
             logger.exception(f"Failed to send statistics: {e}")
             await interaction.followup.send("Không thể gửi thống kê do lỗi nội bộ.")
@@ -1,20 +1,44 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import importlib.util
 import logging
 import tempfile
 import os
 from typing import List, Optional
 
+from services.member_index import all_members
+
 logger = logging.getLogger(__name__)
 
-try:
+
+
+def _have_openpyxl() -> bool:
+    """Whether openpyxl is installed, without paying for its import."""
+    if importlib.util.find_spec("openpyxl") is None:
+        logger.warning("openpyxl not installed. Install with: pip install openpyxl")
+        return False
+    return True
+
+
+def _load_openpyxl():
+    """Import openpyxl on first use (slow to import, and /validity is rare)."""
     import openpyxl
 
-    HAVE_OPENPYXL = True
-except ImportError:
-    HAVE_OPENPYXL = False
-    logger.warning("openpyxl not installed. Install with: pip install openpyxl")
+    return openpyxl
+
+
+async def _fail_deferred(interaction: discord.Interaction, message: str):
+    """Report an error privately after a public defer.
+
+    The first followup replaces the public "thinking" reply and ignores
+    `ephemeral`, so that reply is deleted first.
+    """
+    try:
+        await interaction.delete_original_response()
+    except discord.HTTPException as e:
+        logger.warning(f"Failed to delete deferred validity reply: {e}")
+    await interaction.followup.send(message, ephemeral=True)
 
 
 class Validity(commands.Cog):
@@ -28,7 +52,8 @@ class Validity(commands.Cog):
     async def validity(
         self, interaction: discord.Interaction, file: discord.Attachment
     ):
-        if not HAVE_OPENPYXL:
+        # Checks that need no I/O answer before the defer, so their errors stay private
+        if not _have_openpyxl():
             await interaction.response.send_message(
                 "Chưa cài đặt openpyxl. Hãy chạy: pip install openpyxl", ephemeral=True
             )
@@ -40,8 +65,17 @@ class Validity(commands.Cog):
             )
             return
 
+        if not interaction.guild:
+            await interaction.response.send_message(
+                "Lệnh này chỉ dùng được trong server", ephemeral=True
+            )
+            return
+
+        # Acknowledge first: the first import of openpyxl can outlast the 3s window
         await interaction.response.defer()
 
+        openpyxl = _load_openpyxl()
+
         # Download and read Excel file
         excel_names = set()
         with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
@@ -58,9 +92,7 @@ class Validity(commands.Cog):
                 wb.close()
             except Exception as e:
                 logger.error(f"Failed to read Excel file: {e}")
-                await interaction.followup.send(
-                    f"Lỗi khi đọc file Excel: {str(e)}", ephemeral=True
-                )
+                await _fail_deferred(interaction, f"Lỗi khi đọc file Excel: {str(e)}")
                 return
             finally:
                 try:
@@ -68,17 +100,12 @@ class Validity(commands.Cog):
                 except Exception:
                     pass
 
-        if not interaction.guild:
-            await interaction.followup.send(
-                "Lệnh này chỉ dùng được trong server", ephemeral=True
-            )
-            return
-
         # Get all members
         members_no_roles = []
         members_not_in_excel = []
 
-        for member in interaction.guild.members:
+        # Danh sách đầy đủ (lấy từ gateway nếu cache chưa có hết thành viên)
+        for member in await all_members(interaction.guild):
             member_name = member.display_name.lower()
 
             # Check for no roles (except @everyone)
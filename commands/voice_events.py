@@ -1,42 +1,180 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
 import asyncio
+import sys
 import time
 
+from services.admission import AdmissionQueue
+from services.rest_scheduler import Lane
+from services.room_reaper import RoomReaper
+
 logger = logging.getLogger(__name__)
 
+# Startup cleanup deletes orphaned channels this many at a time
+DELETE_BATCH_SIZE = 4
+DELETE_BATCH_INTERVAL = 1.0
+# Seconds between bookkeeping passes (cooldowns, locks, stale pairs)
+MAINTENANCE_INTERVAL = 300
+
 
 class VoiceEvents(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.user_cooldowns = {}  # Track user cooldowns to prevent spam
         self.creating_for_users = set()  # Track users currently having channels created
-        self.user_locks = {}  # Per-user locks để cho phép nhiều user tạo cùng lúc
+        # Hàng đợi theo guild: giới hạn số phòng tạo cùng lúc, ai vào trước được trước
+        self.admission = AdmissionQueue()
         self.channels_being_created = (
             {}
         )  # Track channels being created: {user_id: creation_time}
+        self._reconciled = False
+        self._missing_channels = set()
+        # Một timer xóa cho mỗi phòng rỗng, hủy khi có người vào lại
+        self.reaper = RoomReaper(self._delete_rooms)
+
+    async def cog_load(self):
+        self.maintenance.start()
+
+    async def cog_unload(self):
+        self.maintenance.cancel()
+        self.reaper.cancel_all()
+
+    @tasks.loop(seconds=MAINTENANCE_INTERVAL)
+    async def maintenance(self):
+        """Periodic bookkeeping so per-user and per-room state stays bounded."""
+        await self.cleanup_stale_creations()
+        self.prune_channel_pairs()
+        logger.info(f"Voice bookkeeping: {self.memory_report()}")
+
+    @maintenance.before_loop
+    async def before_maintenance(self):
+        # get_channel is only meaningful once the guild cache is filled
+        await self.bot.wait_until_ready()
+
+    @maintenance.error
+    async def maintenance_error(self, error):
+        logger.error(f"Voice bookkeeping failed: {error}")
+
+    def prune_channel_pairs(self):
+        """Forget rooms whose channels vanished without a delete event we saw."""
+        # Both ids of a pair are keys; one pass over a snapshot covers voice and text
+        missing = {
+            channel_id
+            for channel_id in list(self.bot.channel_pairs)
+            if self.bot.get_channel(channel_id) is None
+        }
+        # A channel just created may not be cached yet: only drop entries that
+        # were already missing on the previous pass
+        stale = missing & self._missing_channels
+        self._missing_channels = missing - stale
+        for channel_id in stale:
+            if channel_id in self.bot.channel_pairs:
+                self.bot.rooms.drop_pair(channel_id)
+                self.bot.room_pool.forget(channel_id)
+        if stale:
+            logger.info(f"Pruned {len(stale)} stale channel pair entries")
+
+    def memory_report(self) -> str:
+        """Entries and shallow container size of each bookkeeping structure."""
+        structures = {
+            "creating_for_users": self.creating_for_users,
+            "channels_being_created": self.channels_being_created,
+            "channel_pairs": self.bot.channel_pairs,
+            "room_owners": self.bot.rooms.by_owner,
+        }
+        return ", ".join(
+            f"{name}={len(value)} ({sys.getsizeof(value) / 1024:.1f} KiB)"
+            for name, value in structures.items()
+        )
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready also fires after reconnects; reconcile once per process
+        if self._reconciled:
+            return
+        self._reconciled = True
+        for guild in self.bot.guilds:
+            try:
+                await self.reconcile(guild)
+            except Exception as e:
+                logger.error(f"Failed to reconcile rooms for {guild.name}: {e}")
+
+    async def reconcile(self, guild):
+        """Match the persisted rooms and community channels against live channels.
+
+        One pass over the stored entries (each a `get_channel` dict lookup): rooms
+        with people in them are reattached, empty or half-deleted rooms are
+        deleted in rate-limited batches, and entries for vanished channels are
+        dropped.
+        """
+        rooms = self.bot.rooms
+
+        stored_ids = await rooms.community_channel_ids(guild.id)
+        community = [
+            ch
+            for ch in map(guild.get_channel, stored_ids)
+            if isinstance(ch, discord.VoiceChannel)
+        ]
+        if community:
+            self.bot.community_channels[guild.id] = community
+        if len(community) != len(stored_ids):
+            await rooms.set_community_channels(guild.id, [ch.id for ch in community])
+
+        reattached = 0
+        orphans = []
+        for row in await rooms.stored_rooms(guild.id):
+            voice = guild.get_channel(row["voice_id"])
+            text = guild.get_channel(row["text_id"]) if row["text_id"] else None
+            if isinstance(voice, discord.VoiceChannel) and voice.members:
+                rooms.attach(guild.id, row["voice_id"], row["text_id"], row["owner_id"])
+                reattached += 1
+                continue
+            rooms.drop_pair(row["voice_id"], guild.id)
+            orphans.extend(ch for ch in (voice, text) if ch is not None)
+
+        await self._delete_channels(orphans)
+        logger.info(
+            f"Reconciled rooms for {guild.name}: {reattached} reattached,"
+            f" {len(orphans)} orphaned channels deleted, {len(community)} community channels"
+        )
+
+        # Spares from the previous run were just deleted as ownerless rooms
+        for category in {ch.category for ch in community}:
+            self.bot.room_pool.replenish(guild, category)
+
+    def _rest(self, lane, kind, guild, factory):
+        """Queue a channel/member call on the bot's REST scheduler."""
+        return self.bot.rest.run(lane, (kind, guild.id), factory)
+
+    async def _delete_channels(self, channels, reason="Noema: orphaned room"):
+        """Delete channels a few at a time so a large cleanup stays under the rate limit."""
+        for i in range(0, len(channels), DELETE_BATCH_SIZE):
+            batch = channels[i : i + DELETE_BATCH_SIZE]
+            results = await asyncio.gather(
+                *(
+                    self._rest(
+                        Lane.DELETE, "delete", ch.guild, lambda ch=ch: ch.delete(reason=reason)
+                    )
+                    for ch in batch
+                ),
+                return_exceptions=True,
+            )
+            for ch, result in zip(batch, results):
+                if isinstance(result, Exception) and not isinstance(
+                    result, discord.NotFound
+                ):
+                    logger.warning(f"Failed to delete channel {ch.name}: {result}")
+            if i + DELETE_BATCH_SIZE < len(channels):
+                await asyncio.sleep(DELETE_BATCH_INTERVAL)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
+        if after.channel is not None and after.channel != before.channel:
+            # Có người vào lại phòng đang chờ xóa
+            self.reaper.cancel(after.channel.id)
+
         # User joins a voice channel
         if before.channel is None and after.channel is not None:
-            # Kiểm tra xem user đã đang trong quá trình tạo channel chưa
-            if member.id in self.creating_for_users:
-                logger.info(
-                    f"User {member.name} is already creating channels, ignoring"
-                )
-                return
-
-            # Anti-spam: Check cooldown
-            current_time = time.time()
-            if member.id in self.user_cooldowns:
-                if (
-                    current_time - self.user_cooldowns[member.id] < 2
-                ):  # 2 second cooldown
-                    logger.info(f"User {member.name} is on cooldown, ignoring join")
-                    return
-
             logger.info(
                 f"User {member.name} ({member.id}) joined voice channel {after.channel.name} ({after.channel.id})"
             )
@@ -58,27 +196,35 @@ class VoiceEvents(commands.Cog):
                 f"User {member.name} joined community channel {after.channel.name}"
             )
 
-            # Tạo per-user lock nếu chưa có
-            if member.id not in self.user_locks:
-                self.user_locks[member.id] = asyncio.Lock()
+            # Kiểm tra xem user đã đang trong quá trình tạo channel chưa
+            # (check + add không có await ở giữa nên không cần lock)
+            if member.id in self.creating_for_users:
+                logger.info(
+                    f"User {member.name} is already creating channels, ignoring"
+                )
+                return
+            self.creating_for_users.add(member.id)
 
-            # Sử dụng per-user lock để cho phép nhiều user tạo cùng lúc
-            async with self.user_locks[member.id]:
-                # Double-check để tránh race condition
-                if member.id in self.creating_for_users:
+            try:
+                # Fast path: đã có phòng riêng thì move luôn, không phải xếp hàng
+                if await self._move_to_own_room(member):
                     return
 
-                self.creating_for_users.add(member.id)
-                self.user_cooldowns[member.id] = current_time
-
-                try:
+                async with self.admission.admit(member.guild.id):
+                    # User có thể đã rời lobby trong lúc chờ
+                    if member.voice is None or member.voice.channel != after.channel:
+                        self.admission.stats["left_while_waiting"] += 1
+                        logger.info(
+                            f"User {member.name} left {after.channel.name} while queued, skipping"
+                        )
+                        return
                     await self._create_user_room(member, after.channel)
-                finally:
-                    # Luôn remove khỏi creating_for_users
-                    self.creating_for_users.discard(member.id)
+            finally:
+                # Luôn remove khỏi creating_for_users
+                self.creating_for_users.discard(member.id)
 
-        # User leaves a voice channel
-        elif before.channel is not None and after.channel is None:
+        # User leaves (or moves out of) a voice channel
+        if before.channel is not None and after.channel != before.channel:
             # Chỉ xử lý nếu là auto-created channels (có trong pairs)
             if (
                 len(before.channel.members) == 0
@@ -87,95 +233,15 @@ class VoiceEvents(commands.Cog):
                 logger.info(
                     f"Auto-created channel {before.channel.name} is empty, scheduling deletion"
                 )
-                # Sử dụng asyncio.create_task để không block event handler
-                asyncio.create_task(
-                    self._cleanup_empty_room(before.channel, member.guild)
-                )
+                self.reaper.schedule(member.guild, before.channel.id)
 
     async def _create_user_room(self, member, community_channel):
         """Tạo room riêng cho user một cách tối ưu"""
         category = community_channel.category
 
-        # Kiểm tra toàn diện để tránh duplicate:
-        # 1. Channels có tên giống user
-        # 2. Channels đã được track trong pairs
-        # 3. Channels còn tồn tại và không rỗng
-        existing_voice_channels = []
-
-        for ch in member.guild.channels:
-            if (
-                isinstance(ch, discord.VoiceChannel)
-                and ch.name == member.display_name
-                and (ch.id in self.bot.channel_pairs or ch.category == category)
-            ):
-                existing_voice_channels.append(ch)
-
-        # Lọc channels còn hoạt động
-        active_voice_channels = []
-        for ch in existing_voice_channels:
-            try:
-                # Refresh channel info
-                updated_ch = member.guild.get_channel(ch.id)
-                if updated_ch and isinstance(updated_ch, discord.VoiceChannel):
-                    active_voice_channels.append(updated_ch)
-            except:
-                continue
-
-        if active_voice_channels:
-            # Ưu tiên channel có user ít nhất hoặc rỗng
-            target_channel = min(active_voice_channels, key=lambda ch: len(ch.members))
-            logger.info(
-                f"User {member.display_name} already has personal rooms, moving to existing: {target_channel.name}"
-            )
-            try:
-                await member.move_to(target_channel)
-                logger.info(f"Moved {member.name} to existing personal room")
-                return
-            except Exception as e:
-                logger.warning(f"Failed to move {member.name} to existing room: {e}")
-                # Nếu không move được, vẫn tiếp tục tạo room mới
-
-        # Kiểm tra thêm: có ai đang tạo room cùng tên không?
-        potential_duplicates = [
-            ch
-            for ch in member.guild.channels
-            if ch.name == member.display_name and ch.category == category
-        ]
-
-        if potential_duplicates:
-            logger.info(
-                f"Found potential duplicate channels for {member.display_name}, attempting to use existing"
-            )
-            voice_ch = next(
-                (
-                    ch
-                    for ch in potential_duplicates
-                    if isinstance(ch, discord.VoiceChannel)
-                ),
-                None,
-            )
-            if voice_ch:
-                try:
-                    await member.move_to(voice_ch)
-                    # Thêm vào pairs nếu chưa có
-                    text_ch = next(
-                        (
-                            ch
-                            for ch in potential_duplicates
-                            if isinstance(ch, discord.TextChannel)
-                        ),
-                        None,
-                    )
-                    if text_ch and voice_ch.id not in self.bot.channel_pairs:
-                        self.bot.channel_pairs[voice_ch.id] = text_ch.id
-                        self.bot.channel_pairs[text_ch.id] = voice_ch.id
-                    logger.info(
-                        f"Successfully used existing room for {member.display_name}"
-                    )
-                    return
-                except Exception as e:
-                    logger.warning(f"Failed to use existing room: {e}")
-                    # Tiếp tục tạo mới nếu không dùng được existing
+        # Phòng riêng có thể vừa được tạo trong lúc chờ trong hàng đợi
+        if await self._move_to_own_room(member):
+            return
 
         # Final check: Ai đó đang tạo channels cho user này không?
         current_time = time.time()
@@ -192,61 +258,81 @@ class VoiceEvents(commands.Cog):
 
         # Mark rằng đang tạo channels cho user này
         self.channels_being_created[member.id] = current_time
+        started = time.monotonic()
 
         try:
-            # Tạo cả 2 channels cùng lúc để giảm thời gian chờ
-            voice_task = member.guild.create_voice_channel(
-                name=f"{member.display_name}", category=category
-            )
+            # Có phòng chờ sẵn: chỉ cần đổi tên, cấp quyền và move
+            if await self._claim_spare_room(member, category, started):
+                return
 
-            text_task = member.guild.create_text_channel(
-                name=f"{member.display_name}", category=category
-            )
+            # Quyền của chủ phòng truyền ngay lúc tạo: không cần edit overwrites sau đó.
+            # Text channel luôn hiển thị trên voice channel trong category, nên không
+            # cần edit position.
+            overwrites = {
+                member: discord.PermissionOverwrite(
+                    manage_channels=True,  # Quyền quản lý kênh
+                    kick_members=True,
+                )
+            }
+            timings = self.bot.room_timings
 
-            # Chạy song song để giảm thời gian
-            voice_channel, text_channel = await asyncio.gather(voice_task, text_task)
+            # Tạo cả 2 channels cùng lúc để giảm thời gian chờ
+            with timings.measure("create"):
+                voice_channel, text_channel = await asyncio.gather(
+                    self._rest(
+                        Lane.CREATE,
+                        "create",
+                        member.guild,
+                        lambda: member.guild.create_voice_channel(
+                            name=f"{member.display_name}",
+                            category=category,
+                            overwrites=overwrites,
+                        ),
+                    ),
+                    self._rest(
+                        Lane.CREATE,
+                        "create",
+                        member.guild,
+                        lambda: member.guild.create_text_channel(
+                            name=f"{member.display_name}",
+                            category=category,
+                            overwrites=overwrites,
+                        ),
+                    ),
+                    return_exceptions=True,
+                )
+            failed = [
+                r for r in (voice_channel, text_channel) if isinstance(r, BaseException)
+            ]
+            if failed:
+                # Không để lại nửa phòng
+                await asyncio.gather(
+                    *(
+                        self._rest(Lane.DELETE, "delete", member.guild, r.delete)
+                        for r in (voice_channel, text_channel)
+                        if not isinstance(r, BaseException)
+                    ),
+                    return_exceptions=True,
+                )
+                raise failed[0]
 
             logger.info(
                 f"Created channels for {member.display_name}: Voice={voice_channel.id}, Text={text_channel.id}"
             )
 
-            # Cấp quyền quản lý kênh cho người tạo phòng
-            try:
-                # Tạo permission overwrites cho người tạo phòng
-                overwrites = {
-                    member: discord.PermissionOverwrite(
-                        manage_channels=True,  # Quyền quản lý kênh
-                        kick_members=True,
-                    )
-                }
-
-                # Áp dụng quyền cho cả voice và text channel
-                await voice_channel.edit(overwrites=overwrites)
-                await text_channel.edit(overwrites=overwrites)
-
-                logger.info(
-                    f"Granted management permissions to {member.display_name} for their channels"
-                )
-            except discord.Forbidden:
-                logger.warning(
-                    f"Failed to grant management permissions to {member.display_name} - insufficient bot permissions"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Error granting permissions to {member.display_name}: {str(e)}"
-                )
-
-            # Chỉ sửa position nếu cần thiết
-            if text_channel.position != voice_channel.position + 1:
-                try:
-                    await text_channel.edit(position=voice_channel.position + 1)
-                except discord.HTTPException:
-                    pass  # Ignore position errors to avoid blocking
-
             # Move user trước khi store channel pairs
             move_success = False
             try:
-                await asyncio.wait_for(member.move_to(voice_channel), timeout=5.0)
+                with timings.measure("move"):
+                    await asyncio.wait_for(
+                        self._rest(
+                            Lane.MOVE,
+                            "move",
+                            member.guild,
+                            lambda: member.move_to(voice_channel),
+                        ),
+                        timeout=5.0,
+                    )
                 logger.info(f"Successfully moved {member.name} to personal room")
                 move_success = True
             except (discord.HTTPException, asyncio.TimeoutError) as e:
@@ -255,9 +341,10 @@ class VoiceEvents(commands.Cog):
 
             # Nếu move thành công thì store channel pairs, nếu không thì xóa channels
             if move_success:
-                # Store channel pairs
-                self.bot.channel_pairs[voice_channel.id] = text_channel.id
-                self.bot.channel_pairs[text_channel.id] = voice_channel.id
+                # Store channel pairs (persisted, see services.rooms)
+                with timings.measure("register"):
+                    self._register_room(member, voice_channel, text_channel)
+                self.bot.room_pool.record(False, time.monotonic() - started)
                 logger.info(
                     f"Successfully created and set up room for {member.display_name}"
                 )
@@ -269,8 +356,8 @@ class VoiceEvents(commands.Cog):
                 try:
                     # Xóa cả 2 channels song song
                     await asyncio.gather(
-                        voice_channel.delete(),
-                        text_channel.delete(),
+                        self._rest(Lane.DELETE, "delete", member.guild, voice_channel.delete),
+                        self._rest(Lane.DELETE, "delete", member.guild, text_channel.delete),
                         return_exceptions=True,
                     )
                     logger.info(f"Cleaned up unused channels for {member.display_name}")
@@ -287,60 +374,140 @@ class VoiceEvents(commands.Cog):
             # Luôn cleanup channels_being_created
             if member.id in self.channels_being_created:
                 del self.channels_being_created[member.id]
+            # Bù lại phòng chờ trong nền
+            self.bot.room_pool.replenish(member.guild, category)
 
-    async def _cleanup_empty_room(self, voice_channel, guild):
-        """Xóa room rỗng một cách tối ưu (chạy trong background)"""
+    def _register_room(self, member, voice_channel, text_channel):
+        """Register a room the member is already in, even if persisting it fails."""
         try:
-            # Đợi 2 giây để đảm bảo user thật sự đã rời
-            await asyncio.sleep(2)
+            self.bot.rooms.add_pair(
+                member.guild.id, voice_channel.id, text_channel.id, member.id
+            )
+        except Exception as e:
+            # Memory is indexed before the store write, so the room is still
+            # tracked and cleaned up by this process; only a restart loses it
+            logger.error(
+                f"Failed to persist room {voice_channel.id} of {member.display_name}: {e}"
+            )
 
-            # Kiểm tra lại xem channel có thật sự rỗng không
-            updated_channel = guild.get_channel(voice_channel.id)
-            if not updated_channel or len(updated_channel.members) > 0:
-                logger.info(
-                    f"Channel {voice_channel.name} is no longer empty, skipping deletion"
+    async def _move_to_own_room(self, member) -> bool:
+        """Move `member` into the room they already own; False if they have none."""
+        # Phòng riêng của user (nếu có): tra theo owner id, O(1)
+        room = self.bot.rooms.room_of(member.guild.id, member.id)
+        if room is None:
+            return False
+        existing = member.guild.get_channel(room[0])
+        if not isinstance(existing, discord.VoiceChannel):
+            # Channel đã bị xóa mà không có event: bỏ khỏi registry
+            self.bot.rooms.drop_pair(room[0])
+            return False
+        logger.info(
+            f"User {member.display_name} already has a personal room, moving to existing: {existing.name}"
+        )
+        try:
+            await self._rest(
+                Lane.MOVE, "move", member.guild, lambda: member.move_to(existing)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to move {member.name} to existing room: {e}")
+            # Nếu không move được, vẫn tiếp tục tạo room mới
+            return False
+        logger.info(f"Moved {member.name} to existing personal room")
+        return True
+
+    async def _claim_spare_room(self, member, category, started) -> bool:
+        """Hand a pre-created spare room to `member`; False when the pool is empty."""
+        spare = self.bot.room_pool.take(member.guild, category)
+        if spare is None:
+            return False
+        voice_channel, text_channel = spare
+        # Replacing the overwrites also lifts the spare's hidden-from-everyone one
+        overwrites = {
+            member: discord.PermissionOverwrite(manage_channels=True, kick_members=True)
+        }
+        timings = self.bot.room_timings
+        try:
+            with timings.measure("claim"):
+                await asyncio.gather(
+                    *(
+                        self._rest(
+                            Lane.CREATE,
+                            "edit",
+                            member.guild,
+                            lambda ch=ch: ch.edit(
+                                name=member.display_name, overwrites=overwrites
+                            ),
+                        )
+                        for ch in (voice_channel, text_channel)
+                    )
                 )
-                return
-
-            # Lấy paired text channel
-            text_channel_id = self.bot.channel_pairs.get(voice_channel.id)
-            text_channel = (
-                guild.get_channel(text_channel_id) if text_channel_id else None
+            with timings.measure("move"):
+                await asyncio.wait_for(
+                    self._rest(
+                        Lane.MOVE, "move", member.guild, lambda: member.move_to(voice_channel)
+                    ),
+                    timeout=5.0,
+                )
+        except (discord.HTTPException, asyncio.TimeoutError) as e:
+            logger.warning(f"Failed to hand spare room to {member.name}: {e}")
+            # Phòng chờ đã lộ tên/quyền một phần: xóa luôn và tạo phòng mới
+            try:
+                self.bot.rooms.drop_pair(voice_channel.id)
+            except Exception as store_error:
+                # Still delete the channels; reconciliation drops the stale entry
+                logger.error(f"Failed to unregister spare room {voice_channel.id}: {store_error}")
+            await asyncio.gather(
+                self._rest(Lane.DELETE, "delete", member.guild, voice_channel.delete),
+                self._rest(Lane.DELETE, "delete", member.guild, text_channel.delete),
+                return_exceptions=True,
             )
+            return False
 
-            # Xóa cả 2 channels song song
-            delete_tasks = []
-            if updated_channel:
-                delete_tasks.append(updated_channel.delete())
-            if text_channel:
-                delete_tasks.append(text_channel.delete())
+        with timings.measure("register"):
+            self._register_room(member, voice_channel, text_channel)
+        self.bot.room_pool.record(True, time.monotonic() - started)
+        logger.info(f"Handed spare room to {member.display_name}")
+        return True
 
-            if delete_tasks:
-                await asyncio.gather(*delete_tasks, return_exceptions=True)
-                logger.info(f"Deleted auto-created room: {voice_channel.name}")
-
-            # Dọn dẹp channel pairs
-            if voice_channel.id in self.bot.channel_pairs:
-                del self.bot.channel_pairs[voice_channel.id]
-            if text_channel_id and text_channel_id in self.bot.channel_pairs:
-                del self.bot.channel_pairs[text_channel_id]
-
-        except discord.Forbidden:
-            logger.error(
-                f"Permission denied to delete channels for {voice_channel.name}"
-            )
-        except Exception as e:
-            logger.error(f"Error deleting channels for {voice_channel.name}: {str(e)}")
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        # A room deleted by hand (or by us) must not be found by its owner again
+        if channel.id in self.bot.channel_pairs:
+            self.bot.rooms.drop_pair(channel.id)
+        self.reaper.cancel(channel.id)
+        self.bot.room_pool.forget(channel.id)
+
+    async def _delete_rooms(self, due):
+        """Delete expired rooms that are still empty, a few rooms at a time.
+
+        `due` is {voice id: guild} from the reaper. Emptiness is checked right
+        before each batch, so a room rejoined while earlier batches were being
+        deleted survives.
+        """
+        rooms = list(due.items())
+        per_batch = max(1, DELETE_BATCH_SIZE // 2)
+        for i in range(0, len(rooms), per_batch):
+            if i:
+                await asyncio.sleep(DELETE_BATCH_INTERVAL)
+            channels = []
+            for voice_id, guild in rooms[i : i + per_batch]:
+                voice_channel = guild.get_channel(voice_id)
+                if voice_channel is not None and voice_channel.members:
+                    continue
+                text_id = self.bot.channel_pairs.get(voice_id)
+                text_channel = guild.get_channel(text_id) if text_id else None
+                # Dọn dẹp channel pairs trước để event delete không phải tra lại
+                self.bot.rooms.drop_pair(voice_id)
+                channels.extend(
+                    ch for ch in (voice_channel, text_channel) if ch is not None
+                )
+            await self._delete_channels(channels, reason="Noema: empty room")
+            if channels:
+                logger.info(f"Deleted {len(channels)} channel(s) of empty rooms")
 
-    async def cleanup_cooldowns(self):
-        """Dọn dẹp các cooldowns và locks cũ (chạy định kỳ)"""
+    async def cleanup_stale_creations(self):
+        """Dọn dẹp các lần tạo phòng bị kẹt (chạy định kỳ)"""
         current_time = time.time()
-        expired_users = [
-            user_id
-            for user_id, timestamp in self.user_cooldowns.items()
-            if current_time - timestamp > 60
-        ]  # Xóa sau 60s
-
         # Cleanup expired channels_being_created (over 30 seconds old)
         expired_creating = [
             user_id
@@ -348,22 +515,12 @@ class VoiceEvents(commands.Cog):
             if current_time - timestamp > 30
         ]
 
-        for user_id in expired_users:
-            if user_id in self.user_cooldowns:
-                del self.user_cooldowns[user_id]
-            if user_id in self.user_locks:
-                del self.user_locks[user_id]
-
         for user_id in expired_creating:
             if user_id in self.channels_being_created:
                 del self.channels_being_created[user_id]
 
-        total_cleaned = len(expired_users) + len(expired_creating)
-        if total_cleaned > 0:
-            logger.info(
-                f"Cleaned up {len(expired_users)} expired cooldowns/locks and {len(expired_creating)} stuck creations"
-            )
-
+        if expired_creating:
+            logger.info(f"Cleaned up {len(expired_creating)} stuck creations")
 
 async def setup(bot):
     await bot.add_cog(VoiceEvents(bot))
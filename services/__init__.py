@@ -0,0 +1,2 @@
+# Services package
+# Shared, non-Cog helpers used by the command modules
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from services.metrics import Rolling
+
+# Room creations running at once per guild (override with NOEMA_ADMISSION_CONCURRENCY)
+ADMISSION_CONCURRENCY = int(os.getenv("NOEMA_ADMISSION_CONCURRENCY", "3"))
+
+
+class AdmissionQueue:
+    """Per-guild admission for community-channel joins that need a new room.
+
+    At most `concurrency` room creations run per guild; further joins wait
+    their turn in arrival order (asyncio semaphores wake waiters FIFO) instead
+    of all hitting the API at once or being dropped. Time spent waiting is
+    kept for p50/p95 reporting.
+    """
+
+    def __init__(self, concurrency: int = ADMISSION_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._slots: dict[int, asyncio.Semaphore] = {}
+        self._waiting: Counter = Counter()
+        self.waits = Rolling()
+        self.stats: Counter = Counter()
+
+    @asynccontextmanager
+    async def admit(self, guild_id: int):
+        slots = self._slots.get(guild_id)
+        if slots is None:
+            slots = self._slots[guild_id] = asyncio.Semaphore(self.concurrency)
+        queued_at = time.monotonic()
+        self._waiting[guild_id] += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._waiting[guild_id] -= 1
+        try:
+            self.waits.add(time.monotonic() - queued_at)
+            self.stats["admitted"] += 1
+            yield
+        finally:
+            slots.release()
+
+    def waiting(self, guild_id: int | None = None) -> int:
+        if guild_id is not None:
+            return self._waiting[guild_id]
+        return sum(self._waiting.values())
+
+    def metrics(self) -> dict:
+        return {
+            "waiting": self.waiting(),
+            "wait": self.waits.summary(),
+            **self.stats,
+        }
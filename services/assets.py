@@ -0,0 +1,152 @@
+import io
+import logging
+import os
+import time
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+ASSET_DIR = "images"
+# Re-upload this long before a signed CDN link expires
+EXPIRY_MARGIN = 3600
+# A cached link is HEAD-checked before reuse at most this often, in seconds
+CHECK_INTERVAL = 600
+CHECK_TIMEOUT = 5
+
+
+def _url_expiry(url: str) -> float | None:
+    """Expiry of a signed Discord CDN link (`ex` is a hex unix time), if it has one."""
+    try:
+        ex = parse_qs(urlparse(url).query).get("ex")
+        return int(ex[0], 16) if ex else None
+    except ValueError:
+        return None
+
+
+class Asset:
+    __slots__ = ("path", "filename", "data", "url", "expires", "checked")
+
+    def __init__(self, path: str, data: bytes):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.data = data
+        self.url: str | None = None
+        self.expires: float | None = None
+        # time.monotonic() of the last successful check of `url`
+        self.checked = 0.0
+
+    def usable_url(self) -> str | None:
+        if self.url is None:
+            return None
+        if self.expires is not None and time.time() > self.expires - EXPIRY_MARGIN:
+            self.url = None
+            return None
+        return self.url
+
+
+class AssetRegistry:
+    """Reaction images read once from `images/` and uploaded at most once.
+
+    The first reply using an image uploads it as an attachment; its CDN URL is
+    kept and later replies show the image in an embed, with no file payload.
+    A dead link in an embed raises no error (the image just does not show), so
+    before reuse the link is HEAD-checked, at most once per `CHECK_INTERVAL`. The
+    image is uploaded again if the link is about to expire, fails that check
+    (e.g. the message carrying the attachment was deleted) or sending the embed
+    fails.
+    """
+
+    def __init__(self, directory: str = ASSET_DIR):
+        self._assets: dict[str, Asset] = {}
+        self.uploads = 0
+        self.reuses = 0
+        self._session: aiohttp.ClientSession | None = None
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError as e:
+            logger.warning(f"Asset directory {directory} not readable: {e}")
+            names = []
+        for name in names:
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path):
+                continue
+            try:
+                with open(path, "rb") as f:
+                    self._assets[os.path.normpath(path)] = Asset(path, f.read())
+            except OSError as e:
+                logger.warning(f"Failed to load asset {path}: {e}")
+        logger.info(f"Loaded {len(self._assets)} image assets from {directory}")
+
+    def get(self, path: str | None) -> Asset | None:
+        if not path:
+            return None
+        return self._assets.get(os.path.normpath(path))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _url_alive(self, url: str) -> bool:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=CHECK_TIMEOUT)
+            )
+        try:
+            async with self._session.head(url, allow_redirects=True) as resp:
+                return resp.status < 400
+        except (aiohttp.ClientError, TimeoutError) as e:
+            logger.warning(f"Failed to check cached image link {url}: {e}")
+            return False
+
+    async def _checked_url(self, asset: Asset) -> str | None:
+        url = asset.usable_url()
+        if url is None or time.monotonic() - asset.checked < CHECK_INTERVAL:
+            return url
+        if await self._url_alive(url):
+            asset.checked = time.monotonic()
+            return url
+        logger.info(f"Cached image link for {asset.filename} is gone, uploading again")
+        asset.url = None
+        return None
+
+    async def send(self, send, content: str, path: str | None):
+        """Call `send(content=..., ...)` with the image at `path` attached or embedded.
+
+        `send` must return the sent message (use `wait=True` for followups).
+        """
+        asset = self.get(path)
+        if asset is None:
+            if path:
+                logger.warning(f"Image asset not found: {path}")
+            return await send(content=content)
+
+        url = await self._checked_url(asset)
+        if url is not None:
+            try:
+                message = await send(
+                    content=content, embed=discord.Embed().set_image(url=url)
+                )
+                self.reuses += 1
+                return message
+            except discord.HTTPException as e:
+                logger.warning(f"Cached image link for {asset.filename} failed: {e}")
+                asset.url = None
+
+        message = await send(
+            content=content,
+            file=discord.File(io.BytesIO(asset.data), filename=asset.filename),
+        )
+        self.uploads += 1
+        attachments = getattr(message, "attachments", None)
+        if attachments:
+            asset.url = attachments[0].url
+            asset.expires = _url_expiry(asset.url)
+            asset.checked = time.monotonic()
+        return message
+
+    def metrics(self) -> dict[str, int]:
+        return {"assets": len(self._assets), "uploads": self.uploads, "reuses": self.reuses}
@@ -0,0 +1,564 @@
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Where the ledger lives on disk (override with NOEMA_LEDGER_PATH)
+LEDGER_PATH = os.getenv("NOEMA_LEDGER_PATH", "noema.db")
+
+# Seconds an append/delete stays in the change feed read by other processes
+CHANGE_RETENTION = 86400
+
+# Record kinds stored in the ledger
+KIND_BEHU = "behu"
+KIND_BENGOAN = "bengoan"
+KIND_GIAYCHE = "giayche"
+KIND_MENTEE_KHEN = "mentee_khen"
+KIND_MENTEE_CHE = "mentee_che"
+MENTEE_KINDS = (KIND_MENTEE_KHEN, KIND_MENTEE_CHE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id          INTEGER PRIMARY KEY,
+    uid         TEXT NOT NULL UNIQUE,
+    kind        TEXT NOT NULL,
+    target_id   INTEGER,
+    target_name TEXT NOT NULL,
+    sender_id   INTEGER,
+    sender_name TEXT,
+    day         INTEGER NOT NULL,
+    reason      TEXT,
+    message_id  INTEGER,
+    line        INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    UNIQUE (message_id, line)
+);
+CREATE INDEX IF NOT EXISTS idx_records_kind_target_day
+    ON records (kind, target_id, day);
+CREATE INDEX IF NOT EXISTS idx_records_kind_day
+    ON records (kind, day);
+CREATE TABLE IF NOT EXISTS rollups (
+    kind        TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    period      TEXT NOT NULL,
+    target_key  TEXT NOT NULL,
+    target_name TEXT NOT NULL,
+    target_id   INTEGER,
+    count       INTEGER NOT NULL,
+    PRIMARY KEY (kind, granularity, period, target_key)
+);
+CREATE TABLE IF NOT EXISTS names (
+    user_id      INTEGER PRIMARY KEY,
+    display_name TEXT NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    seq        INTEGER PRIMARY KEY,
+    uid        TEXT,
+    text       TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    op          TEXT NOT NULL,
+    uid         TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    target_name TEXT NOT NULL,
+    target_id   INTEGER,
+    day         INTEGER NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_COLUMNS = (
+    "uid, kind, target_id, target_name, sender_id, sender_name,"
+    " day, reason, message_id, line, created_at"
+)
+
+
+# Bumped when the rollups table changes shape; older ledgers are rebuilt on open
+ROLLUPS_VERSION = "2"
+
+
+def rollup_key(target_id, target_name: str) -> str:
+    """Rollup identity of a target: its user id, or its name when it never resolved to one."""
+    return str(target_id) if target_id is not None else f"name:{target_name}"
+
+
+def new_uid() -> str:
+    """Identifier for a new record, also carried in its log-line token."""
+    return uuid.uuid4().hex[:16]
+
+
+def day_int(d: date) -> int:
+    """Encode a date as YYYYMMDD so ranges compare as plain integers."""
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def day_from_int(value: int) -> date:
+    return date(value // 10000, value // 100 % 100, value % 100)
+
+
+def period_keys(day: int) -> tuple[str, str]:
+    """Return the (ISO week, month) rollup periods for a YYYYMMDD day, e.g. ("2025-W42", "2025-10")."""
+    y, w, _ = day_from_int(day).isocalendar()
+    return f"{y}-W{w:02d}", f"{day // 10000}-{day // 100 % 100:02d}"
+
+
+def parse_period(period: str) -> tuple[str, int, int]:
+    """Split a rollup period into (granularity, year, week-or-month number)."""
+    if "-W" in period:
+        y_s, w_s = period.split("-W")
+        return "week", int(y_s), int(w_s)
+    y_s, m_s = period.split("-")
+    return "month", int(y_s), int(m_s)
+
+
+def normalize_period(week: str | None, month: str | None) -> str | None:
+    """Canonical rollup period for `YYYY-Www` / `YYYY-MM` command parameters, if valid."""
+    since, _ = period_bounds(week, month)
+    if since is None:
+        return None
+    week_key, month_key = period_keys(since)
+    return month_key if month else week_key
+
+
+def period_bounds(week: str | None, month: str | None) -> tuple[int | None, int | None]:
+    """Translate `YYYY-Www` / `YYYY-MM` command parameters into inclusive day bounds.
+
+    Returns (None, None) when neither is given or the value cannot be parsed.
+    """
+    try:
+        if month:
+            y_s, m_s = month.split("-")
+            first = date(int(y_s), int(m_s), 1)
+            nxt = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+            return day_int(first), day_int(nxt - timedelta(days=1))
+        if week:
+            wy, ww = week.split("-W")
+            start = date.fromisocalendar(int(wy), int(ww), 1)
+            return day_int(start), day_int(start + timedelta(days=6))
+    except Exception:
+        pass
+    return None, None
+
+
+class Ledger:
+    """SQLite store for phiếu / giấy chê / mentee records.
+
+    Writer cogs append one row per record and the log indexer keeps it in sync with
+    the log channel. The Discord log channel stays the human-readable mirror;
+    `message_id`/`line` point back at the mirrored line so re-importing the same
+    message never creates duplicates. Subscribers are told about every change.
+
+    When several bot processes share the file (`shared=True`), every append and
+    deletion is also written to the `changes` feed, and `poll_changes` replays
+    the entries the other processes wrote to this process's subscribers, so
+    their caches stay current too.
+    """
+
+    def __init__(self, path: str = LEDGER_PATH, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        # Autocommit: every append is its own short transaction
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._listeners = []
+        # Change feed position, and the feed entries this process wrote itself
+        self._seen_change = (
+            self._conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+        )
+        self._own_changes: set[int] = set()
+        self._data_version = self._data_version_now()
+        # Ledgers created before rollups existed (or before they were keyed by
+        # user id) get theirs rebuilt once
+        if self.get_meta("rollups_built") != ROLLUPS_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS rollups")
+            self._conn.executescript(_SCHEMA)
+            self.rebuild_rollups()
+            self.set_meta("rollups_built", ROLLUPS_VERSION)
+        logger.info(f"Ledger opened at {path}")
+
+    def close(self):
+        try:
+            self._conn.close()
+        except Exception as e:
+            logger.warning(f"Failed to close ledger: {e}")
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _bump_rollups(self, kind: str, target_name: str, target_id, day: int, delta: int):
+        """Add `delta` to the target's week and month rows.
+
+        Rows are keyed by user id when the target has one, so a member written
+        under several names is counted once; the newest name is kept for display.
+        """
+        week_key, month_key = period_keys(day)
+        target_key = rollup_key(target_id, target_name)
+        for granularity, period in (("week", week_key), ("month", month_key)):
+            self._conn.execute(
+                "INSERT INTO rollups"
+                " (kind, granularity, period, target_key, target_name, target_id, count)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(kind, granularity, period, target_key)"
+                " DO UPDATE SET count = count + excluded.count,"
+                " target_name = CASE WHEN excluded.count > 0"
+                " THEN excluded.target_name ELSE target_name END",
+                (kind, granularity, period, target_key, target_name, target_id, delta),
+            )
+        if delta < 0:
+            self._conn.execute(
+                "DELETE FROM rollups WHERE kind = ? AND target_key = ?"
+                " AND period IN (?, ?) AND count <= 0",
+                (kind, target_key, week_key, month_key),
+            )
+            if target_id is not None:
+                # The removed record may have carried the name on display: fall
+                # back to the newest one left in the period, as a rebuild would
+                for granularity, period in (("week", week_key), ("month", month_key)):
+                    since, until = (
+                        period_bounds(period, None)
+                        if granularity == "week"
+                        else period_bounds(None, period)
+                    )
+                    self._conn.execute(
+                        "UPDATE rollups SET target_name = COALESCE("
+                        "(SELECT target_name FROM records WHERE kind = ? AND target_id = ?"
+                        " AND day BETWEEN ? AND ? ORDER BY id DESC LIMIT 1), target_name)"
+                        " WHERE kind = ? AND granularity = ? AND period = ? AND target_key = ?",
+                        (kind, target_id, since, until, kind, granularity, period, target_key),
+                    )
+
+    def subscribe(self, callback):
+        """Register `callback(event, payload)`.
+
+        Payload is the record dict for "append" and a list of record dicts
+        (uid, kind, target_name, target_id, day) for "delete".
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, payload):
+        for callback in self._listeners:
+            try:
+                callback(event, payload)
+            except Exception as e:
+                logger.exception(f"Ledger listener failed on {event}: {e}")
+
+    def append(
+        self,
+        kind: str,
+        target_name: str,
+        *,
+        target_id: int | None = None,
+        sender_name: str | None = None,
+        sender_id: int | None = None,
+        day: int | None = None,
+        reason: str | None = None,
+        message_id: int | None = None,
+        line: int = 0,
+        created_at: float | None = None,
+        uid: str | None = None,
+    ) -> bool:
+        """Insert one record. Returns False if it was already stored."""
+        record = {
+            "uid": uid or new_uid(),
+            "kind": kind,
+            "target_id": target_id,
+            "target_name": target_name,
+            "sender_id": sender_id,
+            "sender_name": sender_name,
+            "day": day if day is not None else day_int(date.today()),
+            "reason": reason,
+            "message_id": message_id,
+            "line": line,
+            "created_at": created_at if created_at is not None else time.time(),
+        }
+        with self._transaction():
+            cur = self._conn.execute(
+                f"INSERT OR IGNORE INTO records ({', '.join(record)})"
+                f" VALUES ({', '.join('?' * len(record))})",
+                tuple(record.values()),
+            )
+            if cur.rowcount <= 0:
+                return False
+            self._bump_rollups(kind, target_name, target_id, record["day"], 1)
+            self._log_change("append", record)
+        self._notify("append", record)
+        return True
+
+    def delete_message(self, message_id: int) -> list[str]:
+        """Remove every record mirrored by `message_id`. Returns the removed uids."""
+        rows = self._conn.execute(
+            "SELECT uid, kind, target_name, target_id, day FROM records"
+            " WHERE message_id = ?",
+            (message_id,),
+        ).fetchall()
+        if not rows:
+            return []
+        with self._transaction():
+            self._conn.execute("DELETE FROM records WHERE message_id = ?", (message_id,))
+            for row in rows:
+                self._bump_rollups(
+                    row["kind"], row["target_name"], row["target_id"], row["day"], -1
+                )
+                self._log_change("delete", row)
+        self._notify("delete", [dict(row) for row in rows])
+        return [row["uid"] for row in rows]
+
+    def _log_change(self, op: str, record):
+        """Add an append/delete to the change feed (inside the caller's transaction)."""
+        if not self.shared:
+            return
+        now = time.time()
+        cur = self._conn.execute(
+            "INSERT INTO changes (op, uid, kind, target_name, target_id, day, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                op,
+                record["uid"],
+                record["kind"],
+                record["target_name"],
+                record["target_id"],
+                record["day"],
+                now,
+            ),
+        )
+        self._own_changes.add(cur.lastrowid)
+        if cur.lastrowid % 1000 == 0:
+            self._conn.execute(
+                "DELETE FROM changes WHERE created_at < ?", (now - CHANGE_RETENTION,)
+            )
+
+    def _data_version_now(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll_changes(self) -> bool:
+        """Notify subscribers of records other processes appended or deleted.
+
+        `PRAGMA data_version` only moves when another connection commits, so
+        an idle poll is one cheap query. Returns True if anything changed
+        (the outbox included).
+        """
+        version = self._data_version_now()
+        if version == self._data_version:
+            return False
+        self._data_version = version
+
+        record_columns = _COLUMNS.split(", ")
+        rows = self._conn.execute(
+            "SELECT c.seq, c.op, c.uid AS change_uid, c.kind AS change_kind,"
+            " c.target_name AS change_target_name, c.target_id AS change_target_id,"
+            " c.day AS change_day, r.id AS record_id,"
+            f" {', '.join('r.' + column for column in record_columns)}"
+            " FROM changes c LEFT JOIN records r ON r.uid = c.uid"
+            " WHERE c.seq > ? ORDER BY c.seq",
+            (self._seen_change,),
+        ).fetchall()
+        for row in rows:
+            if row["seq"] in self._own_changes:
+                continue
+            if row["op"] == "delete":
+                removed = {
+                    key: row[f"change_{key}"]
+                    for key in ("uid", "kind", "target_name", "target_id", "day")
+                }
+                self._notify("delete", [removed])
+            elif row["record_id"] is not None:
+                # Still stored (if it was deleted since, its delete entry follows)
+                self._notify("append", {column: row[column] for column in record_columns})
+        if rows:
+            self._seen_change = rows[-1]["seq"]
+        self._own_changes = {seq for seq in self._own_changes if seq > self._seen_change}
+        return True
+
+    def attach_message(self, message_id: int, lines: dict[str, int]):
+        """Point records {uid: line} that were stored before being mirrored at their log message."""
+        if not lines:
+            return
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE records SET message_id = ?, line = ?"
+                " WHERE uid = ? AND message_id IS NULL",
+                [(message_id, line, uid) for uid, line in lines.items()],
+            )
+
+    def outbox_add(self, text: str, uid: str | None = None) -> int:
+        """Persist a log line until it has been sent. Returns its sequence number."""
+        cur = self._conn.execute(
+            "INSERT INTO outbox (uid, text, created_at) VALUES (?, ?, ?)",
+            (uid, text, time.time()),
+        )
+        return cur.lastrowid
+
+    def outbox_pending(self) -> list[sqlite3.Row]:
+        """Unsent log lines, oldest first."""
+        return self._conn.execute(
+            "SELECT seq, uid, text FROM outbox ORDER BY seq"
+        ).fetchall()
+
+    def outbox_remove(self, seqs: list[int]):
+        with self._transaction():
+            self._conn.executemany(
+                "DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+
+    def rebuild_rollups(self) -> int:
+        """Recompute every rollup row from the raw records. Returns the row count."""
+        totals: Counter = Counter()
+        targets: dict = {}
+        # Insertion order, so the newest name of each target wins as in _bump_rollups
+        for kind, target_name, target_id, day in self._conn.execute(
+            "SELECT kind, target_name, target_id, day FROM records ORDER BY id"
+        ):
+            week_key, month_key = period_keys(day)
+            target_key = rollup_key(target_id, target_name)
+            for key in (
+                (kind, "week", week_key, target_key),
+                (kind, "month", month_key, target_key),
+            ):
+                totals[key] += 1
+                targets[key] = (target_name, target_id)
+        with self._transaction():
+            self._conn.execute("DELETE FROM rollups")
+            self._conn.executemany(
+                "INSERT INTO rollups"
+                " (kind, granularity, period, target_key, target_name, target_id, count)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*key, *targets[key], count) for key, count in totals.items()],
+            )
+        logger.info(f"Rebuilt {len(totals)} rollup rows from the ledger")
+        return len(totals)
+
+    def rollups(
+        self,
+        kind: str,
+        granularity: str,
+        *,
+        periods: list[str] | None = None,
+    ) -> list[sqlite3.Row]:
+        """Per-user counts for `kind` by "week" or "month", newest period first.
+
+        `periods` restricts the result to those periods (e.g. the last 12 weeks);
+        each row has period, target_name, target_id and count. There is one row
+        per user id, plus one per name for targets that never resolved to an id.
+        """
+        sql = (
+            "SELECT period, target_name, target_id, count FROM rollups"
+            " WHERE kind = ? AND granularity = ?"
+        )
+        params: list = [kind, granularity]
+        if periods is not None:
+            sql += f" AND period IN ({','.join('?' * len(periods))})"
+            params.extend(periods)
+        sql += " ORDER BY period DESC, count DESC"
+        return self._conn.execute(sql, params).fetchall()
+
+    def recent_records(self, limit: int) -> list[dict]:
+        """The newest `limit` records (by day, then insertion), newest first."""
+        return [
+            dict(row)
+            for row in self._conn.execute(
+                f"SELECT {_COLUMNS} FROM records ORDER BY day DESC, id DESC LIMIT ?",
+                (limit,),
+            )
+        ]
+
+    def records(
+        self,
+        kinds: str | tuple[str, ...],
+        *,
+        since: int | None = None,
+        until: int | None = None,
+        target_id: int | None = None,
+    ) -> list[sqlite3.Row]:
+        """Return records of the given kind(s), optionally within [since, until] days."""
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+        sql = f"SELECT * FROM records WHERE kind IN ({','.join('?' * len(kinds))})"
+        params: list = list(kinds)
+        if target_id is not None:
+            sql += " AND target_id = ?"
+            params.append(target_id)
+        if since is not None:
+            sql += " AND day >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND day <= ?"
+            params.append(until)
+        sql += " ORDER BY day DESC, id DESC"
+        return self._conn.execute(sql, params).fetchall()
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def names(self, user_ids) -> dict[int, str]:
+        """Last known display names for `user_ids` (ids never seen are left out)."""
+        user_ids = list(user_ids)
+        found: dict[int, str] = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(user_ids), 500):
+            chunk = user_ids[i : i + 500]
+            rows = self._conn.execute(
+                "SELECT user_id, display_name FROM names"
+                f" WHERE user_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update((row[0], row[1]) for row in rows)
+        return found
+
+    def remember_names(self, names: dict[int, str]) -> int:
+        """Store display names so later reports can show members no longer cached.
+
+        Only names that differ from the stored ones are written. Returns how many.
+        """
+        if not names:
+            return 0
+        stored = self.names(names)
+        names = {
+            user_id: name for user_id, name in names.items() if stored.get(user_id) != name
+        }
+        if not names:
+            return 0
+        now = time.time()
+        with self._transaction():
+            self._conn.executemany(
+                "INSERT INTO names (user_id, display_name, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(user_id) DO UPDATE SET"
+                " display_name = excluded.display_name, updated_at = excluded.updated_at",
+                [(user_id, name, now) for user_id, name in names.items()],
+            )
+        return len(names)
+
+    def get_meta(self, key: str, default: str | None = None) -> str | None:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
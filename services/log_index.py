@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on records kept in memory (override with NOEMA_LOG_CACHE_SIZE)
+MAX_CACHED_RECORDS = int(os.getenv("NOEMA_LOG_CACHE_SIZE", "20000"))
+
+
+class CachedRecord:
+    """Only the fields the stats cogs read, without per-instance `__dict__`."""
+
+    __slots__ = (
+        "uid",
+        "kind",
+        "target_id",
+        "target_name",
+        "sender_id",
+        "sender_name",
+        "day",
+        "reason",
+        "message_id",
+    )
+
+    def __init__(self, fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def __repr__(self):
+        return f"CachedRecord({self.kind!r}, {self.target_name!r}, day={self.day})"
+
+
+class LogIndex:
+    """Shared, size-bounded cache of parsed log records for all stats cogs.
+
+    Hydrated with the newest records from the ledger and kept current through
+    ledger notifications. When it grows past `max_records` the oldest inserted
+    entries are evicted and queries reaching back before what is still complete
+    in memory fall through to the ledger.
+
+    While the gateway connection is down live events can be missed; the log
+    indexer marks the cache stale and registers `refresher`, which pages from the
+    checkpoint to the newest log message the next time a stats command asks for
+    data.
+
+    Until the startup backfill has finished (`backfilled`), a stats command asking
+    for a day range has just that window of the channel imported first through
+    `window_loader`, so it is not left waiting on the whole backlog.
+    """
+
+    def __init__(self, ledger, max_records: int = MAX_CACHED_RECORDS):
+        self.ledger = ledger
+        self.max_records = max_records
+        self._entries: OrderedDict[str, CachedRecord] = OrderedDict()
+        self._by_kind: dict[str, dict[str, CachedRecord]] = {}
+        # Every record with day >= this is in memory (None: everything is)
+        self._complete_since: int | None = None
+        self.stale = False
+        self.refresher = None
+        self._refresh_task: asyncio.Task | None = None
+        self.backfilled = False
+        self.window_loader = None
+        self._window_tasks: dict[tuple, asyncio.Task] = {}
+
+        recent = ledger.recent_records(max_records)
+        for fields in reversed(recent):
+            self._add(CachedRecord(fields))
+        if len(recent) >= max_records:
+            self._complete_since = recent[-1]["day"] + 1
+        ledger.subscribe(self._on_ledger_event)
+        logger.info(f"Log index loaded {len(self._entries)} records")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add(self, record: CachedRecord):
+        self._entries[record.uid] = record
+        self._by_kind.setdefault(record.kind, {})[record.uid] = record
+        while len(self._entries) > self.max_records:
+            _, old = self._entries.popitem(last=False)
+            self._by_kind[old.kind].pop(old.uid, None)
+            if self._complete_since is None or old.day >= self._complete_since:
+                self._complete_since = old.day + 1
+
+    def _on_ledger_event(self, event: str, payload):
+        if event == "append":
+            self._add(CachedRecord(payload))
+        elif event == "delete":
+            for removed in payload:
+                record = self._entries.pop(removed["uid"], None)
+                if record is not None:
+                    self._by_kind[record.kind].pop(record.uid, None)
+
+    async def ensure_fresh(self, since: int | None = None, until: int | None = None):
+        """Make records in days [since, until] current before a query.
+
+        Catches up from the checkpoint if the cache is stale and, while the startup
+        backfill is still running, imports the requested window. Concurrent
+        callers share one refresh / one scan per window.
+        """
+        if (
+            not self.backfilled
+            and self.window_loader is not None
+            and (since is not None or until is not None)
+        ):
+            key = (since, until)
+            task = self._window_tasks.get(key)
+            if task is None:
+                task = asyncio.create_task(self.window_loader(since, until))
+                self._window_tasks[key] = task
+            try:
+                await asyncio.shield(task)
+            except Exception as e:
+                self._window_tasks.pop(key, None)
+                logger.warning(f"Log window scan {key} failed, serving cached data: {e}")
+
+        if not self.stale or self.refresher is None:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresher())
+        try:
+            await asyncio.shield(self._refresh_task)
+        except Exception as e:
+            logger.warning(f"Log index refresh failed, serving cached data: {e}")
+
+    def mark_backfilled(self):
+        self.backfilled = True
+        self._window_tasks.clear()
+
+    def records(
+        self,
+        kinds: str | tuple[str, ...],
+        *,
+        since: int | None = None,
+        until: int | None = None,
+        target_id: int | None = None,
+    ) -> list[CachedRecord]:
+        """Same filters as `Ledger.records`, newest day first."""
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+        if self._complete_since is not None and (
+            since is None or since < self._complete_since
+        ):
+            rows = self.ledger.records(
+                kinds, since=since, until=until, target_id=target_id
+            )
+            return [CachedRecord(row) for row in rows]
+
+        out = []
+        for kind in kinds:
+            for record in self._by_kind.get(kind, {}).values():
+                if target_id is not None and record.target_id != target_id:
+                    continue
+                if since is not None and record.day < since:
+                    continue
+                if until is not None and record.day > until:
+                    continue
+                out.append(record)
+        # dicts keep insertion order: reverse it so ties on day come newest first
+        out.reverse()
+        out.sort(key=lambda r: r.day, reverse=True)
+        return out
@@ -0,0 +1,324 @@
+import re
+from datetime import date, datetime, timezone
+
+from services.ledger import (
+    KIND_BEHU,
+    KIND_BENGOAN,
+    KIND_GIAYCHE,
+    KIND_MENTEE_CHE,
+    KIND_MENTEE_KHEN,
+    day_int,
+)
+
+# Machine-readable suffix the writer cogs append to every log line:
+#     ... vào ngày 18/10/2025 `nr1|behu|<target id>|<sender id>|<epoch>|<uid>`
+# Missing ids are written as "-". It is read with one rfind and one split, so
+# the prose before it is only consulted for names and reasons.
+TOKEN_VERSION = "nr1"
+_TOKEN_START = " `" + TOKEN_VERSION + "|"
+_TOKEN_KINDS = frozenset(
+    (KIND_BEHU, KIND_BENGOAN, KIND_GIAYCHE, KIND_MENTEE_KHEN, KIND_MENTEE_CHE)
+)
+
+# One compiled pattern per record type. Lines are classified by a cheap keyword
+# check first, so each line runs at most one of these. Dates are captured as
+# separate day/month/year groups and turned into a YYYYMMDD int arithmetically.
+_DATE = r"(?P<d>\d{1,2})/(?P<m>\d{1,2})/(?P<y>\d{4})"
+BEHU_RE = re.compile(
+    r"(?P<target>.+?)\s+đã (?:bị phạt|được ghi nhận).*?phiếu bé hư(?:.*vào\s*(?:ngày|lúc)?\s*"
+    + _DATE
+    + ")?",
+    re.I,
+)
+BENGOAN_RE = re.compile(
+    r"(?P<target>.+?)\s+đã được tặng 1 phiếu bé ngoan(?:.*vào\s*(?:ngày|lúc)?\s*"
+    + _DATE
+    + ")?",
+    re.I,
+)
+GIAYCHE_RE = re.compile(
+    r"(?P<target>.+?)\s+bị ghi giấy chê bởi\s+(?P<sender>.+?)\s+vào ngày\s+"
+    + _DATE
+    + r"(?:\.\s*Lý do:\s*(?P<reason>.*?)(?=\.\s*ID:\d+:\d+|$))?(?:\.\s*ID:(?P<tid>\d+):(?P<sid>\d+))?",
+    re.I | re.S,
+)
+MENTEE_RE = re.compile(
+    r"\[mentee\]\s*(?P<target>.+?)\s+(?:(?P<khen>được khen)|bị ch[êé])"
+    r"(?:\s+bởi\s+(?P<sender>.+?))?(?:\s+vào ngày\s+" + _DATE + r")?\s*$",
+    re.I | re.S,
+)
+MENTION_RE = re.compile(r"<@!?(?P<id>\d+)>")
+
+
+class LogRecord:
+    """Fields extracted from one log line; `day` is a YYYYMMDD int."""
+
+    __slots__ = (
+        "kind",
+        "target_name",
+        "target_id",
+        "sender_name",
+        "sender_id",
+        "day",
+        "reason",
+        "mentions",
+        "uid",
+    )
+
+    def __init__(
+        self,
+        kind: str,
+        target_name: str,
+        day: int,
+        target_id: int | None = None,
+        sender_name: str | None = None,
+        sender_id: int | None = None,
+        reason: str | None = None,
+        mentions: tuple[int, ...] = (),
+        uid: str | None = None,
+    ):
+        self.kind = kind
+        self.target_name = target_name
+        self.day = day
+        self.target_id = target_id
+        self.sender_name = sender_name
+        self.sender_id = sender_id
+        self.reason = reason
+        self.mentions = mentions
+        self.uid = uid
+
+    def __repr__(self):
+        return f"LogRecord({self.kind!r}, {self.target_name!r}, day={self.day})"
+
+    def to_fields(self) -> dict:
+        """Keyword arguments for `Ledger.append`."""
+        return {
+            "kind": self.kind,
+            "target_name": self.target_name,
+            "target_id": self.target_id,
+            "sender_name": self.sender_name,
+            "sender_id": self.sender_id,
+            "day": self.day,
+            "reason": self.reason,
+            "uid": self.uid,
+        }
+
+
+def mention_id(text: str | None) -> int | None:
+    """Return the user id of the first <@id> mention in `text`, if any."""
+    if not text or "<@" not in text:
+        return None
+    m = MENTION_RE.search(text)
+    return int(m.group("id")) if m else None
+
+
+def _id_field(value: int | None) -> str:
+    return str(value) if value else "-"
+
+
+def encode_token(
+    kind: str,
+    target_id: int | None,
+    sender_id: int | None,
+    when: datetime,
+    uid: str,
+) -> str:
+    """The suffix for one log line; a naive `when` is taken as UTC."""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    fields = (
+        TOKEN_VERSION,
+        kind,
+        _id_field(target_id),
+        _id_field(sender_id),
+        str(int(when.timestamp())),
+        uid,
+    )
+    return "`" + "|".join(fields) + "`"
+
+
+def split_token(line: str) -> tuple[str, tuple | None]:
+    """Split a log line into (prose, token fields).
+
+    Token fields are (kind, target id, sender id, day, uid); they are None when the
+    line has no valid token (legacy lines).
+    """
+    if not line.endswith("`"):
+        return line, None
+    start = line.rfind(_TOKEN_START)
+    if start == -1:
+        return line, None
+    parts = line[start + 2 : -1].split("|")
+    if len(parts) != 6 or parts[1] not in _TOKEN_KINDS:
+        return line, None
+    _, kind, tid, sid, epoch, uid = parts
+    try:
+        target_id = int(tid) if tid != "-" else None
+        sender_id = int(sid) if sid != "-" else None
+        day = day_int(datetime.fromtimestamp(int(epoch), timezone.utc).date())
+    except ValueError:
+        return line, None
+    return line[:start].rstrip(), (kind, target_id, sender_id, day, uid)
+
+
+def _day(m: re.Match, created_at: datetime) -> int | None:
+    y = m.group("y")
+    if y is None:
+        return day_int(created_at)
+    try:
+        # Rejects 31/02, year 0000 and the like, which the ledger cannot store
+        return day_int(date(int(y), int(m.group("m")), int(m.group("d"))))
+    except ValueError:
+        return None
+
+
+_PATTERNS = {
+    KIND_BEHU: BEHU_RE,
+    KIND_BENGOAN: BENGOAN_RE,
+    KIND_GIAYCHE: GIAYCHE_RE,
+    KIND_MENTEE_KHEN: MENTEE_RE,
+    KIND_MENTEE_CHE: MENTEE_RE,
+}
+
+
+# Fixed separators of the prose the writer cogs emit, per record kind:
+# (after target, after sender). Tokenized lines are split on these with
+# str.partition; the regexes only run if a line was worded differently.
+_SEPARATORS = {
+    KIND_BEHU: (" đã bị phạt ", None),
+    KIND_BENGOAN: (" đã được tặng ", None),
+    KIND_GIAYCHE: (" bị ghi giấy chê bởi ", " vào ngày "),
+    KIND_MENTEE_KHEN: (" được khen bởi ", " vào ngày "),
+    KIND_MENTEE_CHE: (" bị chê bởi ", " vào ngày "),
+}
+
+
+def _split_prose(kind: str, prose: str):
+    """(target, sender, reason) from writer prose, or None if it does not fit."""
+    target_sep, sender_sep = _SEPARATORS[kind]
+    if kind in (KIND_MENTEE_KHEN, KIND_MENTEE_CHE):
+        if prose[:8].lower() != "[mentee]":
+            return None
+        prose = prose[8:].lstrip()
+    target, found, rest = prose.partition(target_sep)
+    if not found:
+        return None
+    if sender_sep is None:
+        return target.strip(), None, None
+    sender, found, rest = rest.partition(sender_sep)
+    if not found:
+        return None
+    reason = None
+    if kind == KIND_GIAYCHE:
+        _, found, reason = rest.partition("Lý do:")
+        reason = reason.strip() if found else None
+    return target.strip(), sender.strip(), reason
+
+
+def _from_token(prose: str, token: tuple) -> LogRecord | None:
+    """Build a record from its token; the prose only supplies names and reason."""
+    kind, target_id, sender_id, day, uid = token
+    fields = _split_prose(kind, prose)
+    if fields is None:
+        pattern = _PATTERNS[kind]
+        m = pattern.search(prose)
+        if m is not None:
+            groups = m.groupdict()
+            fields = (
+                m.group("target").strip(),
+                (groups.get("sender") or "").strip() or None,
+                (groups.get("reason") or "").strip() or None,
+            )
+        else:
+            # Prose edited beyond recognition: the ids are still authoritative
+            fields = (f"<@{target_id}>" if target_id else "", None, None)
+    target, sender, reason = fields
+    if not target:
+        return None
+    return LogRecord(
+        kind,
+        target,
+        day,
+        target_id=target_id,
+        sender_name=sender,
+        sender_id=sender_id,
+        reason=reason or None,
+        mentions=tuple(int(i) for i in MENTION_RE.findall(prose)) if "<@" in prose else (),
+        uid=uid,
+    )
+
+
+def _dispatch(content: str):
+    """(kind, pattern) for a legacy line by its keyword, or (None, None)."""
+    if "giấy chê" in content:
+        return KIND_GIAYCHE, GIAYCHE_RE
+    if "phiếu bé hư" in content:
+        return KIND_BEHU, BEHU_RE
+    if "phiếu bé ngoan" in content:
+        return KIND_BENGOAN, BENGOAN_RE
+    return None, None
+
+
+def parse_line(content: str, created_at: datetime) -> LogRecord | None:
+    """Parse one log-channel line, tokenized or legacy prose.
+
+    Lines ending in a record token (see `encode_token`) are read from the token.
+    Older lines are parsed from their prose in a single pass, with `created_at`
+    supplying the date for lines that do not carry one. Returns None if the line
+    is not a record written by one of the writer cogs.
+    """
+    if not content:
+        return None
+    content = content.strip()
+
+    prose, token = split_token(content)
+    if token is not None:
+        return _from_token(prose, token)
+
+    if content[:8].lower() == "[mentee]":
+        kind, pattern = None, MENTEE_RE
+    else:
+        kind, pattern = _dispatch(content)
+        if pattern is None:
+            # Legacy lines were matched case-insensitively: only lines that
+            # miss the fast check pay for lower()
+            kind, pattern = _dispatch(content.lower())
+        if pattern is None:
+            return None
+
+    m = pattern.search(content)
+    if m is None:
+        return None
+    day = _day(m, created_at)
+    if day is None:
+        return None
+
+    mentions = (
+        tuple(int(i) for i in MENTION_RE.findall(content)) if "<@" in content else ()
+    )
+    target = m.group("target").strip()
+    target_id = mention_id(target)
+
+    if pattern is MENTEE_RE:
+        sender = m.group("sender")
+        return LogRecord(
+            KIND_MENTEE_KHEN if m.group("khen") else KIND_MENTEE_CHE,
+            target,
+            day,
+            target_id=target_id,
+            sender_name=sender.strip() if sender else None,
+            mentions=mentions,
+        )
+    if kind == KIND_GIAYCHE:
+        tid, sid, reason = m.group("tid"), m.group("sid"), m.group("reason")
+        return LogRecord(
+            kind,
+            target,
+            day,
+            target_id=int(tid) if tid else target_id,
+            sender_name=m.group("sender").strip(),
+            sender_id=int(sid) if sid else None,
+            reason=reason.strip() if reason else None,
+            mentions=mentions,
+        )
+    return LogRecord(kind, target, day, target_id=target_id, mentions=mentions)
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+logger = logging.getLogger(__name__)
+
+# Autocomplete can show at most 25 choices
+MAX_RESULTS = 25
+# Lazy mode: seconds before an index fetched from the gateway is refreshed
+# (name changes of uncached members produce no event)
+LAZY_INDEX_TTL = 3600
+# Lazy mode: seconds a command waits for a guild's member list
+LAZY_LOAD_TIMEOUT = 10.0
+# Lazy mode: seconds before a failed member list fetch is retried
+LAZY_RETRY_BACKOFF = 60
+
+_FOLD_TABLE = str.maketrans({"đ": "d", "Đ": "d", "\n": " "})
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics: "Đặng Thị Ánh" -> "dang thi anh"."""
+    decomposed = unicodedata.normalize("NFD", (text or "").translate(_FOLD_TABLE))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def exact_key(text: str) -> str:
+    """Case-insensitive but diacritic-preserving: "Ân" and "ân" match, "An" does not."""
+    return unicodedata.normalize("NFC", (text or "").strip()).casefold()
+
+
+class GuildMemberIndex:
+    """Search index over one guild's `display_name` and `name`.
+
+    Folded names are kept in a sorted list, so prefix matches are a bisect. For
+    substring matches the sorted keys are joined into one string that is searched
+    with `str.find` (rebuilt lazily after changes). `exact` resolves through a
+    separate map of `exact_key` names, since folding would let "An" pick "Ân".
+    """
+
+    def __init__(self, members=()):
+        self._names: dict[int, tuple[str, tuple[str, ...], tuple[str, ...]]] = {}
+        self._exact: dict[str, set[int]] = {}
+        for member in members:
+            self._names[member.id] = entry = self._entry(member.display_name, member.name)
+            for key in entry[2]:
+                self._exact.setdefault(key, set()).add(member.id)
+        self._sorted = sorted(
+            (key, member_id)
+            for member_id, (_, keys, _) in self._names.items()
+            for key in keys
+        )
+        self._blob: str | None = None
+        self._starts: list[int] = []
+
+    def __len__(self):
+        return len(self._names)
+
+    @staticmethod
+    def _entry(display_name: str, name: str) -> tuple[str, tuple[str, ...], tuple[str, ...]]:
+        return (
+            display_name,
+            tuple(dict.fromkeys((fold(display_name), fold(name)))),
+            tuple(dict.fromkeys((exact_key(display_name), exact_key(name)))),
+        )
+
+    def upsert(self, member_id: int, display_name: str, name: str):
+        self.remove(member_id)
+        entry = self._entry(display_name, name)
+        self._names[member_id] = entry
+        for key in entry[1]:
+            i = bisect_left(self._sorted, (key, member_id))
+            self._sorted.insert(i, (key, member_id))
+        for key in entry[2]:
+            self._exact.setdefault(key, set()).add(member_id)
+        self._blob = None
+
+    def remove(self, member_id: int):
+        entry = self._names.pop(member_id, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            i = bisect_left(self._sorted, (key, member_id))
+            if i < len(self._sorted) and self._sorted[i] == (key, member_id):
+                del self._sorted[i]
+        for key in entry[2]:
+            ids = self._exact.get(key)
+            if ids is not None:
+                ids.discard(member_id)
+                if not ids:
+                    del self._exact[key]
+        self._blob = None
+
+    def _build_blob(self):
+        starts = []
+        pos = 0
+        for key, _ in self._sorted:
+            starts.append(pos)
+            pos += len(key) + 1
+        self._starts = starts
+        self._blob = "\n".join(key for key, _ in self._sorted)
+
+    def exact(self, name: str) -> int | None:
+        """The id of the only member named `name` (ignoring case, not diacritics), else None."""
+        ids = self._exact.get(exact_key(name), ())
+        return next(iter(ids)) if len(ids) == 1 else None
+
+    def search(self, query: str, limit: int = MAX_RESULTS) -> list[tuple[int, str]]:
+        """Return up to `limit` (member id, display name) pairs, prefix matches first."""
+        q = fold(query)
+        found: dict[int, None] = {}
+
+        i = bisect_left(self._sorted, (q,))
+        while i < len(self._sorted) and len(found) < limit:
+            key, member_id = self._sorted[i]
+            if not key.startswith(q):
+                break
+            found[member_id] = None
+            i += 1
+
+        if q and len(found) < limit:
+            if self._blob is None:
+                self._build_blob()
+            pos = self._blob.find(q)
+            while pos != -1 and len(found) < limit:
+                idx = bisect_right(self._starts, pos) - 1
+                found[self._sorted[idx][1]] = None
+                if idx + 1 >= len(self._starts):
+                    break
+                pos = self._blob.find(q, self._starts[idx + 1])
+
+        return [(member_id, self._names[member_id][0]) for member_id in found]
+
+
+async def all_members(guild) -> list:
+    """Every member of `guild`: the cache when it is complete, else one gateway request.
+
+    Fetched members are not added to the cache.
+    """
+    if guild.chunked:
+        return list(guild.members)
+    return await guild.chunk(cache=False)
+
+
+class MemberIndex:
+    """Per-guild `GuildMemberIndex`es, built on first use from the member cache.
+
+    With `lazy=True` (the member cache is not filled at startup) the member list
+    is fetched from the gateway on first use instead, in the background: until
+    it arrives searches see the cached members only, so autocomplete never waits
+    on it. Fetched indexes are refreshed after `LAZY_INDEX_TTL`; after a failed
+    fetch the last index (or one of the cached members) is served for
+    `LAZY_RETRY_BACKOFF` before trying again.
+    """
+
+    def __init__(self, lazy: bool = False):
+        self.lazy = lazy
+        self._guilds: dict[int, GuildMemberIndex] = {}
+        self._built_at: dict[int, float] = {}
+        self._failed_at: dict[int, float] = {}
+        self._loading: dict[int, asyncio.Task] = {}
+
+    def _load(self, guild) -> asyncio.Task:
+        task = self._loading.get(guild.id)
+        if task is None or task.done():
+            task = self._loading[guild.id] = asyncio.create_task(self._fetch(guild))
+        return task
+
+    async def _fetch(self, guild):
+        started = time.monotonic()
+        try:
+            members = await all_members(guild)
+        except Exception as e:
+            logger.warning(f"Failed to fetch members of {guild.name}: {e}")
+            # Without this every keystroke of an autocomplete would start another fetch
+            self._failed_at[guild.id] = time.monotonic()
+            self._guilds.setdefault(guild.id, GuildMemberIndex(guild.members))
+            return
+        self._guilds[guild.id] = GuildMemberIndex(members)
+        self._built_at[guild.id] = time.monotonic()
+        self._failed_at.pop(guild.id, None)
+        logger.info(
+            f"Fetched member index for {guild.name}: {len(members)} members"
+            f" in {time.monotonic() - started:.1f}s"
+        )
+
+    def for_guild(self, guild) -> GuildMemberIndex:
+        index = self._guilds.get(guild.id)
+        if self.lazy and not guild.chunked:
+            now = time.monotonic()
+            built_at = self._built_at.get(guild.id)
+            failed_at = self._failed_at.get(guild.id)
+            if failed_at is not None and now - failed_at < LAZY_RETRY_BACKOFF:
+                pass
+            elif built_at is None or now - built_at > LAZY_INDEX_TTL:
+                self._load(guild)
+            # Cached members only, until the fetched list arrives
+            return index if index is not None else GuildMemberIndex(guild.members)
+        if index is None:
+            index = GuildMemberIndex(guild.members)
+            self._guilds[guild.id] = index
+            logger.info(f"Built member index for {guild.name}: {len(index)} members")
+        return index
+
+    async def loaded(self, guild, timeout: float = LAZY_LOAD_TIMEOUT) -> GuildMemberIndex:
+        """`for_guild`, but waiting (up to `timeout`) for a lazy fetch to finish."""
+        index = self.for_guild(guild)
+        task = self._loading.get(guild.id)
+        if task is not None and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Member list of {guild.name} still loading, using cache")
+            index = self.for_guild(guild)
+        return index
+
+    def search(self, guild, query: str, limit: int = MAX_RESULTS) -> list[tuple[int, str]]:
+        return self.for_guild(guild).search(query, limit)
+
+    async def exact(self, guild, name: str) -> int | None:
+        return (await self.loaded(guild)).exact(name)
+
+    def upsert(self, member):
+        index = self._guilds.get(member.guild.id)
+        if index is not None:
+            index.upsert(member.id, member.display_name, member.name)
+
+    def remove(self, guild_id: int, member_id: int):
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            index.remove(member_id)
+
+    def drop(self, guild_id: int | None = None):
+        """Forget one guild's index (or all), to be rebuilt on next search."""
+        if guild_id is None:
+            self._guilds.clear()
+            self._built_at.clear()
+            self._failed_at.clear()
+        else:
+            self._guilds.pop(guild_id, None)
+            self._built_at.pop(guild_id, None)
+            self._failed_at.pop(guild_id, None)
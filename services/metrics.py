@@ -0,0 +1,74 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Samples kept per rolling window
+WINDOW = 200
+
+
+class Rolling:
+    """The last `size` samples of a duration (seconds), for p50/p95 reporting."""
+
+    __slots__ = ("_samples", "count")
+
+    def __init__(self, size: int = WINDOW):
+        self._samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value: float):
+        self._samples.append(value)
+        self.count += 1
+
+    def percentile(self, p: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self) -> str:
+        """"p50 0.41s / p95 1.20s (n=37)", or "-" without samples."""
+        if not self._samples:
+            return "-"
+        return (
+            f"p50 {self.percentile(50):.2f}s / p95 {self.percentile(95):.2f}s"
+            f" (n={self.count})"
+        )
+
+
+class StageTimings:
+    """A `Rolling` window per named stage of a multi-step operation."""
+
+    def __init__(self, size: int = WINDOW):
+        self.size = size
+        self._stages: dict[str, Rolling] = {}
+
+    def add(self, stage: str, seconds: float):
+        rolling = self._stages.get(stage)
+        if rolling is None:
+            rolling = self._stages[stage] = Rolling(self.size)
+        rolling.add(seconds)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Time the body of a `with` block; failed attempts are not recorded."""
+        start = time.monotonic()
+        yield
+        self.add(stage, time.monotonic() - start)
+
+    def summary(self) -> dict[str, str]:
+        return {stage: rolling.summary() for stage, rolling in self._stages.items()}
+
+
+class BootTimeline:
+    """Seconds from process start to each startup step, for one log line once ready."""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.steps: list[tuple[str, float]] = []
+
+    def mark(self, step: str, at: float | None = None):
+        self.steps.append((step, (at if at is not None else time.monotonic()) - self.started))
+
+    def summary(self) -> str:
+        """"imports +0.42s | login +0.97s | ..."."""
+        return " | ".join(f"{step} +{seconds:.2f}s" for step, seconds in self.steps)
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+
+from services.log_parser import MENTION_RE
+
+logger = logging.getLogger(__name__)
+
+# Discord answers at most 100 user ids per member query
+QUERY_CHUNK = 100
+QUERY_TIMEOUT = 5.0
+
+
+class NameResolver:
+    """Resolve the <@id> mentions in stored names, one batch per report.
+
+    Reports gather every raw name they will print, then call `resolve` once:
+    unique ids are looked up in the member/user cache, then in the ledger's
+    persisted names, and whatever is still unknown is requested from the gateway
+    with `guild.query_members(user_ids=...)` in chunks of 100. The returned
+    mapping is reused for the text report, the embed and any attachment.
+    """
+
+    def __init__(self, bot, ledger):
+        self.bot = bot
+        self.ledger = ledger
+
+    async def resolve_ids(self, guild, user_ids) -> dict[int, str]:
+        """{user id: display name} for every id that could be resolved."""
+        names: dict[int, str] = {}
+        missing: list[int] = []
+        for user_id in set(user_ids):
+            user = (guild.get_member(user_id) if guild else None) or self.bot.get_user(
+                user_id
+            )
+            if user is not None:
+                names[user_id] = getattr(user, "display_name", str(user))
+            else:
+                missing.append(user_id)
+        live = dict(names)
+
+        if missing:
+            stored = self.ledger.names(missing)
+            names.update(stored)
+            missing = [user_id for user_id in missing if user_id not in stored]
+
+        if missing and guild is not None:
+            for i in range(0, len(missing), QUERY_CHUNK):
+                try:
+                    members = await asyncio.wait_for(
+                        # cache=False: lean mode keeps the member cache to voice members
+                        guild.query_members(
+                            user_ids=missing[i : i + QUERY_CHUNK],
+                            limit=QUERY_CHUNK,
+                            cache=False,
+                        ),
+                        QUERY_TIMEOUT,
+                    )
+                except Exception as e:
+                    logger.warning(f"Member query for {guild.name} failed: {e}")
+                    break
+                for member in members:
+                    live[member.id] = names[member.id] = member.display_name
+
+        try:
+            # Keep the persisted names current for members that later leave the cache
+            self.ledger.remember_names(live)
+        except Exception as e:
+            logger.warning(f"Failed to persist member names: {e}")
+        return names
+
+    async def resolve(self, guild, raws) -> dict[str, str]:
+        """{raw name: display name}; each mention is replaced by the member's name.
+
+        Mentions that cannot be resolved are reduced to the bare id.
+        """
+        raws = {raw for raw in raws if raw}
+        ids = {
+            int(user_id)
+            for raw in raws
+            if "<@" in raw
+            for user_id in MENTION_RE.findall(raw)
+        }
+        names = await self.resolve_ids(guild, ids) if ids else {}
+
+        def display(m) -> str:
+            user_id = int(m.group("id"))
+            return names.get(user_id, str(user_id))
+
+        return {
+            raw: MENTION_RE.sub(display, raw).strip() if "<@" in raw else raw.strip()
+            for raw in raws
+        }
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import random
+
+import discord
+
+from services.log_parser import split_token
+
+logger = logging.getLogger(__name__)
+
+# Discord's message length limit
+MAX_MESSAGE_CHARS = 2000
+# Seconds to wait for more lines before sending (override with NOEMA_OUTBOX_FLUSH_DELAY)
+FLUSH_DELAY = float(os.getenv("NOEMA_OUTBOX_FLUSH_DELAY", "1.0"))
+# Retries for one message on 429/5xx before it is left for the next flush
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+def _fit(text: str) -> str:
+    """One log line that fits in a message on its own: single line, token kept."""
+    text = " ".join(text.splitlines()).strip()
+    if len(text) <= MAX_MESSAGE_CHARS:
+        return text
+    prose, token = split_token(text)
+    suffix = text[len(prose) :] if token is not None else ""
+    return prose[: MAX_MESSAGE_CHARS - len(suffix) - 1] + "…" + suffix
+
+
+class LogOutbox:
+    """Batched writer for the log channel.
+
+    Writer cogs `enqueue` a line and answer the user at once. Lines are stored in
+    the ledger's outbox table first, so a crash before sending loses nothing;
+    pending lines from a previous run are sent after startup. A flush runs a
+    short moment after the first queued line and packs everything pending into
+    as few messages as the 2000-character limit allows, one record per line.
+    Rate limits (429) and server errors (5xx) are retried with exponential
+    backoff; after that the lines stay queued for the next flush.
+
+    Once a message is sent its records are pointed at it (`Ledger.attach_message`)
+    so edits and deletions in the log channel still reach them.
+
+    With several bot processes only one outbox drains (`drain=True`); the
+    others just store their lines for it to send.
+    """
+
+    def __init__(
+        self,
+        bot,
+        ledger,
+        channel_id: int,
+        flush_delay: float = FLUSH_DELAY,
+        drain: bool = True,
+    ):
+        self.bot = bot
+        self.drain = drain
+        self.ledger = ledger
+        self.channel_id = channel_id
+        self.flush_delay = flush_delay
+        self._channel = None
+        self._flush_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self.sent_messages = 0
+        self.sent_lines = 0
+        self.retries = 0
+
+    def start(self):
+        """Send lines left over from a previous run once the bot is ready."""
+        if self.ledger.outbox_pending():
+            self._schedule()
+
+    def enqueue(self, text: str, uid: str | None = None):
+        self.ledger.outbox_add(_fit(text), uid)
+        self._schedule()
+
+    def _schedule(self):
+        if not self.drain:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        delay = self.flush_delay
+        while not self.bot.is_closed():
+            await asyncio.sleep(delay)
+            ok = await self.flush()
+            if not self.ledger.outbox_pending():
+                return
+            # More lines arrived while sending, or sending failed: go again,
+            # after a long pause in the second case
+            delay = self.flush_delay if ok else BACKOFF_MAX
+
+    async def _get_channel(self):
+        if self._channel is None:
+            channel = self.bot.get_channel(self.channel_id)
+            if channel is None:
+                channel = await self.bot.fetch_channel(self.channel_id)
+            self._channel = channel
+        return self._channel
+
+    @staticmethod
+    def _batches(rows) -> list[list]:
+        batches: list[list] = []
+        size = 0
+        for row in rows:
+            # +1 for the newline joining it to the previous line
+            if batches and size + 1 + len(row["text"]) <= MAX_MESSAGE_CHARS:
+                batches[-1].append(row)
+                size += 1 + len(row["text"])
+            else:
+                batches.append([row])
+                size = len(row["text"])
+        return batches
+
+    async def _send(self, channel, content: str) -> discord.Message:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await channel.send(content)
+            except discord.HTTPException as e:
+                if attempt == MAX_RETRIES or not (e.status == 429 or e.status >= 500):
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+                delay *= random.uniform(0.5, 1.0)
+                self.retries += 1
+                logger.warning(
+                    f"Log channel send failed ({e.status}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def flush(self) -> bool:
+        """Send everything pending now; False if some lines are still queued after an error."""
+        async with self._lock:
+            rows = self.ledger.outbox_pending()
+            if not rows:
+                return True
+            try:
+                channel = await self._get_channel()
+            except Exception as e:
+                logger.error(f"Log channel {self.channel_id} not available: {e}")
+                return False
+
+            for batch in self._batches(rows):
+                try:
+                    message = await self._send(
+                        channel, "\n".join(row["text"] for row in batch)
+                    )
+                except Exception as e:
+                    logger.error(
+                        f"Failed to send {len(batch)} log line(s), keeping them queued: {e}"
+                    )
+                    return False
+                self.ledger.outbox_remove([row["seq"] for row in batch])
+                self.ledger.attach_message(
+                    message.id,
+                    {row["uid"]: line for line, row in enumerate(batch) if row["uid"]},
+                )
+                self.sent_messages += 1
+                self.sent_lines += len(batch)
+            logger.info(f"Flushed {len(rows)} log line(s) to channel {self.channel_id}")
+            return True
+
+    async def close(self, timeout: float = 5.0):
+        """Try a last flush; whatever is left stays on disk for the next start."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        if not self.drain:
+            # The draining process sends these lines; sending them here too would post them twice
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except Exception as e:
+            logger.warning(f"Final log flush incomplete: {e}")
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "pending": len(self.ledger.outbox_pending()),
+            "messages": self.sent_messages,
+            "lines": self.sent_lines,
+            "retries": self.retries,
+        }
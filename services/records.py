@@ -0,0 +1,101 @@
+import logging
+from datetime import datetime
+
+import discord
+
+from services.ledger import day_int, new_uid, parse_period, period_bounds
+from services.log_parser import encode_token
+
+logger = logging.getLogger(__name__)
+
+
+def record_and_mirror(
+    ledger,
+    outbox,
+    kind: str,
+    target_name: str,
+    prose: str,
+    *,
+    target_id: int | None,
+    sender_name: str | None,
+    sender_id: int | None,
+    when: datetime,
+    reason: str | None = None,
+) -> str:
+    """Store one record written by a command, then queue its log-channel line.
+
+    The ledger is the source of truth and is written first; the log channel is
+    only the readable mirror, sent by the outbox (batched, retried). `prose` is
+    the human-readable line; the record token is appended to it. Failures are
+    logged rather than raised so the command still answers. Returns the uid.
+    """
+    uid = new_uid()
+    try:
+        ledger.append(
+            kind,
+            target_name,
+            target_id=target_id,
+            sender_name=sender_name,
+            sender_id=sender_id,
+            day=day_int(when.date()),
+            reason=reason,
+            uid=uid,
+        )
+    except Exception as e:
+        logger.error(f"Failed to record {kind} in ledger: {e}")
+
+    try:
+        outbox.enqueue(f"{prose} {encode_token(kind, target_id, sender_id, when, uid)}", uid)
+    except Exception as e:
+        logger.error(f"Failed to queue {kind} log line: {e}")
+    return uid
+
+
+async def collect_rollups(
+    log_index,
+    ledger,
+    kind: str,
+    guild: discord.Guild | None,
+    granularity: str,
+    period: str | None,
+    user: str | None,
+) -> tuple[dict, int]:
+    """Per-period counts of one record kind for a report.
+
+    Returns ({(kind, year, num): {username: count}}, total). Totals come straight
+    from the ledger's week/month rollups, so cost is O(users in the period), not
+    O(records). `user` is an optional member id to filter on.
+    """
+    # Catch up on anything missed while disconnected (and, while the startup
+    # backfill runs, on the requested period) before reading totals
+    week, month = (period, None) if granularity == "week" else (None, period)
+    await log_index.ensure_fresh(*period_bounds(week, month))
+    rows = ledger.rollups(kind, granularity, periods=[period] if period else None)
+
+    counts: dict = {}
+    scanned = 0
+
+    uid = None
+    member = None
+    if user:
+        try:
+            uid = int(user)
+            member = guild.get_member(uid) if guild else None
+        except Exception:
+            # if parsing fails, ignore user filter
+            uid = None
+
+    for row in rows:
+        # Apply filters: match by stored id, or by display name / username
+        if uid is not None and row["target_id"] != uid:
+            if member is None or row["target_name"] not in (member.display_name, member.name):
+                continue
+
+        # Rows keyed by id are shown under the member's current name
+        username = (
+            f"<@{row['target_id']}>" if row["target_id"] is not None else row["target_name"]
+        )
+        period_counts = counts.setdefault(parse_period(row["period"]), {})
+        period_counts[username] = period_counts.get(username, 0) + row["count"]
+        scanned += row["count"]
+    return counts, scanned
@@ -0,0 +1,189 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+
+import discord
+
+from services.ledger import period_keys
+
+logger = logging.getLogger(__name__)
+
+# Rendered reports kept in memory (override with NOEMA_REPORT_CACHE_SIZE)
+MAX_CACHED_REPORTS = int(os.getenv("NOEMA_REPORT_CACHE_SIZE", "256"))
+# Serve a stale report instead of waiting once this many reports are being built
+STALE_WHILE_REVALIDATE_LOAD = int(os.getenv("NOEMA_REPORT_SWR_LOAD", "2"))
+# Reports print member names, which change without any ledger write: a cached
+# report is rebuilt once it is this many seconds old (NOEMA_REPORT_NAME_TTL)
+NAME_TTL = float(os.getenv("NOEMA_REPORT_NAME_TTL", "3600"))
+
+
+class Report:
+    """A rendered stats reply that can be sent any number of times.
+
+    Attachments are kept as text and wrapped in a fresh `discord.File` per send,
+    because a File's buffer is consumed by the upload.
+    """
+
+    __slots__ = ("content", "embed", "attachment", "filename")
+
+    def __init__(
+        self,
+        content: str | None = None,
+        embed: discord.Embed | None = None,
+        attachment: str | None = None,
+        filename: str | None = None,
+    ):
+        self.content = content
+        self.embed = embed
+        self.attachment = attachment
+        self.filename = filename
+
+    def send_kwargs(self) -> dict:
+        kwargs = {}
+        if self.content is not None:
+            kwargs["content"] = self.content
+        if self.embed is not None:
+            kwargs["embed"] = self.embed
+        if self.attachment is not None:
+            kwargs["file"] = discord.File(
+                io.BytesIO(self.attachment.encode("utf-8")), filename=self.filename
+            )
+        return kwargs
+
+
+class ReportScope:
+    """Which ledger changes make a cached report out of date.
+
+    `periods` holds week/month rollup keys ("2025-W42", "2025-10"); None means the
+    report spans every period. `target_id` narrows it to one member; records
+    without an id (free-text names) still invalidate, since they may match by name.
+    """
+
+    __slots__ = ("kinds", "periods", "target_id")
+
+    def __init__(
+        self,
+        kinds: tuple[str, ...],
+        periods: tuple[str, ...] | None = None,
+        target_id: int | None = None,
+    ):
+        self.kinds = kinds
+        self.periods = periods
+        self.target_id = target_id
+
+    def affected_by(self, record: dict) -> bool:
+        if record["kind"] not in self.kinds:
+            return False
+        if self.periods is not None and not set(period_keys(record["day"])) & set(
+            self.periods
+        ):
+            return False
+        if self.target_id is not None and record["target_id"] not in (
+            None,
+            self.target_id,
+        ):
+            return False
+        return True
+
+
+class _Entry:
+    __slots__ = ("report", "scope", "stale", "built_at")
+
+    def __init__(self, report: Report, scope: ReportScope):
+        self.report = report
+        self.scope = scope
+        self.stale = False
+        self.built_at = time.monotonic()
+
+    def fresh(self) -> bool:
+        return not self.stale and time.monotonic() - self.built_at < NAME_TTL
+
+
+class ReportCache:
+    """LRU cache of rendered stats reports, invalidated by ledger writes.
+
+    A new or deleted record marks exactly the reports whose scope it touches as
+    stale. A stale report is rebuilt on the next request, unless the bot is busy
+    building other reports: then the stale copy is served at once and rebuilt in
+    the background. Builds go through `flight`, so identical concurrent requests
+    still share one computation. A write landing while a report is being built
+    marks the build dirty, and its result is stored already stale. Renames are
+    not ledger writes, so reports also go stale after `NAME_TTL` seconds.
+    """
+
+    def __init__(self, ledger, flight, max_entries: int = MAX_CACHED_REPORTS):
+        self.flight = flight
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._building = 0
+        # key -> [scope, dirty] of builds in progress
+        self._in_build: dict[tuple, list] = {}
+        self._revalidations: set[asyncio.Task] = set()
+        self.stats: Counter = Counter()
+        ledger.subscribe(self._on_ledger_event)
+
+    def _on_ledger_event(self, event: str, payload):
+        records = [payload] if event == "append" else payload
+        for entry in self._entries.values():
+            if not entry.stale and any(entry.scope.affected_by(r) for r in records):
+                entry.stale = True
+                self.stats["invalidated"] += 1
+        for build in self._in_build.values():
+            if not build[1] and any(build[0].affected_by(r) for r in records):
+                build[1] = True
+                self.stats["invalidated"] += 1
+
+    async def _build(self, key: tuple, scope: ReportScope, factory) -> Report:
+        async def build():
+            self._building += 1
+            build_state = self._in_build[key] = [scope, False]
+            try:
+                report = await factory()
+            finally:
+                self._building -= 1
+                self._in_build.pop(key, None)
+            entry = _Entry(report, scope)
+            # The report may predate a write that landed while it was built
+            entry.stale = build_state[1]
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return report
+
+        return await self.flight.run(key, build)
+
+    def _revalidate(self, key: tuple, scope: ReportScope, factory):
+        async def run():
+            try:
+                await self._build(key, scope, factory)
+            except Exception as e:
+                logger.warning(f"Background rebuild of {key[0]} report failed: {e}")
+
+        # Keep a reference: the loop only holds tasks weakly
+        task = asyncio.create_task(run())
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidations.discard)
+
+    async def get(self, key: tuple, scope: ReportScope, factory) -> Report:
+        """Return the report for `key`, building it with `factory()` when needed.
+
+        `key` is (command name, guild id, *normalized params).
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.fresh():
+            self._entries.move_to_end(key)
+            self.stats["hit"] += 1
+            return entry.report
+        if entry is not None and self._building >= STALE_WHILE_REVALIDATE_LOAD:
+            self.stats["stale_served"] += 1
+            self._revalidate(key, scope, factory)
+            return entry.report
+        self.stats["miss"] += 1
+        return await self._build(key, scope, factory)
+
+    def metrics(self) -> dict[str, int]:
+        return {"entries": len(self._entries), **self.stats}
@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import logging
+import os
+import re
+import time
+from collections import Counter
+from enum import IntEnum
+
+import discord
+
+from services.metrics import Rolling
+
+logger = logging.getLogger(__name__)
+
+# Channel/member REST calls in flight at once (override with NOEMA_REST_CONCURRENCY)
+REST_CONCURRENCY = int(os.getenv("NOEMA_REST_CONCURRENCY", "4"))
+
+_SNOWFLAKE_RE = re.compile(r"\d{15,}")
+
+
+class Lane(IntEnum):
+    """Priority of a queued call; lower runs first."""
+
+    MOVE = 0  # moving a waiting member into their room
+    CREATE = 1  # creating or claiming the room a member is waiting for
+    SPARE = 2  # topping up the room pool
+    DELETE = 3  # deleting empty or orphaned rooms
+
+
+class RateLimitCounter(logging.Filter):
+    """Counts the 429s discord.py logs (and retries) on `discord.http`, per route.
+
+    discord.py handles the buckets itself and only logs when it is rate
+    limited, so the log record is the one place these show up. Ids in the URL
+    are folded to `{id}` to keep one counter per route.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.routes: Counter = Counter()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if "responded with 429" in str(record.msg) and len(record.args or ()) >= 2:
+            method, url = record.args[0], str(record.args[1])
+            self.routes[f"{method} {_SNOWFLAKE_RE.sub('{id}', url)}"] += 1
+        return True
+
+
+class Bucket:
+    __slots__ = ("calls", "inflight", "rate_limited", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.inflight = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+
+class RestScheduler:
+    """One queue for channel and member REST calls, drained by priority.
+
+    `run(lane, bucket, factory)` queues `factory()` and returns its result.
+    A fixed number of workers take the most urgent call first (FIFO within a
+    lane), so during a join storm moves and room creates are not stuck behind
+    pool refills and deletions, and the bot never has more than `concurrency`
+    of these calls competing for the same rate limits. `bucket` names the rate
+    limit the call counts against, e.g. ("create", guild id), for metrics.
+    """
+
+    def __init__(self, concurrency: int = REST_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._queue: asyncio.PriorityQueue | None = None
+        self._seq = itertools.count()
+        self._workers: list[asyncio.Task] = []
+        self.queued: Counter = Counter()
+        self.waits = {lane: Rolling() for lane in Lane}
+        self.buckets: dict[tuple, Bucket] = {}
+        self.rate_limits = RateLimitCounter()
+
+    def start(self):
+        self._queue = asyncio.PriorityQueue()
+        logging.getLogger("discord.http").addFilter(self.rate_limits)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logging.getLogger("discord.http").removeFilter(self.rate_limits)
+
+    async def run(self, lane: Lane, bucket: tuple, factory):
+        if self._queue is None:
+            # Not started (e.g. a cog used outside the bot): call directly
+            return await factory()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            (lane, next(self._seq), bucket, factory, future, time.monotonic())
+        )
+        self.queued[lane] += 1
+        return await future
+
+    async def _worker(self):
+        while True:
+            lane, _, bucket, factory, future, queued_at = await self._queue.get()
+            self.queued[lane] -= 1
+            if future.done():
+                # The caller gave up (timeout/cancel) before its turn
+                continue
+            self.waits[lane].add(time.monotonic() - queued_at)
+            stats = self.buckets.get(bucket)
+            if stats is None:
+                stats = self.buckets[bucket] = Bucket()
+            stats.calls += 1
+            stats.inflight += 1
+            try:
+                result = await factory()
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if isinstance(e, discord.RateLimited) or (
+                    isinstance(e, discord.HTTPException) and e.status == 429
+                ):
+                    stats.rate_limited += 1
+                else:
+                    stats.errors += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                stats.inflight -= 1
+
+    def depth(self) -> dict[str, int]:
+        return {lane.name.lower(): self.queued[lane] for lane in Lane}
+
+    def metrics(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "waits": {
+                lane.name.lower(): self.waits[lane].summary()
+                for lane in Lane
+                if self.waits[lane].count
+            },
+            "429s": sum(self.rate_limits.routes.values())
+            + sum(b.rate_limited for b in self.buckets.values()),
+            "routes_429": dict(self.rate_limits.routes.most_common(5)),
+        }
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+
+import discord
+
+from services.metrics import Rolling
+from services.rest_scheduler import Lane
+
+logger = logging.getLogger(__name__)
+
+# Spare voice/text pairs kept per community category (override with NOEMA_ROOM_POOL_SIZE; 0 disables)
+ROOM_POOL_SIZE = int(os.getenv("NOEMA_ROOM_POOL_SIZE", "2"))
+SPARE_NAME = "phòng-chờ"
+
+
+class RoomPool:
+    """Pre-created, hidden voice/text pairs parked in the community categories.
+
+    A join on a community channel claims a spare (rename + overwrites + move)
+    instead of creating two channels and editing them; the pool is topped up in
+    the background afterwards. Spares are stored in the room registry without an
+    owner, so a restart's reconciliation deletes them like any empty room and
+    the pool is rebuilt.
+    """
+
+    def __init__(self, rooms, rest, size: int = ROOM_POOL_SIZE):
+        self.rooms = rooms
+        # Spares are created in the low-priority lane of the REST scheduler
+        self.rest = rest
+        self.size = size
+        # (guild id, category id or None) -> [(voice id, text id)]; uncategorised
+        # spares of different guilds must not share a list
+        self._spares: dict[tuple[int, int | None], list[tuple[int, int]]] = {}
+        self._filling: dict[tuple[int, int | None], asyncio.Task] = {}
+        self.stats: Counter = Counter()
+        self.time_to_room = Rolling()
+
+    @staticmethod
+    def _key(guild, category) -> tuple[int, int | None]:
+        return guild.id, category.id if category else None
+
+    def take(self, guild, category) -> tuple | None:
+        """Pop a spare (voice, text) that still exists, or None."""
+        spares = self._spares.get(self._key(guild, category))
+        while spares:
+            voice_id, text_id = spares.pop()
+            voice, text = guild.get_channel(voice_id), guild.get_channel(text_id)
+            if isinstance(voice, discord.VoiceChannel) and text is not None:
+                return voice, text
+            self.rooms.drop_pair(voice_id)
+        return None
+
+    def record(self, hit: bool, seconds: float):
+        self.stats["hit" if hit else "miss"] += 1
+        self.time_to_room.add(seconds)
+
+    def hit_rate(self) -> float | None:
+        total = self.stats["hit"] + self.stats["miss"]
+        return self.stats["hit"] / total if total else None
+
+    def replenish(self, guild, category):
+        """Top up the category's spares in the background (one task per category)."""
+        if self.size <= 0:
+            return
+        key = self._key(guild, category)
+        task = self._filling.get(key)
+        if task is None or task.done():
+            self._filling[key] = asyncio.create_task(self._fill(guild, category))
+
+    async def _fill(self, guild, category):
+        key = self._key(guild, category)
+        spares = self._spares.setdefault(key, [])
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(view_channel=False),
+            guild.me: discord.PermissionOverwrite(
+                view_channel=True, manage_channels=True, connect=True, move_members=True
+            ),
+        }
+        while len(spares) < self.size:
+            bucket = ("create", guild.id)
+            voice, text = await asyncio.gather(
+                self.rest.run(
+                    Lane.SPARE,
+                    bucket,
+                    lambda: guild.create_voice_channel(
+                        SPARE_NAME, category=category, overwrites=overwrites
+                    ),
+                ),
+                self.rest.run(
+                    Lane.SPARE,
+                    bucket,
+                    lambda: guild.create_text_channel(
+                        SPARE_NAME, category=category, overwrites=overwrites
+                    ),
+                ),
+                return_exceptions=True,
+            )
+            failed = [r for r in (voice, text) if isinstance(r, BaseException)]
+            if failed:
+                logger.warning(f"Failed to create spare room in {guild.name}: {failed[0]}")
+                # Do not leave half a pair behind
+                await asyncio.gather(
+                    *(
+                        self.rest.run(Lane.DELETE, ("delete", guild.id), r.delete)
+                        for r in (voice, text)
+                        if not isinstance(r, BaseException)
+                    ),
+                    return_exceptions=True,
+                )
+                return
+            self.rooms.add_pair(guild.id, voice.id, text.id)
+            spares.append((voice.id, text.id))
+            self.stats["created"] += 1
+        logger.info(f"Room pool for {guild.name}/{category}: {len(spares)} spare(s)")
+
+    def forget(self, channel_id: int):
+        """Drop a spare whose channel was deleted."""
+        for spares in self._spares.values():
+            spares[:] = [pair for pair in spares if channel_id not in pair]
+
+    def metrics(self) -> dict:
+        return {
+            "spares": sum(len(spares) for spares in self._spares.values()),
+            "hits": self.stats["hit"],
+            "misses": self.stats["miss"],
+            "created": self.stats["created"],
+        }
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Seconds an auto-created room may stay empty before it is deleted (override with NOEMA_ROOM_DELETE_GRACE)
+ROOM_DELETE_GRACE = float(os.getenv("NOEMA_ROOM_DELETE_GRACE", "2.0"))
+# Rooms expiring within this many seconds of each other are deleted together
+BATCH_WINDOW = 0.25
+
+
+class RoomReaper:
+    """Debounced deletion of empty rooms.
+
+    Each room has at most one pending timer (a `call_later` handle, no task):
+    scheduling an already pending room is a no-op and a rejoin cancels it. Rooms
+    whose timers fire close together are handed to `delete_rooms` as one batch,
+    so a whole session emptying out costs one deletion pass rather than a
+    sleeping task per leave.
+    """
+
+    def __init__(self, delete_rooms, grace: float = ROOM_DELETE_GRACE):
+        # async delete_rooms({voice id: guild})
+        self._delete_rooms = delete_rooms
+        self.grace = grace
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+        self._due: dict[int, object] = {}
+        self._flush_task: asyncio.Task | None = None
+        self.stats: Counter = Counter()
+
+    def schedule(self, guild, voice_id: int):
+        if voice_id in self._timers or voice_id in self._due:
+            self.stats["coalesced"] += 1
+            return
+        loop = asyncio.get_running_loop()
+        self._timers[voice_id] = loop.call_later(self.grace, self._expire, guild, voice_id)
+        self.stats["scheduled"] += 1
+
+    def cancel(self, voice_id: int) -> bool:
+        """Call off a pending deletion (someone rejoined). True if one was pending."""
+        handle = self._timers.pop(voice_id, None)
+        if handle is not None:
+            handle.cancel()
+        elif self._due.pop(voice_id, None) is None:
+            return False
+        self.stats["canceled"] += 1
+        return True
+
+    def cancel_all(self):
+        for handle in self._timers.values():
+            handle.cancel()
+        self._timers.clear()
+        self._due.clear()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+
+    def _expire(self, guild, voice_id: int):
+        self._timers.pop(voice_id, None)
+        self._due[voice_id] = guild
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        while self._due:
+            # Let rooms emptied at about the same time join this batch
+            await asyncio.sleep(BATCH_WINDOW)
+            due, self._due = self._due, {}
+            if not due:
+                # Every room in the window was rejoined meanwhile
+                return
+            self.stats["batches"] += 1
+            self.stats["expired"] += len(due)
+            try:
+                await self._delete_rooms(due)
+            except Exception as e:
+                logger.error(f"Failed to delete {len(due)} expired room(s): {e}")
+
+    def metrics(self) -> dict[str, int]:
+        return {"pending": len(self._timers) + len(self._due), **self.stats}
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from services.ledger import LEDGER_PATH
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+
+    HAVE_REDIS = True
+except ImportError:
+    HAVE_REDIS = False
+
+# Where rooms and community channels are kept: a SQLite path (default: the
+# ledger file) or a redis:// URL shared by several bot processes
+ROOM_STORE_URL = os.getenv("NOEMA_ROOM_STORE", LEDGER_PATH)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    voice_id   INTEGER PRIMARY KEY,
+    text_id    INTEGER,
+    guild_id   INTEGER NOT NULL,
+    owner_id   INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rooms_guild ON rooms (guild_id);
+CREATE TABLE IF NOT EXISTS community_channels (
+    guild_id   INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, channel_id)
+);
+"""
+
+
+class SqliteRoomStore:
+    """Rooms and community channels in a local SQLite file (WAL mode).
+
+    Several processes on one host can share the file. Calls are local and
+    short, so they run inline on the event loop like the ledger's.
+    """
+
+    blocking = False
+
+    def __init__(self, path: str = LEDGER_PATH):
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def save_room(self, guild_id: int, voice_id: int, text_id: int | None, owner_id: int | None):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rooms (voice_id, text_id, guild_id, owner_id, created_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (voice_id, text_id, guild_id, owner_id, time.time()),
+        )
+
+    def delete_room(self, guild_id: int | None, voice_id: int):
+        self._conn.execute("DELETE FROM rooms WHERE voice_id = ?", (voice_id,))
+
+    def rooms(self, guild_id: int) -> list[dict]:
+        return [
+            dict(row)
+            for row in self._conn.execute(
+                "SELECT voice_id, text_id, owner_id FROM rooms WHERE guild_id = ?",
+                (guild_id,),
+            )
+        ]
+
+    def community_channel_ids(self, guild_id: int) -> list[int]:
+        return [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT channel_id FROM community_channels WHERE guild_id = ?",
+                (guild_id,),
+            )
+        ]
+
+    def set_community_channels(self, guild_id: int, channel_ids: list[int]):
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                "DELETE FROM community_channels WHERE guild_id = ?", (guild_id,)
+            )
+            self._conn.executemany(
+                "INSERT INTO community_channels (guild_id, channel_id) VALUES (?, ?)",
+                [(guild_id, channel_id) for channel_id in channel_ids],
+            )
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+
+class RedisRoomStore:
+    """Rooms and community channels in Redis (or anything speaking its protocol).
+
+    One hash of rooms and one set of community channels per guild, so processes
+    on different hosts can share them. Calls are synchronous like the SQLite
+    store's, but each is a network round trip: `RoomRegistry` runs them in a
+    worker thread (`blocking`) so they never stall the event loop.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "noema"):
+        if not HAVE_REDIS:
+            raise RuntimeError(
+                f"Room store {url} needs the redis package: pip install redis"
+            )
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _rooms_key(self, guild_id: int) -> str:
+        return f"{self.prefix}:rooms:{guild_id}"
+
+    def _community_key(self, guild_id: int) -> str:
+        return f"{self.prefix}:community:{guild_id}"
+
+    def close(self):
+        self._redis.close()
+
+    def save_room(self, guild_id: int, voice_id: int, text_id: int | None, owner_id: int | None):
+        value = {"text_id": text_id, "owner_id": owner_id, "created_at": time.time()}
+        self._redis.hset(self._rooms_key(guild_id), str(voice_id), json.dumps(value))
+
+    def delete_room(self, guild_id: int | None, voice_id: int):
+        if guild_id is None:
+            logger.warning(f"Cannot forget room {voice_id} in Redis without its guild")
+            return
+        self._redis.hdel(self._rooms_key(guild_id), str(voice_id))
+
+    def rooms(self, guild_id: int) -> list[dict]:
+        return [
+            {"voice_id": int(voice_id), **json.loads(value)}
+            for voice_id, value in self._redis.hgetall(self._rooms_key(guild_id)).items()
+        ]
+
+    def community_channel_ids(self, guild_id: int) -> list[int]:
+        return [int(v) for v in self._redis.smembers(self._community_key(guild_id))]
+
+    def set_community_channels(self, guild_id: int, channel_ids: list[int]):
+        key = self._community_key(guild_id)
+        pipe = self._redis.pipeline()  # MULTI/EXEC: readers never see it half-written
+        pipe.delete(key)
+        if channel_ids:
+            pipe.sadd(key, *(str(c) for c in channel_ids))
+        pipe.execute()
+
+
+def open_room_store(url: str = ROOM_STORE_URL):
+    """SQLite store for a path, Redis store for a redis:// or rediss:// URL."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRoomStore(url)
+    return SqliteRoomStore(url)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from collections import deque
+
+from services.room_store import open_room_store
+
+logger = logging.getLogger(__name__)
+
+
+class RoomRegistry:
+    """Auto-created rooms and community channels, persisted across restarts.
+
+    `pairs` is the voice <-> text id map the bot exposes as `bot.channel_pairs`
+    (both directions); `room_of` finds a member's own room with a dict lookup
+    on (guild id, owner id). Every change is written through to `store` (SQLite
+    in the ledger file by default, see services.room_store), so a redeploy can
+    reattach or clean up the rooms it made instead of orphaning them; see
+    `VoiceEvents.reconcile`.
+
+    Memory only ever holds the rooms of guilds this process serves: they are
+    loaded per guild on ready and every later change comes from this process's
+    own events, so sharded processes sharing one store never need to tell each
+    other about room changes.
+
+    Memory is updated at once. With a `blocking` store (Redis) the write-through
+    runs in a worker thread, one write at a time in call order, and a failed
+    write is logged; with the SQLite store it runs inline and errors propagate.
+    """
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else open_room_store()
+        self.pairs: dict[int, int] = {}
+        # guild id -> owner id -> (voice id, text id), and voice id -> (guild, owner)
+        self.by_owner: dict[int, dict[int, tuple[int, int | None]]] = {}
+        self._owner_of: dict[int, tuple[int, int]] = {}
+        # voice id -> guild id, for stores keyed by guild
+        self._guild_of: dict[int, int] = {}
+        # Pending write-throughs to a blocking store: (method name, args)
+        self._writes: deque = deque()
+        self._writer: asyncio.Task | None = None
+
+    async def close(self):
+        if self._writer is not None and not self._writer.done():
+            await self._writer
+        try:
+            self.store.close()
+        except Exception as e:
+            logger.warning(f"Failed to close room registry: {e}")
+
+    def _write(self, method: str, *args):
+        if not self.store.blocking:
+            getattr(self.store, method)(*args)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to block (e.g. scripts): write directly
+            self._apply(method, args)
+            return
+        self._writes.append((method, args))
+        if self._writer is None or self._writer.done():
+            self._writer = loop.create_task(self._drain_writes())
+
+    async def _drain_writes(self):
+        while self._writes:
+            method, args = self._writes.popleft()
+            await asyncio.to_thread(self._apply, method, args)
+
+    def _apply(self, method: str, args: tuple):
+        try:
+            getattr(self.store, method)(*args)
+        except Exception as e:
+            logger.error(f"Room store {method}{args} failed: {e}")
+
+    async def _read(self, method: str, *args):
+        if not self.store.blocking:
+            return getattr(self.store, method)(*args)
+        # Let the writes queued before this call land first
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+        return await asyncio.to_thread(getattr(self.store, method), *args)
+
+    def _index(self, guild_id: int, voice_id: int, text_id: int | None, owner_id: int | None):
+        self._guild_of[voice_id] = guild_id
+        if text_id is not None:
+            self.pairs[voice_id] = text_id
+            self.pairs[text_id] = voice_id
+        if owner_id is not None:
+            self.by_owner.setdefault(guild_id, {})[owner_id] = (voice_id, text_id)
+            self._owner_of[voice_id] = (guild_id, owner_id)
+
+    def _unindex(self, voice_id: int):
+        self._guild_of.pop(voice_id, None)
+        guild_id, owner_id = self._owner_of.pop(voice_id, (None, None))
+        owned = self.by_owner.get(guild_id)
+        if owned is not None and owned.get(owner_id, (None,))[0] == voice_id:
+            del owned[owner_id]
+
+    def room_of(self, guild_id: int, owner_id: int) -> tuple[int, int | None] | None:
+        """(voice id, text id) of the room `owner_id` created in the guild, if any."""
+        return self.by_owner.get(guild_id, {}).get(owner_id)
+
+    def add_pair(self, guild_id: int, voice_id: int, text_id: int, owner_id: int | None = None):
+        self._index(guild_id, voice_id, text_id, owner_id)
+        self._write("save_room", guild_id, voice_id, text_id, owner_id)
+
+    def drop_pair(self, channel_id: int, guild_id: int | None = None):
+        """Forget the room containing `channel_id` (its voice or its text channel)."""
+        other = self.pairs.pop(channel_id, None)
+        # Only voice ids are indexed by guild, so this also tells which one is the voice
+        voice_id = other if other in self._guild_of else channel_id
+        if guild_id is None:
+            guild_id = self._guild_of.get(voice_id)
+        if other is not None:
+            self.pairs.pop(other, None)
+            self._unindex(other)
+        self._unindex(channel_id)
+        self._write("delete_room", guild_id, voice_id)
+
+    async def stored_rooms(self, guild_id: int) -> list[dict]:
+        """Persisted rooms of a guild, for reconciliation after a restart."""
+        return await self._read("rooms", guild_id)
+
+    def attach(self, guild_id: int, voice_id: int, text_id: int | None, owner_id: int | None):
+        """Load a stored room back into memory after a restart."""
+        self._index(guild_id, voice_id, text_id, owner_id)
+
+    async def community_channel_ids(self, guild_id: int) -> list[int]:
+        return await self._read("community_channel_ids", guild_id)
+
+    async def set_community_channels(self, guild_id: int, channel_ids: list[int]):
+        await self._read("set_community_channels", guild_id, channel_ids)
@@ -0,0 +1,34 @@
+from datetime import datetime, time, timedelta, timezone
+
+from discord.utils import time_snowflake
+
+from services.ledger import day_from_int, day_int
+
+
+def day_start_snowflake(day: int) -> int:
+    """Smallest snowflake id created at 00:00 UTC on a YYYYMMDD day."""
+    start = datetime.combine(day_from_int(day), time.min, tzinfo=timezone.utc)
+    return time_snowflake(start, high=False)
+
+
+def plan_window(
+    since: int | None,
+    until: int | None,
+    checkpoint: int | None = None,
+) -> tuple[int | None, int | None] | None:
+    """Exclusive (after, before) message-id bounds covering days [since, until].
+
+    `history(after=..., before=...)` with these bounds returns exactly the
+    messages posted in the window, so a scan costs messages in the window
+    rather than a fixed cap. Messages up to `checkpoint` are already indexed,
+    so the window starts after it. Returns None when nothing is left to scan.
+    """
+    after = day_start_snowflake(since) - 1 if since is not None else None
+    before = None
+    if until is not None:
+        before = day_start_snowflake(day_int(day_from_int(until) + timedelta(days=1)))
+    if checkpoint is not None and (after is None or checkpoint > after):
+        after = checkpoint
+    if after is not None and before is not None and after + 1 >= before:
+        return None
+    return after, before
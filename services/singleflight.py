@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key starts `factory()`; callers arriving while it is
+    still running await the same task and get the same result (or exception).
+    Keys are tuples whose first item is the command name, used for metrics.
+    """
+
+    def __init__(self):
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.calls: Counter = Counter()
+        self.coalesced: Counter = Counter()
+
+    async def run(self, key: tuple, factory):
+        name = key[0]
+        self.calls[name] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced[name] += 1
+            logger.debug(f"Coalesced {name} request {key[1:]} onto in-flight computation")
+        else:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller timing out must not cancel the others' result
+        return await asyncio.shield(task)
+
+    def metrics(self) -> dict[str, tuple[int, int]]:
+        """{command: (calls, coalesced)} since startup."""
+        return {name: (calls, self.coalesced[name]) for name, calls in self.calls.items()}
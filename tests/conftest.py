@@ -0,0 +1,10 @@
+import pytest
+
+from services.ledger import Ledger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = Ledger(str(tmp_path / "noema.db"))
+    yield ledger
+    ledger.close()
@@ -0,0 +1,58 @@
+import asyncio
+
+from services.admission import AdmissionQueue
+
+
+def test_concurrency_per_guild_and_fifo_admission():
+    queue = AdmissionQueue(concurrency=2)
+    running = {1: 0, 2: 0}
+    peak = {1: 0, 2: 0}
+    order = []
+
+    async def join(guild_id, name):
+        async with queue.admit(guild_id):
+            order.append(name)
+            running[guild_id] += 1
+            peak[guild_id] = max(peak[guild_id], running[guild_id])
+            await asyncio.sleep(0.01)
+            running[guild_id] -= 1
+
+    async def run():
+        tasks = [asyncio.create_task(join(1, f"a{i}")) for i in range(5)]
+        tasks.append(asyncio.create_task(join(2, "b0")))
+        await asyncio.sleep(0)
+        assert queue.waiting(1) == 3
+        assert queue.waiting(2) == 0
+        assert queue.waiting() == 3
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert peak == {1: 2, 2: 1}
+    assert [name for name in order if name.startswith("a")] == [f"a{i}" for i in range(5)]
+    metrics = queue.metrics()
+    assert (metrics["waiting"], metrics["admitted"]) == (0, 6)
+
+
+def test_slot_released_on_error_and_cancel():
+    queue = AdmissionQueue(concurrency=1)
+
+    async def fail():
+        async with queue.admit(1):
+            raise RuntimeError("boom")
+
+    async def run():
+        try:
+            await fail()
+        except RuntimeError:
+            pass
+        async with queue.admit(1):
+            blocked = asyncio.create_task(queue.admit(1).__aenter__())
+            await asyncio.sleep(0)
+            blocked.cancel()
+            await asyncio.sleep(0)
+            assert queue.waiting(1) == 0
+        # Still admits after both
+        async with queue.admit(1):
+            return True
+
+    assert asyncio.run(run())
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+from services import assets as assets_module
+from services.assets import AssetRegistry
+
+
+class FakeSend:
+    def __init__(self):
+        self.calls: list[dict] = []
+
+    async def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        attachments = []
+        if "file" in kwargs:
+            url = f"https://cdn.example/{len(self.calls)}/a.png?ex=7fffffff"
+            attachments = [SimpleNamespace(url=url)]
+        return SimpleNamespace(attachments=attachments)
+
+
+def _registry(tmp_path, alive):
+    (tmp_path / "a.png").write_bytes(b"png")
+    registry = AssetRegistry(str(tmp_path))
+    checks = []
+
+    async def url_alive(url):
+        checks.append(url)
+        return alive
+
+    registry._url_alive = url_alive
+    return registry, checks
+
+
+def test_send_uploads_once_then_reuses_the_link(tmp_path):
+    registry, checks = _registry(tmp_path, alive=True)
+    send = FakeSend()
+    path = str(tmp_path / "a.png")
+
+    async def run():
+        for _ in range(3):
+            await registry.send(send, "hi", path)
+
+    asyncio.run(run())
+    assert ["file" in c for c in send.calls] == [True, False, False]
+    assert (registry.uploads, registry.reuses) == (1, 2)
+    # The link was just uploaded, so it is not checked again within the interval
+    assert checks == []
+
+
+def test_send_uploads_again_when_the_link_is_gone(tmp_path, monkeypatch):
+    registry, checks = _registry(tmp_path, alive=False)
+    send = FakeSend()
+    path = str(tmp_path / "a.png")
+
+    async def run():
+        await registry.send(send, "hi", path)
+        # Past the check interval the cached link is checked before reuse
+        monkeypatch.setattr(assets_module, "CHECK_INTERVAL", 0)
+        await registry.send(send, "hi", path)
+
+    asyncio.run(run())
+    assert ["file" in c for c in send.calls] == [True, True]
+    assert len(checks) == 1
+    assert registry.uploads == 2
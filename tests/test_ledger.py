@@ -0,0 +1,69 @@
+from services.ledger import KIND_BEHU, KIND_GIAYCHE, Ledger, period_bounds, period_keys
+
+
+def test_append_is_idempotent_per_uid_and_message_line(ledger):
+    assert ledger.append(KIND_BEHU, "Tuấn", day=20251014, uid="u1")
+    assert not ledger.append(KIND_BEHU, "Tuấn", day=20251014, uid="u1")
+    assert ledger.append(KIND_BEHU, "Tuấn", day=20251014, message_id=9, line=0)
+    assert not ledger.append(KIND_BEHU, "Tuấn", day=20251014, message_id=9, line=0)
+    assert ledger.count() == 2
+
+
+def test_records_filters_and_order(ledger):
+    ledger.append(KIND_BEHU, "<@5>", target_id=5, day=20251013)
+    ledger.append(KIND_BEHU, "Tuấn", day=20251015)
+    ledger.append(KIND_GIAYCHE, "<@5>", target_id=5, day=20251014, sender_name="Hà My")
+    assert [r["day"] for r in ledger.records(KIND_BEHU)] == [20251015, 20251013]
+    assert [r["day"] for r in ledger.records((KIND_BEHU, KIND_GIAYCHE), target_id=5)] == [
+        20251014,
+        20251013,
+    ]
+    assert [r["day"] for r in ledger.records(KIND_BEHU, since=20251014, until=20251015)] == [
+        20251015
+    ]
+
+
+def test_delete_message_and_notifications(ledger):
+    events = []
+    ledger.subscribe(lambda event, payload: events.append(event))
+    ledger.append(KIND_BEHU, "Tuấn", day=20251014, message_id=9, line=0, uid="a")
+    ledger.append(KIND_BEHU, "Hà My", day=20251014, message_id=9, line=1, uid="b")
+    assert sorted(ledger.delete_message(9)) == ["a", "b"]
+    assert ledger.delete_message(9) == []
+    assert ledger.count() == 0
+    assert events == ["append", "append", "delete"]
+
+
+def test_attach_message_links_unsent_records(ledger):
+    ledger.append(KIND_BEHU, "Tuấn", day=20251014, uid="a")
+    ledger.attach_message(42, {"a": 3})
+    # The mirrored line, seen again by the log indexer, is not a second record
+    assert not ledger.append(KIND_BEHU, "Tuấn", day=20251014, message_id=42, line=3)
+    assert ledger.delete_message(42) == ["a"]
+
+
+def test_meta_survives_reopen(tmp_path):
+    path = str(tmp_path / "noema.db")
+    ledger = Ledger(path)
+    ledger.set_meta("log_checkpoint", "123")
+    ledger.close()
+    ledger = Ledger(path)
+    assert ledger.get_meta("log_checkpoint") == "123"
+    assert ledger.get_meta("missing", "x") == "x"
+    ledger.close()
+
+
+def test_period_helpers():
+    assert period_keys(20251014) == ("2025-W42", "2025-10")
+    # ISO weeks can belong to the previous year
+    assert period_keys(20210101) == ("2020-W53", "2021-01")
+    assert period_bounds("2025-W42", None) == (20251013, 20251019)
+    assert period_bounds(None, "2024-02") == (20240201, 20240229)
+    assert period_bounds("junk", None) == (None, None)
+
+
+def test_remember_names_writes_only_changes(ledger):
+    assert ledger.remember_names({1: "Ann", 2: "Bob"}) == 2
+    assert ledger.remember_names({1: "Ann", 2: "Bob"}) == 0
+    assert ledger.remember_names({1: "Ann", 2: "Bobby", 3: "Cy"}) == 2
+    assert ledger.names([1, 2, 3, 4]) == {1: "Ann", 2: "Bobby", 3: "Cy"}
@@ -0,0 +1,81 @@
+from services.ledger import KIND_BEHU, KIND_BENGOAN, ROLLUPS_VERSION, Ledger
+
+
+def _rows(ledger, kind, granularity):
+    return sorted(tuple(row) for row in ledger.rollups(kind, granularity))
+
+
+def _snapshot(ledger):
+    return [
+        _rows(ledger, kind, granularity)
+        for kind in (KIND_BEHU, KIND_BENGOAN)
+        for granularity in ("week", "month")
+    ]
+
+
+def test_rollups_count_by_week_and_month(ledger):
+    ledger.append(KIND_BEHU, "<@5>", target_id=5, day=20251013, message_id=1)
+    ledger.append(KIND_BEHU, "<@5>", target_id=5, day=20251020, message_id=2)
+    ledger.append(KIND_BEHU, "Tuấn", day=20251020, message_id=3)
+    assert _rows(ledger, KIND_BEHU, "week") == [
+        ("2025-W42", "<@5>", 5, 1),
+        ("2025-W43", "<@5>", 5, 1),
+        ("2025-W43", "Tuấn", None, 1),
+    ]
+    assert _rows(ledger, KIND_BEHU, "month") == [
+        ("2025-10", "<@5>", 5, 2),
+        ("2025-10", "Tuấn", None, 1),
+    ]
+    assert ledger.rollups(KIND_BEHU, "week", periods=["2025-W42"])[0]["count"] == 1
+
+
+def test_rollups_key_on_user_id_across_names(ledger):
+    ledger.append(KIND_BEHU, "Ân", target_id=5, day=20251013, message_id=1)
+    ledger.append(KIND_BEHU, "<@5>", target_id=5, day=20251014, message_id=2)
+    # Same text, but never resolved to a member: counted separately
+    ledger.append(KIND_BEHU, "Ân", day=20251014, message_id=3)
+    assert _rows(ledger, KIND_BEHU, "week") == [
+        ("2025-W42", "<@5>", 5, 2),
+        ("2025-W42", "Ân", None, 1),
+    ]
+
+
+def test_incremental_rollups_match_rebuild(ledger):
+    for message_id, (kind, name, target_id, day) in enumerate(
+        [
+            (KIND_BEHU, "<@5>", 5, 20251013),
+            (KIND_BEHU, "Ân", 5, 20251031),
+            (KIND_BEHU, "Tuấn", None, 20251101),
+            (KIND_BENGOAN, "<@6>", 6, 20251231),
+            (KIND_BENGOAN, "<@6>", 6, 20260101),
+            (KIND_BEHU, "Tuấn", None, 20251102),
+        ],
+        start=1,
+    ):
+        ledger.append(kind, name, target_id=target_id, day=day, message_id=message_id)
+    ledger.delete_message(2)
+    ledger.delete_message(4)
+    incremental = _snapshot(ledger)
+    ledger.rebuild_rollups()
+    assert _snapshot(ledger) == incremental
+    assert ("2025-W44", "Tuấn", None, 2) in _rows(ledger, KIND_BEHU, "week")
+
+
+def test_delete_drops_empty_rollup_rows(ledger):
+    ledger.append(KIND_BEHU, "<@5>", target_id=5, day=20251013, message_id=1)
+    ledger.delete_message(1)
+    assert ledger.rollups(KIND_BEHU, "week") == []
+    assert ledger.rollups(KIND_BEHU, "month") == []
+
+
+def test_outdated_rollups_are_rebuilt_on_open(tmp_path):
+    path = str(tmp_path / "noema.db")
+    ledger = Ledger(path)
+    ledger.append(KIND_BEHU, "<@5>", target_id=5, day=20251013, message_id=1)
+    ledger._conn.execute("DELETE FROM rollups")
+    ledger.set_meta("rollups_built", "1")
+    ledger.close()
+    ledger = Ledger(path)
+    assert _rows(ledger, KIND_BEHU, "week") == [("2025-W42", "<@5>", 5, 1)]
+    assert ledger.get_meta("rollups_built") == ROLLUPS_VERSION
+    ledger.close()
@@ -0,0 +1,65 @@
+import asyncio
+
+from services.ledger import KIND_BEHU, KIND_BENGOAN
+from services.log_index import LogIndex
+
+
+def _days(records):
+    return [r.day for r in records]
+
+
+def test_index_follows_ledger_writes(ledger):
+    index = LogIndex(ledger, max_records=10)
+    ledger.append(KIND_BEHU, "<@5>", target_id=5, day=20251013, message_id=1)
+    ledger.append(KIND_BEHU, "Tuấn", day=20251014, message_id=2)
+    ledger.append(KIND_BENGOAN, "<@5>", target_id=5, day=20251015, message_id=3)
+    assert len(index) == 3
+    assert _days(index.records(KIND_BEHU)) == [20251014, 20251013]
+    assert _days(index.records((KIND_BEHU, KIND_BENGOAN), target_id=5)) == [20251015, 20251013]
+    ledger.delete_message(2)
+    assert _days(index.records(KIND_BEHU)) == [20251013]
+
+
+def test_eviction_falls_through_to_the_ledger(ledger):
+    index = LogIndex(ledger, max_records=3)
+    for message_id, day in enumerate([20251010, 20251011, 20251012, 20251013, 20251014], 1):
+        ledger.append(KIND_BEHU, "Tuấn", day=day, message_id=message_id)
+    assert len(index) == 3
+    # Days from the newest evicted one onwards are no longer complete in memory
+    assert index._complete_since == 20251012
+    assert _days(index.records(KIND_BEHU, since=20251012)) == [20251014, 20251013, 20251012]
+    # Older ranges are answered by the ledger, not by the partial cache
+    assert _days(index.records(KIND_BEHU, since=20251010, until=20251011)) == [
+        20251011,
+        20251010,
+    ]
+    assert len(index.records(KIND_BEHU)) == 5
+
+
+def test_hydration_keeps_only_the_newest_records(ledger):
+    for message_id, day in enumerate([20251010, 20251011, 20251012], 1):
+        ledger.append(KIND_BEHU, "Tuấn", day=day, message_id=message_id)
+    index = LogIndex(ledger, max_records=2)
+    assert len(index) == 2
+    assert len(index.records(KIND_BEHU)) == 3
+    assert _days(index.records(KIND_BEHU, since=20251011)) == [20251012, 20251011]
+
+
+def test_stale_index_refreshes_once_for_concurrent_callers(ledger):
+    index = LogIndex(ledger)
+    calls = []
+
+    async def refresher():
+        calls.append(1)
+        await asyncio.sleep(0)
+        index.stale = False
+
+    index.refresher = refresher
+    index.stale = True
+
+    async def run():
+        await asyncio.gather(*(index.ensure_fresh() for _ in range(5)))
+        await index.ensure_fresh()
+
+    asyncio.run(run())
+    assert calls == [1]
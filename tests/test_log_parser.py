@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+
+from services.ledger import KIND_BEHU, KIND_BENGOAN, KIND_GIAYCHE, KIND_MENTEE_CHE
+from services.log_parser import encode_token, parse_line, split_token
+
+CREATED_AT = datetime(2025, 10, 14, 9, 30, tzinfo=timezone.utc)
+
+
+def test_parse_line_legacy_prose():
+    record = parse_line("<@77> đã bị phạt 1 phiếu bé hư vào ngày 3/2/2025", CREATED_AT)
+    assert (record.kind, record.target_name, record.target_id, record.day) == (
+        KIND_BEHU,
+        "<@77>",
+        77,
+        20250203,
+    )
+    mentee = parse_line("[mentee] Hà My bị chê bởi Tuấn vào ngày 01/10/2025", CREATED_AT)
+    assert (mentee.kind, mentee.target_name, mentee.sender_name, mentee.day) == (
+        KIND_MENTEE_CHE,
+        "Hà My",
+        "Tuấn",
+        20251001,
+    )
+
+
+def test_parse_line_legacy_mixed_case():
+    record = parse_line("Tuấn Đã bị phạt 1 Phiếu Bé Hư vào ngày 14/10/2025", CREATED_AT)
+    assert (record.kind, record.target_name, record.day) == (KIND_BEHU, "Tuấn", 20251014)
+    record = parse_line("Hà My ĐÃ ĐƯỢC TẶNG 1 PHIẾU BÉ NGOAN", CREATED_AT)
+    assert (record.kind, record.target_name) == (KIND_BENGOAN, "Hà My")
+    record = parse_line(
+        "Minh Anh Bị Ghi Giấy Chê Bởi Tuấn Vào Ngày 14/10/2025. Lý Do: nói chuyện", CREATED_AT
+    )
+    assert (record.kind, record.sender_name, record.reason) == (KIND_GIAYCHE, "Tuấn", "nói chuyện")
+
+
+def test_parse_line_without_date_uses_created_at():
+    record = parse_line("Tuấn đã bị phạt 1 phiếu bé hư", CREATED_AT)
+    assert record.day == 20251014
+
+
+def test_parse_line_rejects_impossible_dates():
+    for date_s in ("31/02/2025", "00/10/2025", "14/13/2025", "14/10/0000"):
+        assert parse_line(f"Tuấn đã bị phạt 1 phiếu bé hư vào ngày {date_s}", CREATED_AT) is None
+
+
+def test_parse_line_ignores_chatter():
+    assert parse_line("hôm nay học gì vậy mọi người?", CREATED_AT) is None
+    assert parse_line("", CREATED_AT) is None
+
+
+def test_split_token_round_trip():
+    prose = "<@123> đã bị phạt 1 phiếu bé hư vào ngày 14/10/2025"
+    token = encode_token(KIND_BEHU, 123, 456, datetime(2025, 10, 14, 23, 59), "00ab")
+    assert split_token(f"{prose} {token}") == (prose, (KIND_BEHU, 123, 456, 20251014, "00ab"))
+
+
+def test_split_token_without_ids():
+    token = encode_token(KIND_BEHU, None, None, CREATED_AT, "00ab")
+    assert split_token(f"Tuấn đã bị phạt {token}")[1] == (KIND_BEHU, None, None, 20251014, "00ab")
+
+
+def test_split_token_ignores_legacy_and_malformed_lines():
+    legacy = "Tuấn đã bị phạt 1 phiếu bé hư vào ngày 14/10/2025"
+    assert split_token(legacy) == (legacy, None)
+    for bad in ("x `nr1|unknown|1|2|3|uid`", "x `nr1|behu|a|2|3|uid`", "x `nr1|behu|1|2`"):
+        assert split_token(bad) == (bad, None)
+
+
+def test_parse_line_reads_the_token():
+    when = datetime(2025, 10, 14)
+    line = "Minh Anh bị ghi giấy chê bởi <@9> vào ngày 14/10/2025. Lý do: nói chuyện riêng"
+    record = parse_line(f"{line} {encode_token(KIND_GIAYCHE, None, 9, when, 'u1')}", CREATED_AT)
+    assert record.to_fields() == {
+        "kind": KIND_GIAYCHE,
+        "target_name": "Minh Anh",
+        "target_id": None,
+        "sender_name": "<@9>",
+        "sender_id": 9,
+        "day": 20251014,
+        "reason": "nói chuyện riêng",
+        "uid": "u1",
+    }
+    assert record.mentions == (9,)
+
+
+def test_token_wins_over_edited_prose():
+    token = encode_token(KIND_BEHU, 5, None, datetime(2025, 10, 14), "u2")
+    record = parse_line(f"(đã sửa) {token}", CREATED_AT)
+    assert (record.kind, record.target_name, record.target_id, record.uid) == (
+        KIND_BEHU,
+        "<@5>",
+        5,
+        "u2",
+    )
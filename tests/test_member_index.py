@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.member_index import GuildMemberIndex, MemberIndex, exact_key, fold
+
+
+def _member(id, display_name, name):
+    return SimpleNamespace(id=id, display_name=display_name, name=name)
+
+
+def _index():
+    return GuildMemberIndex(
+        [
+            _member(1, "Ân", "an_1"),
+            _member(2, "Đặng Thị Ánh", "anh.dang"),
+            _member(3, "Bình", "binh"),
+            _member(4, "bình", "binh2"),
+        ]
+    )
+
+
+def test_fold():
+    assert fold("Đặng Thị Ánh") == "dang thi anh"
+    assert fold(None) == ""
+
+
+def test_search_is_diacritic_insensitive_prefix_first():
+    index = _index()
+    assert [member_id for member_id, _ in index.search("an")] == [1, 2]
+    assert index.search("thi") == [(2, "Đặng Thị Ánh")]
+    assert index.search("zzz") == []
+    assert len(index.search("", limit=2)) == 2
+
+
+def test_search_follows_upsert_and_remove():
+    index = _index()
+    index.upsert(4, "Bảo", "bao")
+    assert [member_id for member_id, _ in index.search("bin")] == [3]
+    assert index.search("bao") == [(4, "Bảo")]
+    index.remove(3)
+    assert index.search("bin") == []
+
+
+def test_member_index_builds_per_guild_and_drops():
+    guild = SimpleNamespace(id=7, name="g", chunked=True, members=[_member(1, "Ân", "an")])
+    members = MemberIndex()
+
+    async def run():
+        assert members.search(guild, "an") == [(1, "Ân")]
+        members.upsert(SimpleNamespace(id=2, display_name="Anh", name="anh", guild=guild))
+        assert [member_id for member_id, _ in members.search(guild, "an")] == [1, 2]
+        members.drop(guild.id)
+        assert members.search(guild, "an") == [(1, "Ân")]
+
+    asyncio.run(run())
+
+
+def test_exact_key():
+    assert exact_key("  Ánh ") == exact_key("ánh") != exact_key("Anh")
+
+
+def test_exact_keeps_diacritics():
+    index = _index()
+    assert index.exact("ân") == 1
+    assert index.exact("An") is None
+    assert index.exact("anh.dang") == 2
+    # Two members named "Bình" (ignoring case): ambiguous
+    assert index.exact("BÌNH") is None
+
+
+def test_exact_follows_upsert_and_remove():
+    index = _index()
+    index.upsert(4, "Bảo", "binh2")
+    assert index.exact("Bình") == 3
+    assert index.exact("bảo") == 4
+    index.remove(3)
+    assert index.exact("Bình") is None
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import discord
+
+from services import outbox as outbox_module
+from services.ledger import KIND_BEHU
+from services.log_parser import encode_token, split_token
+from services.outbox import MAX_MESSAGE_CHARS, MAX_RETRIES, LogOutbox, _fit
+
+
+class FakeChannel:
+    def __init__(self, failures=()):
+        # Statuses to fail the next sends with, in order
+        self.failures = list(failures)
+        self.sent: list[str] = []
+        self.attempts = 0
+
+    async def send(self, content: str):
+        self.attempts += 1
+        if self.failures:
+            status = self.failures.pop(0)
+            raise discord.HTTPException(SimpleNamespace(status=status, reason=""), "")
+        self.sent.append(content)
+        return FakeMessage(100 + len(self.sent))
+
+
+class FakeMessage:
+    def __init__(self, id: int):
+        self.id = id
+
+
+class FakeBot:
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+    def is_closed(self):
+        return False
+
+    async def wait_until_ready(self):
+        pass
+
+
+def test_non_draining_outbox_sends_nothing_on_close(ledger):
+    channel = FakeChannel()
+    outbox = LogOutbox(FakeBot(channel), ledger, 1, drain=False)
+
+    async def run():
+        outbox.enqueue("Tuấn đã bị phạt 1 phiếu bé hư")
+        await outbox.close()
+
+    asyncio.run(run())
+    assert channel.sent == []
+    # Left queued for the draining process
+    assert len(ledger.outbox_pending()) == 1
+
+
+def test_draining_outbox_flushes_on_close(ledger):
+    channel = FakeChannel()
+    outbox = LogOutbox(FakeBot(channel), ledger, 1, flush_delay=60)
+
+    async def run():
+        outbox.enqueue("a")
+        outbox.enqueue("b")
+        await outbox.close()
+
+    asyncio.run(run())
+    assert channel.sent == ["a\nb"]
+    assert ledger.outbox_pending() == []
+
+
+def _no_sleep(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(outbox_module.asyncio, "sleep", sleep)
+    return delays
+
+
+def test_lines_are_packed_into_as_few_messages_as_fit(ledger):
+    channel = FakeChannel()
+    outbox = LogOutbox(FakeBot(channel), ledger, 1, drain=False)
+    lines = [f"{i:04d} " + "x" * 495 for i in range(9)]
+    for line in lines:
+        outbox.enqueue(line)
+    assert asyncio.run(outbox.flush())
+    assert [len(message.split("\n")) for message in channel.sent] == [3, 3, 3]
+    assert all(len(message) <= MAX_MESSAGE_CHARS for message in channel.sent)
+    assert "\n".join(channel.sent) == "\n".join(lines)
+    assert outbox.metrics() == {"pending": 0, "messages": 3, "lines": 9, "retries": 0}
+
+
+def test_long_lines_are_cut_but_keep_their_token():
+    token = encode_token(KIND_BEHU, 5, 6, datetime(2025, 10, 14), "u1")
+    fitted = _fit("dòng 1\ndòng 2 " + "x" * 3000 + " " + token)
+    assert len(fitted) == MAX_MESSAGE_CHARS
+    assert "\n" not in fitted
+    assert split_token(fitted)[1] == (KIND_BEHU, 5, 6, 20251014, "u1")
+
+
+def test_sent_records_are_attached_to_their_message(ledger):
+    channel = FakeChannel()
+    outbox = LogOutbox(FakeBot(channel), ledger, 1, drain=False)
+    ledger.append(KIND_BEHU, "Tuấn", day=20251014, uid="u1")
+    outbox.enqueue("other line")
+    outbox.enqueue("Tuấn đã bị phạt", uid="u1")
+    asyncio.run(outbox.flush())
+    assert ledger.delete_message(101) == ["u1"]
+
+
+def test_rate_limits_and_server_errors_are_retried_with_backoff(ledger, monkeypatch):
+    delays = _no_sleep(monkeypatch)
+    channel = FakeChannel(failures=[429, 503, 500])
+    outbox = LogOutbox(FakeBot(channel), ledger, 1, drain=False)
+    outbox.enqueue("a")
+    assert asyncio.run(outbox.flush())
+    assert channel.sent == ["a"]
+    assert outbox.retries == 3
+    # Exponential, with jitter down to half
+    assert len(delays) == 3
+    assert 0.5 <= delays[0] <= 1 and 1 <= delays[1] <= 2 and 2 <= delays[2] <= 4
+
+
+def test_other_errors_and_exhausted_retries_keep_lines_queued(ledger, monkeypatch):
+    _no_sleep(monkeypatch)
+    channel = FakeChannel(failures=[403])
+    outbox = LogOutbox(FakeBot(channel), ledger, 1, drain=False)
+    outbox.enqueue("a")
+    assert not asyncio.run(outbox.flush())
+    assert channel.attempts == 1
+
+    channel.failures = [429] * (MAX_RETRIES + 1)
+    assert not asyncio.run(outbox.flush())
+    assert channel.attempts == 1 + MAX_RETRIES + 1
+    assert [row["text"] for row in ledger.outbox_pending()] == ["a"]
+
+    assert asyncio.run(outbox.flush())
+    assert channel.sent == ["a"]
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import date, datetime
+
+from services.ledger import KIND_BEHU, KIND_GIAYCHE, day_int
+from services.log_parser import parse_line
+from services.records import collect_rollups, record_and_mirror
+
+
+class FakeOutbox:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.queued: list[tuple[str, str]] = []
+
+    def enqueue(self, text: str, uid: str | None = None):
+        if self.fail:
+            raise RuntimeError("outbox down")
+        self.queued.append((text, uid))
+
+
+def _record(ledger, outbox):
+    return record_and_mirror(
+        ledger,
+        outbox,
+        KIND_GIAYCHE,
+        "<@1>",
+        "<@1> bị ghi giấy chê bởi Ann vào ngày 18/10/2025. Lý do: late",
+        target_id=1,
+        sender_name="Ann",
+        sender_id=2,
+        when=datetime(2025, 10, 18, 12),
+        reason="late",
+    )
+
+
+def test_record_and_mirror_writes_ledger_then_queues_tokenized_line(ledger):
+    outbox = FakeOutbox()
+    uid = _record(ledger, outbox)
+
+    (row,) = ledger.records(KIND_GIAYCHE)
+    assert (row["uid"], row["target_id"], row["sender_id"], row["day"]) == (uid, 1, 2, 20251018)
+    assert row["reason"] == "late"
+
+    ((text, queued_uid),) = outbox.queued
+    assert queued_uid == uid
+    parsed = parse_line(text, datetime(2025, 10, 18))
+    assert (parsed.kind, parsed.uid, parsed.reason) == (KIND_GIAYCHE, uid, "late")
+
+
+def test_record_and_mirror_keeps_ledger_row_when_outbox_fails(ledger):
+    _record(ledger, FakeOutbox(fail=True))
+    assert ledger.count() == 1
+
+
+class FakeLogIndex:
+    def __init__(self):
+        self.bounds = []
+
+    async def ensure_fresh(self, since=None, until=None):
+        self.bounds.append((since, until))
+
+
+def test_collect_rollups_groups_by_period_and_filters_by_member(ledger):
+    ledger.append(KIND_BEHU, "<@1>", target_id=1, day=day_int(date(2025, 10, 13)))
+    ledger.append(KIND_BEHU, "<@1>", target_id=1, day=day_int(date(2025, 10, 14)))
+    ledger.append(KIND_BEHU, "<@2>", target_id=2, day=day_int(date(2025, 10, 14)))
+    ledger.append(KIND_BEHU, "bob", day=day_int(date(2025, 10, 21)))
+
+    log_index = FakeLogIndex()
+    counts, scanned = asyncio.run(
+        collect_rollups(log_index, ledger, KIND_BEHU, None, "week", "2025-W42", None)
+    )
+    assert scanned == 3
+    assert list(counts.values()) == [{"<@1>": 2, "<@2>": 1}]
+    assert len(log_index.bounds) == 1
+
+    counts, scanned = asyncio.run(
+        collect_rollups(log_index, ledger, KIND_BEHU, None, "week", None, "2")
+    )
+    assert scanned == 1
+    assert list(counts.values()) == [{"<@2>": 1}]
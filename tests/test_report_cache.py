@@ -0,0 +1,116 @@
+import asyncio
+
+from services import report_cache
+from services.ledger import KIND_BEHU, KIND_BENGOAN
+from services.report_cache import Report, ReportCache, ReportScope
+from services.singleflight import SingleFlight
+
+
+class Builder:
+    """Factory returning numbered reports, optionally writing to the ledger mid-build."""
+
+    def __init__(self, during=None):
+        self.builds = 0
+        self.during = during
+
+    async def __call__(self):
+        self.builds += 1
+        if self.during is not None:
+            during, self.during = self.during, None
+            await asyncio.sleep(0)
+            during()
+        return Report(content=str(self.builds))
+
+
+def _get(cache, key, scope, builder):
+    return asyncio.run(cache.get(key, scope, builder)).content
+
+
+def test_hit_until_a_write_in_scope(ledger):
+    cache = ReportCache(ledger, SingleFlight())
+    scope = ReportScope((KIND_BEHU,), periods=("2025-W42",))
+    builder = Builder()
+    key = ("behu", 1, "2025-W42")
+    assert _get(cache, key, scope, builder) == "1"
+    assert _get(cache, key, scope, builder) == "1"
+    # Other kind, other week: still fresh
+    ledger.append(KIND_BENGOAN, "Tuấn", day=20251014)
+    ledger.append(KIND_BEHU, "Tuấn", day=20251020)
+    assert _get(cache, key, scope, builder) == "1"
+    ledger.append(KIND_BEHU, "Tuấn", day=20251014)
+    assert _get(cache, key, scope, builder) == "2"
+    assert cache.metrics()["hit"] == 2
+
+
+def test_target_scope_ignores_other_members_but_not_free_text(ledger):
+    cache = ReportCache(ledger, SingleFlight())
+    scope = ReportScope((KIND_BEHU,), target_id=5)
+    builder = Builder()
+    key = ("behu", 1, 5)
+    _get(cache, key, scope, builder)
+    ledger.append(KIND_BEHU, "<@6>", target_id=6, day=20251014)
+    assert _get(cache, key, scope, builder) == "1"
+    ledger.append(KIND_BEHU, "Tuấn", day=20251014)
+    assert _get(cache, key, scope, builder) == "2"
+
+
+def test_write_during_build_leaves_the_result_stale(ledger):
+    cache = ReportCache(ledger, SingleFlight())
+    scope = ReportScope((KIND_BEHU,))
+    builder = Builder(during=lambda: ledger.append(KIND_BEHU, "Tuấn", day=20251014))
+    key = ("behu", 1)
+    assert _get(cache, key, scope, builder) == "1"
+    assert _get(cache, key, scope, builder) == "2"
+    assert _get(cache, key, scope, builder) == "2"
+
+
+def test_stale_report_served_while_busy(ledger, monkeypatch):
+    monkeypatch.setattr(report_cache, "STALE_WHILE_REVALIDATE_LOAD", 1)
+    cache = ReportCache(ledger, SingleFlight())
+    scope = ReportScope((KIND_BEHU,))
+    builder = Builder()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return Report(content="other")
+
+    async def run():
+        await cache.get(("behu", 1), scope, builder)
+        ledger.append(KIND_BEHU, "Tuấn", day=20251014)
+        busy = asyncio.create_task(cache.get(("behu", 2), scope, slow))
+        while not cache._building:
+            await asyncio.sleep(0)
+        # One build running: the stale copy is served and rebuilt in the background
+        served = await cache.get(("behu", 1), scope, builder)
+        release.set()
+        await busy
+        await asyncio.sleep(0.01)
+        fresh = await cache.get(("behu", 1), scope, builder)
+        return served.content, fresh.content
+
+    assert asyncio.run(run()) == ("1", "2")
+    assert cache.metrics()["stale_served"] == 1
+
+
+def test_lru_bound(ledger):
+    cache = ReportCache(ledger, SingleFlight(), max_entries=2)
+    scope = ReportScope((KIND_BEHU,))
+    builder = Builder()
+    for key in (("a",), ("b",), ("a",), ("c",)):
+        _get(cache, key, scope, builder)
+    # "b" was least recently used
+    assert _get(cache, ("a",), scope, builder) == "1"
+    assert _get(cache, ("b",), scope, builder) == "4"
+
+
+def test_reports_expire_after_the_name_ttl(ledger, monkeypatch):
+    cache = ReportCache(ledger, SingleFlight())
+    scope = ReportScope((KIND_BEHU,))
+    builder = Builder()
+    key = ("behu", 1)
+    assert _get(cache, key, scope, builder) == "1"
+    assert _get(cache, key, scope, builder) == "1"
+    # No ledger write, but member names may have changed since the build
+    monkeypatch.setattr(report_cache, "NAME_TTL", 0)
+    assert _get(cache, key, scope, builder) == "2"
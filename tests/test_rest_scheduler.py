@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from services.rest_scheduler import Lane, RestScheduler
+
+
+def test_urgent_lanes_run_first_fifo_within_a_lane():
+    scheduler = RestScheduler(concurrency=1)
+    order = []
+
+    def call(name):
+        async def factory():
+            order.append(name)
+            return name
+
+        return factory
+
+    async def run():
+        scheduler.start()
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        # Hold the only worker while the rest queue up
+        first = asyncio.create_task(scheduler.run(Lane.DELETE, ("delete", 1), blocker))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(scheduler.run(lane, (lane.name, 1), call(name)))
+            for lane, name in [
+                (Lane.DELETE, "delete"),
+                (Lane.SPARE, "spare"),
+                (Lane.CREATE, "create 1"),
+                (Lane.MOVE, "move"),
+                (Lane.CREATE, "create 2"),
+            ]
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.depth() == {"move": 1, "create": 2, "spare": 1, "delete": 1}
+        gate.set()
+        await first
+        results = await asyncio.gather(*queued)
+        await scheduler.close()
+        return results
+
+    results = asyncio.run(run())
+    assert order == ["move", "create 1", "create 2", "spare", "delete"]
+    assert results == ["delete", "spare", "create 1", "move", "create 2"]
+
+
+def test_errors_and_rate_limits_reach_the_caller_and_are_counted():
+    scheduler = RestScheduler(concurrency=2)
+
+    async def limited():
+        raise discord.HTTPException(SimpleNamespace(status=429, reason=""), "")
+
+    async def broken():
+        raise ValueError("bad")
+
+    async def run():
+        scheduler.start()
+        with pytest.raises(discord.HTTPException):
+            await scheduler.run(Lane.CREATE, ("create", 1), limited)
+        with pytest.raises(ValueError):
+            await scheduler.run(Lane.CREATE, ("create", 1), broken)
+        await scheduler.close()
+
+    asyncio.run(run())
+    bucket = scheduler.buckets[("create", 1)]
+    assert (bucket.calls, bucket.rate_limited, bucket.errors, bucket.inflight) == (2, 1, 1, 0)
+    assert scheduler.metrics()["429s"] == 1
+
+
+def test_caller_that_gave_up_is_skipped():
+    scheduler = RestScheduler(concurrency=1)
+    ran = []
+
+    async def run():
+        scheduler.start()
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def late():
+            ran.append(1)
+
+        first = asyncio.create_task(scheduler.run(Lane.MOVE, ("move", 1), blocker))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.run(Lane.DELETE, ("delete", 1), late), 0.01)
+        gate.set()
+        await first
+        await asyncio.sleep(0.01)
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert ran == []
+
+
+def test_unstarted_scheduler_calls_directly():
+    scheduler = RestScheduler()
+
+    async def factory():
+        return "done"
+
+    assert asyncio.run(scheduler.run(Lane.MOVE, ("move", 1), factory)) == "done"
+
+
+def test_logged_429s_are_counted_per_route():
+    scheduler = RestScheduler()
+    logger = logging.getLogger("discord.http")
+
+    async def run():
+        scheduler.start()
+        logger.warning(
+            "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.",
+            "POST",
+            "https://discord.com/api/v10/guilds/123456789012345678/channels",
+            1.0,
+        )
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert scheduler.rate_limits.routes == {
+        "POST https://discord.com/api/v10/guilds/{id}/channels": 1
+    }
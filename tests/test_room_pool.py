@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import discord
+
+from services.rest_scheduler import RestScheduler
+from services.room_pool import RoomPool
+from services.room_store import SqliteRoomStore
+from services.rooms import RoomRegistry
+
+_ids = itertools.count(1000)
+
+
+class FakeVoice(discord.VoiceChannel):
+    def __init__(self, guild):
+        self.id = next(_ids)
+        self._fake_guild = guild
+
+    async def delete(self):
+        self._fake_guild.channels.pop(self.id, None)
+        self._fake_guild.deleted.append(self.id)
+
+
+class FakeText:
+    def __init__(self, guild):
+        self.id = next(_ids)
+        self._guild = guild
+
+    async def delete(self):
+        self._guild.channels.pop(self.id, None)
+        self._guild.deleted.append(self.id)
+
+
+class FakeGuild:
+    def __init__(self, id, fail_text=False):
+        self.id = id
+        self.name = f"guild {id}"
+        self.default_role = object()
+        self.me = object()
+        self.channels = {}
+        self.deleted = []
+        self.fail_text = fail_text
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def create_voice_channel(self, name, category=None, overwrites=None):
+        channel = FakeVoice(self)
+        self.channels[channel.id] = channel
+        return channel
+
+    async def create_text_channel(self, name, category=None, overwrites=None):
+        if self.fail_text:
+            raise discord.HTTPException(SimpleNamespace(status=500, reason=""), "")
+        channel = FakeText(self)
+        self.channels[channel.id] = channel
+        return channel
+
+
+def _pool(tmp_path, size=2):
+    rooms = RoomRegistry(SqliteRoomStore(str(tmp_path / "rooms.db")))
+    return RoomPool(rooms, RestScheduler(), size=size), rooms
+
+
+async def _fill(pool, guild, category=None):
+    pool.replenish(guild, category)
+    await asyncio.gather(*pool._filling.values())
+
+
+def test_replenish_then_take(tmp_path):
+    pool, rooms = _pool(tmp_path)
+    guild = FakeGuild(1)
+
+    async def run():
+        await _fill(pool, guild)
+        assert pool.metrics()["spares"] == 2
+        first = pool.take(guild, None)
+        second = pool.take(guild, None)
+        assert pool.take(guild, None) is None
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first != second
+    assert all(isinstance(pair[0], discord.VoiceChannel) for pair in (first, second))
+    # Spares are registered (without an owner) so a restart cleans them up
+    assert rooms.pairs[first[0].id] == first[1].id
+    assert pool.metrics()["created"] == 2
+
+
+def test_spares_are_kept_per_guild(tmp_path):
+    pool, _ = _pool(tmp_path, size=1)
+    one, two = FakeGuild(1), FakeGuild(2)
+
+    async def run():
+        await _fill(pool, one)
+        assert pool.take(two, None) is None
+        await _fill(pool, two)
+        return pool.take(one, None), pool.take(two, None)
+
+    spare_one, spare_two = asyncio.run(run())
+    assert spare_one[0].id in one.channels
+    assert spare_two[0].id in two.channels
+
+
+def test_vanished_spares_are_skipped_and_forgotten(tmp_path):
+    pool, rooms = _pool(tmp_path)
+    guild = FakeGuild(1)
+
+    async def run():
+        await _fill(pool, guild)
+        (gone_voice, gone_text), (kept_voice, _) = pool._spares[(1, None)]
+        del guild.channels[kept_voice]
+        pool.forget(gone_voice)
+        return pool.take(guild, None), kept_voice
+
+    taken, kept_voice = asyncio.run(run())
+    assert taken is None
+    assert kept_voice not in rooms.pairs
+
+
+def test_half_created_spare_is_deleted(tmp_path):
+    pool, rooms = _pool(tmp_path)
+    guild = FakeGuild(1, fail_text=True)
+    asyncio.run(_fill(pool, guild))
+    assert pool.metrics()["spares"] == 0
+    assert len(guild.deleted) == 1
+    assert guild.channels == {}
+    assert rooms.pairs == {}
+
+
+def test_hit_rate():
+    pool = RoomPool(None, None, size=0)
+    assert pool.hit_rate() is None
+    pool.record(True, 0.1)
+    pool.record(False, 1.0)
+    pool.record(True, 0.1)
+    assert round(pool.hit_rate(), 2) == 0.67
@@ -0,0 +1,90 @@
+import asyncio
+
+from services import room_reaper
+from services.room_reaper import RoomReaper
+
+
+class Deleter:
+    def __init__(self):
+        self.batches: list[dict] = []
+
+    async def __call__(self, due):
+        self.batches.append(dict(due))
+
+
+def test_rooms_emptied_together_are_deleted_in_one_batch(monkeypatch):
+    monkeypatch.setattr(room_reaper, "BATCH_WINDOW", 0.02)
+    deleter = Deleter()
+    reaper = RoomReaper(deleter, grace=0.01)
+
+    async def run():
+        reaper.schedule("guild", 10)
+        reaper.schedule("guild", 20)
+        reaper.schedule("guild", 10)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert deleter.batches == [{10: "guild", 20: "guild"}]
+    assert reaper.metrics() == {
+        "pending": 0,
+        "scheduled": 2,
+        "coalesced": 1,
+        "batches": 1,
+        "expired": 2,
+    }
+
+
+def test_rejoin_cancels_a_pending_deletion(monkeypatch):
+    monkeypatch.setattr(room_reaper, "BATCH_WINDOW", 0.02)
+    deleter = Deleter()
+    reaper = RoomReaper(deleter, grace=0.01)
+
+    async def run():
+        reaper.schedule("guild", 10)
+        reaper.schedule("guild", 20)
+        assert reaper.cancel(10)
+        assert not reaper.cancel(30)
+        await asyncio.sleep(0.015)
+        # Expired, waiting for its batch: still cancelable
+        assert reaper.cancel(20)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert deleter.batches == []
+    assert reaper.stats["canceled"] == 2
+
+
+def test_failed_batch_does_not_stop_later_ones(monkeypatch):
+    monkeypatch.setattr(room_reaper, "BATCH_WINDOW", 0)
+    deleted = []
+
+    async def delete_rooms(due):
+        if not deleted:
+            deleted.append(None)
+            raise RuntimeError("boom")
+        deleted.append(dict(due))
+
+    reaper = RoomReaper(delete_rooms, grace=0)
+
+    async def run():
+        reaper.schedule("guild", 10)
+        await asyncio.sleep(0.01)
+        reaper.schedule("guild", 20)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert deleted == [None, {20: "guild"}]
+
+
+def test_cancel_all():
+    deleter = Deleter()
+    reaper = RoomReaper(deleter, grace=0.01)
+
+    async def run():
+        reaper.schedule("guild", 10)
+        reaper.cancel_all()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert deleter.batches == []
+    assert reaper.metrics()["pending"] == 0
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+
+from services.room_store import SqliteRoomStore
+from services.rooms import RoomRegistry
+
+
+class BlockingStore:
+    """Stand-in for a network store: records the thread of every call."""
+
+    blocking = True
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls: list[tuple] = []
+        self.threads: set = set()
+
+    def _call(self, *call):
+        self.threads.add(threading.get_ident())
+        if self.fail:
+            raise ConnectionError("store down")
+        self.calls.append(call)
+
+    def save_room(self, guild_id, voice_id, text_id, owner_id):
+        self._call("save", voice_id)
+
+    def delete_room(self, guild_id, voice_id):
+        self._call("delete", voice_id)
+
+    def rooms(self, guild_id):
+        self._call("rooms", guild_id)
+        return []
+
+    def close(self):
+        pass
+
+
+def test_blocking_store_writes_run_off_the_loop_in_order():
+    store = BlockingStore()
+    registry = RoomRegistry(store)
+
+    async def run():
+        registry.add_pair(1, 10, 11, owner_id=5)
+        registry.drop_pair(11)
+        registry.add_pair(1, 20, 21, owner_id=5)
+        # Memory is current before the store writes finish
+        assert registry.room_of(1, 5) == (20, 21)
+        await registry.stored_rooms(1)
+        await registry.close()
+
+    asyncio.run(run())
+    assert store.calls == [("save", 10), ("delete", 10), ("save", 20), ("rooms", 1)]
+    assert threading.get_ident() not in store.threads
+
+
+def test_failed_blocking_write_is_logged_and_room_stays_registered():
+    registry = RoomRegistry(BlockingStore(fail=True))
+
+    async def run():
+        registry.add_pair(1, 10, 11, owner_id=5)
+        await registry.close()
+
+    asyncio.run(run())
+    assert registry.room_of(1, 5) == (10, 11)
+    assert registry.pairs == {10: 11, 11: 10}
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    registry = RoomRegistry(SqliteRoomStore(str(tmp_path / "rooms.db")))
+
+    async def run():
+        registry.add_pair(1, 10, 11, owner_id=5)
+        registry.add_pair(1, 20, 21)
+        registry.drop_pair(21)
+        await registry.set_community_channels(1, [7, 8])
+        rooms = await registry.stored_rooms(1)
+        community = await registry.community_channel_ids(1)
+        await registry.close()
+        return rooms, community
+
+    rooms, community = asyncio.run(run())
+    assert rooms == [{"voice_id": 10, "text_id": 11, "owner_id": 5}]
+    assert sorted(community) == [7, 8]
+    assert registry.room_of(1, 5) == (10, 11)
+    assert 20 not in registry.pairs and 21 not in registry.pairs
+
+
+def _registry(tmp_path):
+    return RoomRegistry(SqliteRoomStore(str(tmp_path / "rooms.db")))
+
+
+def test_pairs_map_both_ways_and_drop_by_either_channel(tmp_path):
+    registry = _registry(tmp_path)
+    registry.add_pair(1, 10, 11)
+    registry.add_pair(1, 20, 21)
+    assert registry.pairs == {10: 11, 11: 10, 20: 21, 21: 20}
+    registry.drop_pair(11)
+    registry.drop_pair(20)
+    assert registry.pairs == {}
+    assert asyncio.run(registry.stored_rooms(1)) == []
+
+
+def test_rooms_survive_a_restart_until_attached(tmp_path):
+    path = str(tmp_path / "rooms.db")
+    registry = RoomRegistry(SqliteRoomStore(path))
+    registry.add_pair(1, 10, 11, owner_id=5)
+    registry.add_pair(2, 30, 31)
+    asyncio.run(registry.close())
+
+    registry = RoomRegistry(SqliteRoomStore(path))
+    assert registry.pairs == {}
+    (row,) = asyncio.run(registry.stored_rooms(1))
+    registry.attach(1, row["voice_id"], row["text_id"], row["owner_id"])
+    assert registry.pairs == {10: 11, 11: 10}
+    assert [r["voice_id"] for r in asyncio.run(registry.stored_rooms(2))] == [30]
+
+
+def test_owner_index(tmp_path):
+    registry = _registry(tmp_path)
+    registry.add_pair(1, 10, 11, owner_id=5)
+    registry.add_pair(2, 20, 21, owner_id=5)
+    assert registry.room_of(1, 5) == (10, 11)
+    assert registry.room_of(2, 5) == (20, 21)
+    assert registry.room_of(1, 6) is None
+    # Dropping by the text channel also forgets the owner
+    registry.drop_pair(11)
+    assert registry.room_of(1, 5) is None
+    assert registry.room_of(2, 5) == (20, 21)
+
+
+def test_dropping_an_old_room_keeps_the_owners_newer_one(tmp_path):
+    registry = _registry(tmp_path)
+    registry.add_pair(1, 10, 11, owner_id=5)
+    registry.add_pair(1, 20, 21, owner_id=5)
+    registry.drop_pair(10)
+    assert registry.room_of(1, 5) == (20, 21)
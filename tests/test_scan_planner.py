@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+from discord.utils import snowflake_time
+
+from services.scan_planner import day_start_snowflake, plan_window
+
+
+def test_day_start_snowflake_is_midnight_utc():
+    assert snowflake_time(day_start_snowflake(20251014)) == datetime(
+        2025, 10, 14, tzinfo=timezone.utc
+    )
+
+
+def test_plan_window_covers_whole_days():
+    after, before = plan_window(20251013, 20251014)
+    assert after == day_start_snowflake(20251013) - 1
+    assert before == day_start_snowflake(20251015)
+
+
+def test_plan_window_open_ends():
+    assert plan_window(None, None) == (None, None)
+    assert plan_window(20251013, None) == (day_start_snowflake(20251013) - 1, None)
+    assert plan_window(None, 20251014) == (None, day_start_snowflake(20251015))
+
+
+def test_plan_window_starts_after_the_checkpoint():
+    checkpoint = day_start_snowflake(20251014) + 5
+    assert plan_window(20251013, 20251014, checkpoint) == (
+        checkpoint,
+        day_start_snowflake(20251015),
+    )
+    # An older checkpoint does not widen the window
+    assert plan_window(20251013, None, 1) == (day_start_snowflake(20251013) - 1, None)
+
+
+def test_plan_window_nothing_left_to_scan():
+    assert plan_window(20251013, 20251014, day_start_snowflake(20251015)) is None
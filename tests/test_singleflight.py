@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    started = []
+
+    async def compute():
+        started.append(1)
+        await asyncio.sleep(0.01)
+        return "report"
+
+    async def run():
+        return await asyncio.gather(*(flight.run(("behu", 1), compute) for _ in range(4)))
+
+    assert asyncio.run(run()) == ["report"] * 4
+    assert started == [1]
+    assert flight.metrics() == {"behu": (4, 3)}
+
+
+def test_different_keys_and_later_calls_compute_again():
+    flight = SingleFlight()
+    started = []
+
+    async def compute():
+        started.append(1)
+        return len(started)
+
+    async def run():
+        first = await asyncio.gather(flight.run(("behu", 1), compute), flight.run(("behu", 2), compute))
+        return first, await flight.run(("behu", 1), compute)
+
+    assert asyncio.run(run()) == ([1, 2], 3)
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(
+            *(flight.run(("behu",), fail) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await flight.run(("behu",), ok)
+
+    assert asyncio.run(run()) == "ok"
+
+
+def test_one_caller_cancelling_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "report"
+
+    async def run():
+        impatient = asyncio.create_task(flight.run(("behu",), compute))
+        patient = asyncio.create_task(flight.run(("behu",), compute))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(run()) == "report"